@@ -1,12 +1,19 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
+import os
+import threading
 import streamlit as st
+# streamlit import가 plotly_chart 요소용으로 plotly.graph_objects를 이미 불러오므로 지연 import 이득 없음
 import plotly.graph_objects as go
-import plotly.express as px
-from dataclasses import dataclass
+from plotly.colors import qualitative
 from datetime import date
-from dateutil.relativedelta import relativedelta
+
+# 사이드바 위젯 옵션(MONITORING_MODES·SAMPLING_MODES·DEFAULT_MAX_FFILL)에 매 실행 필요
+# (engine은 numba를 커널 첫 호출 때 import하므로 두 모듈 합쳐 ~10ms)
+from engine import MONITORING_MODES, CaseIndex, PathIndex, SAMPLING_MODES, StepDownELS, case_weights, run_backtest
+from market_data import DEFAULT_MAX_FFILL, adjusted_ohlc, align_prices
+# 분석 탭 기능 모듈(부트스트랩·캘린더·환율·헤지·몬테카를로·국면·스크리너·민감도·스트레스)은
+# 쓰는 탭/함수 안에서 import (콜드 스타트에서 holidays 등 import 생략)
 
 # =============================
 # 기본 설정
@@ -17,166 +24,162 @@ st.title("ELS 백테스트 시뮬레이터")
 # 세션 상태 초기화
 if 'backtest_result' not in st.session_state:
     st.session_state.backtest_result = None
+if 'figure_cache' not in st.session_state:
+    st.session_state.figure_cache = {}
 
 # 캐시 클리어 버튼
 if st.sidebar.button("🔄 캐시 초기화"):
     st.cache_data.clear()
+    st.cache_resource.clear()
     st.session_state.backtest_result = None
+    st.session_state.figure_cache = {}
     st.sidebar.success("성공! 데이터가 초기화되었습니다!")
     st.rerun()
 
 TRADING_DAYS_PER_YEAR = 252
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "app.css")
+CHART_MAX_POINTS = 1500  # 라인 차트 한 개당 최대 포인트 수 (대략 차트 가로 픽셀 수)
 
 # =============================
 # 유틸리티 함수
 # =============================
-def snap_next_trading_day(index: pd.DatetimeIndex, target: pd.Timestamp):
+def downsample_indices(values, max_points=CHART_MAX_POINTS, keep=None):
     """
-    target 이상의 첫 거래일 반환 (익영업일 원칙)
-    ELS 평가일이 휴일이면 다음 영업일로 연기되는 실무 관행 반영
+    min/max 버킷 다운샘플링 인덱스 반환
+    버킷마다 최저/최고점을 남겨 급락·급등 모양을 보존하고,
+    시작/끝 점과 keep으로 지정한 인덱스(낙인 터치, 상환일 등)는 항상 포함
     """
-    if not isinstance(target, pd.Timestamp):
-        target = pd.Timestamp(target)
-    pos = index.searchsorted(target, side="left")
-    if pos >= len(index):
-        return None
-    return index[pos]
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+
+    n_buckets = max(1, max_points // 2)
+    size = -(-n // n_buckets)  # ceil
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = values
+    buckets = padded.reshape(n_buckets, size)
+
+    # 전부 NaN인 버킷(끝부분 패딩)은 제외
+    valid = ~np.isnan(buckets).all(axis=1)
+    filled_min = np.where(np.isnan(buckets), np.inf, buckets)
+    filled_max = np.where(np.isnan(buckets), -np.inf, buckets)
+    offsets = np.arange(n_buckets) * size
+    lo = (offsets + filled_min.argmin(axis=1))[valid]
+    hi = (offsets + filled_max.argmax(axis=1))[valid]
+
+    idx = [lo, hi, [0, n - 1]]
+    if keep is not None:
+        idx.append([k for k in keep if k is not None and 0 <= k < n])
+    return np.unique(np.concatenate(idx).astype(int))
+
+def get_cached_figure(name, builder, *args):
+    """
+    결과별 Figure 캐시 (탭 전환/재실행 시 Figure 재생성 방지)
+    새 백테스트 결과가 저장되면 캐시가 비워짐
+    """
+    cache = st.session_state.figure_cache
+    if name not in cache:
+        cache[name] = builder(*args)
+    return cache[name]
+
+def get_bootstrap_ci(result):
+    """결과별 블록 부트스트랩 신뢰구간 캐시 (헤드라인 지표)"""
+    if result.get('bootstrap') is None:
+        from bootstrap import bootstrap_ci
+        result['bootstrap'] = bootstrap_ci(result['df'], result['els'].maturity_months)
+    return result['bootstrap']
+
+def format_ci(ci, metric, scale=100, digits=1):
+    """신뢰구간 표시 문자열 (예: 95% CI 88.1~96.4)"""
+    if ci is None:
+        return ""
+    lo, hi = ci.loc[metric, "lower"] * scale, ci.loc[metric, "upper"] * scale
+    return f"{ci.attrs['confidence']*100:.0f}% CI {lo:.{digits}f}~{hi:.{digits}f}"
+
+def weighted_median(values, weights):
+    """가중 중위값 (누적 가중치가 절반을 넘는 첫 값)"""
+    order = np.argsort(values, kind="stable")
+    cum = np.cumsum(weights[order])
+    return values[order][np.searchsorted(cum, cum[-1] / 2)]
+
+def weighted_std(values, weights):
+    """빈도 가중 표본 표준편차 (가중치가 모두 1이면 ddof=1 표준편차)"""
+    W = weights.sum()
+    mean = np.dot(weights, values) / W
+    return np.sqrt(np.dot(weights, (values - mean) ** 2) / max(W - 1, 1))
+
+def get_case_index(result):
+    """결과별 발행일 케이스 색인 캐시 (케이스 분석 탭)"""
+    if result.get('cases') is None:
+        result['cases'] = CaseIndex.from_frame(get_path_index(result), result['df'], result['els'])
+    return result['cases']
+
+def get_regime_features(result):
+    """결과별 발행일 국면 특성 캐시 (가격 행렬당 한 번 계산)"""
+    if result.get('regimes') is None:
+        from regimes import regime_features
+        result['regimes'] = regime_features(result['prices'])
+    return result['regimes']
+
+def get_path_index(result):
+    """결과별 PathIndex 캐시 (가격 행렬 전처리를 탭 간에 재사용)"""
+    if result.get('path_index') is None:
+        result['path_index'] = PathIndex(result['prices'], lows=result.get('lows'))
+    return result['path_index']
 
 # =============================
 # 다크모드 가독성용 CSS
 # =============================
-st.markdown(
+@st.cache_resource(show_spinner=False)
+def load_css(path=CSS_PATH):
+    """정적 CSS 파일 (서버 프로세스당 한 번만 읽음)"""
+    with open(path, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+@st.cache_resource(show_spinner=False)
+def start_warmup():
     """
-    <style>
-    /* ... (기존 폰트, 카드 스타일 등은 유지) ... */
-    
-    @import url("https://cdn.jsdelivr.net/gh/orioncactus/pretendard@v1.3.8/dist/web/static/pretendard.css");
-    html, body, [class*="css"] { font-family: 'Pretendard', sans-serif; }
-    [data-testid="stHeaderActionElements"] { display: none !important; }
-
-    /* 메인 타이틀 */
-    h1 {
-        background: linear-gradient(90deg, #4facfe 0%, #00f2fe 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-weight: 800 !important;
-        margin-bottom: 0px !important;
-    }
-
-    /* 카드 스타일 */
-    .card {
-        background: rgba(255, 255, 255, 0.03);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-        border-radius: 16px;
-        padding: 20px;
-        margin-bottom: 16px;
-    }
-    .card h3 {
-        margin: 0 0 12px 0;
-        font-size: 18px;
-        font-weight: 700;
-        color: #f0f0f0;
-        border-bottom: 1px solid rgba(255,255,255,0.1);
-        padding-bottom: 8px;
-    }
-
-    /* ★ [수정됨] 요약 박스 (Summary) - 시원시원한 리스트형 ★ */
-    .summary {
-        background: linear-gradient(135deg, rgba(255,255,255,0.05) 0%, rgba(79,172,254,0.05) 100%);
-        border: 1px solid rgba(79, 172, 254, 0.3);
-        border-radius: 16px;
-        padding: 20px;
-        margin-bottom: 20px;
-    }
-    
-    /* 한 줄에 하나씩 (Flex + Bottom Border) */
-    .summary-row {
-        display: flex;
-        justify-content: space-between; /* 양끝 정렬 */
-        align-items: center;
-        padding: 10px 0; /* 위아래 여백 */
-        border-bottom: 1px solid rgba(255,255,255,0.1); /* 구분선 */
-    }
-    .summary-row:last-child { border-bottom: none; } /* 마지막 줄은 선 없음 */
-
-    /* 라벨 (왼쪽) */
-    .summary-label { 
-        color: #ccc; 
-        font-size: 15px; 
-        font-weight: 500;
-    }
-    
-    /* 값 (오른쪽) - 크고 진하게 */
-    .summary-val { 
-        color: #fff; 
-        font-size: 17px; 
-        font-weight: 700; 
-        text-align: right;
-    }
-
-    /* 통계 박스 등 나머지 스타일 유지... */
-    .stat-container { display: flex; flex-wrap: wrap; gap: 10px; margin-bottom: 15px; }
-    .stat-box { flex: 1; min-width: 140px; background: rgba(255, 255, 255, 0.05); border-radius: 12px; padding: 15px; text-align: center; border: 1px solid rgba(255,255,255,0.05); }
-    .stat-title { font-size: 13px; color: #aaa; margin-bottom: 5px; }
-    .stat-value { font-size: 24px; font-weight: 800; color: #4facfe; }
-    .stat-sub { font-size: 12px; color: #888; }
-    
-    /* 기존 테이블 스타일 등... */
-    .dist-table { width: 100%; font-size: 14px; text-align: center; border-collapse: collapse; margin-top: 5px; }
-    .dist-table td { padding: 8px; border-bottom: 1px solid rgba(255,255,255,0.05); border-right: 1px solid rgba(255,255,255,0.05); }
-    .dist-table td:last-child { border-right: none; }
-    .dist-header { color: #aaa; font-size: 12px; }
-    .dist-val { font-weight: bold; color: #eee; }
-    
-    div[role="checkbox"] + label { line-height: 1.4; }
-    .smalllabel { font-size: 13px; color: #aaa; }
-    pre { display: none !important; }
-    
-    .debug-highlight {
-        background: rgba(255, 165, 0, 0.1);
-        border-left: 4px solid #ff9f43;
-        padding: 12px 16px;
-        border-radius: 4px;
-        margin: 15px 0;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+    첫 백테스트 클릭에 몰리던 yfinance·numba import와 커널 로드를 백그라운드 스레드에서 미리 수행
+    서버 프로세스당 한 번, 스크립트 끝(첫 화면을 그린 뒤)에서 호출 → 사용자가 조건을 고르는 동안 끝남
+    """
+    def warm():
+        try:
+            from importlib import import_module
+            from kernels import warm_up
+            import_module("yfinance")
+            warm_up()
+        except Exception:
+            pass  # 실제 사용 시점에 다시 import하며 오류를 보고함
+
+    thread = threading.Thread(target=warm, name="els-warmup", daemon=True)
+    thread.start()
+    return thread
 
 # =============================
 # 기초자산
 # =============================
 ASSETS = [
-    {"name": "S&P500", "ticker": "^GSPC"},
-    {"name": "HSCEI", "ticker": "^HSCE"},
-    {"name": "HSI", "ticker": "^HSI"},
-    {"name": "EURO50", "ticker": "^STOXX50E"},
-    {"name": "NIKKEI225", "ticker": "^N225"},
-    {"name": "KOSPI", "ticker": "^KS11"},
-    {"name": "NASDAQ100", "ticker": "^NDX"},
-    {"name": "TSLA", "ticker": "TSLA"},
-    {"name": "AMD", "ticker": "AMD"},
-    {"name": "NVDA", "ticker": "NVDA"},
-    {"name": "PLTR", "ticker": "PLTR"},
-    {"name": "MU", "ticker": "MU"},
-    {"name": "GOOGL", "ticker": "GOOGL"},
-    {"name": "MSFT", "ticker": "MSFT"},
-    {"name": "AAPL", "ticker": "AAPL"},
-    {"name": "META", "ticker": "META"},
+    {"name": "S&P500", "ticker": "^GSPC", "exchange": "NYSE", "currency": "USD"},
+    {"name": "HSCEI", "ticker": "^HSCE", "exchange": "HKEX", "currency": "HKD"},
+    {"name": "HSI", "ticker": "^HSI", "exchange": "HKEX", "currency": "HKD"},
+    {"name": "EURO50", "ticker": "^STOXX50E", "exchange": "EUREX", "currency": "EUR"},
+    {"name": "NIKKEI225", "ticker": "^N225", "exchange": "JPX", "currency": "JPY"},
+    {"name": "KOSPI", "ticker": "^KS11", "exchange": "KRX", "currency": "KRW"},
+    {"name": "NASDAQ100", "ticker": "^NDX", "exchange": "NYSE", "currency": "USD"},
+    {"name": "TSLA", "ticker": "TSLA", "exchange": "NYSE", "currency": "USD"},
+    {"name": "AMD", "ticker": "AMD", "exchange": "NYSE", "currency": "USD"},
+    {"name": "NVDA", "ticker": "NVDA", "exchange": "NYSE", "currency": "USD"},
+    {"name": "PLTR", "ticker": "PLTR", "exchange": "NYSE", "currency": "USD"},
+    {"name": "MU", "ticker": "MU", "exchange": "NYSE", "currency": "USD"},
+    {"name": "GOOGL", "ticker": "GOOGL", "exchange": "NYSE", "currency": "USD"},
+    {"name": "MSFT", "ticker": "MSFT", "exchange": "NYSE", "currency": "USD"},
+    {"name": "AAPL", "ticker": "AAPL", "exchange": "NYSE", "currency": "USD"},
+    {"name": "META", "ticker": "META", "exchange": "NYSE", "currency": "USD"},
 ]
 
-# =============================
-# ELS 구조
-# =============================
-@dataclass
-class StepDownELS:
-    maturity_months: int
-    obs_interval_months: int
-    early_levels: list
-    coupon_annual: float
-    knock_in: float
-
 # =============================
 # 데이터
 # =============================
@@ -184,6 +187,9 @@ class StepDownELS:
 
 @st.cache_data(show_spinner=False, ttl=3600)
 def download_prices(tickers, start, end):
+    # yfinance import(약 0.3초)는 실제 다운로드 때만 (캐시 적중/첫 화면에서는 생략)
+    import yfinance as yf
+
     try:
         # 1. auto_adjust=False로 설정 (Raw 데이터 확보)
         df = yf.download(tickers, start=start, end=end, auto_adjust=False, progress=False)
@@ -218,8 +224,8 @@ def download_prices(tickers, start, end):
             available_tickers = [t for t in tickers if t in df.columns]
             df = df[available_tickers]
 
-        # 5. 데이터 정리
-        df = df.ffill().dropna()
+        # 5. 데이터 정리 (결측 채움은 정렬 단계에서 한도 내로만 수행)
+        df = df.dropna(how="all")
         
         if df.empty:
             return None
@@ -230,130 +236,56 @@ def download_prices(tickers, start, end):
         st.error(f"데이터 다운로드 실패: {str(e)}")
         return None
 
-# =============================
-# 캘린더 기반 관측일 계산
-# =============================
-def get_observation_dates(start_date, maturity_months, obs_interval_months):
-    """캘린더 기반으로 정확한 관측일 계산"""
-    obs_dates = []
-    n_obs = maturity_months // obs_interval_months
-    
-    # start_date가 Timestamp가 아니면 변환
-    if not isinstance(start_date, pd.Timestamp):
-        start_date = pd.Timestamp(start_date)
-    
-    for i in range(1, n_obs + 1):
-        obs_date = start_date + relativedelta(months=i * obs_interval_months)
-        # Timestamp로 변환
-        obs_date = pd.Timestamp(obs_date)
-        obs_dates.append(obs_date)
-    
-    return obs_dates
+@st.cache_data(show_spinner=False, ttl=3600)
+def download_ohlc(tickers, start, end):
+    """
+    수정주가 OHLC 다운로드 (장중 저가 낙인 관측용)
+    티커별 float32 배열(OHLCStore)로 캐시해 종가만 받을 때보다 캐시가 크게 늘지 않도록 함
+    엔진 종가는 download_prices의 float64 수정종가를 쓰고 여기서는 저가(Low)만 사용
+    """
+    import yfinance as yf
 
-# =============================
-# 시뮬레이션 (KI 버그 수정)
-# =============================
-def simulate_els(price_window, els, start_date, return_detail=False):
+    try:
+        raw = yf.download(tickers, start=start, end=end, auto_adjust=False, progress=False)
+        store = adjusted_ohlc(raw, tickers)
+        return store if store.data else None
+    except Exception as e:
+        st.error(f"데이터 다운로드 실패: {str(e)}")
+        return None
+
+@st.cache_resource(show_spinner=False, ttl=3600)
+def load_aligned_prices(tickers, start, end, max_ffill=DEFAULT_MAX_FFILL, monitoring="close"):
     """
-    ELS 시뮬레이션 (조기상환 케이스도 KI 여부를 올바르게 기록)
-    
-    return_detail=True면 일별 경로 데이터도 반환
+    다운로드 + 합집합 캘린더 정렬 (정렬 결과 캐시)
+    같은 티커/기간/한도로 바스켓을 다시 구성할 때 재정렬을 건너뜀
+    cache_resource로 같은 객체를 공유 (읽기 전용으로만 사용) → 객체 안의 바스켓·gap_report 캐시가
+    rerun·스크리너 사이에서 유지됨 (cache_data는 rerun마다 역직렬화한 새 복사본을 돌려줌)
+    monitoring='low'면 OHLC 저장소의 장중 저가를 수정종가(float64)와 같은 캘린더로 정렬
+    (종가는 관측 방식과 무관하게 같은 float64 값 → 조기상환·만기 판정이 바뀌지 않음)
     """
-    norm = price_window / price_window.iloc[0]
-    
-    # 단일 자산이면 DataFrame으로 변환
-    if isinstance(norm, pd.Series):
-        norm = norm.to_frame()
-    
-    # worst-of 경로 (일자별, 종가 기준)
-    worst_series = norm.min(axis=1)
-    
-    # early_levels 길이 검증
-    n_obs = els.maturity_months // els.obs_interval_months
-    if len(els.early_levels) != n_obs:
-        raise ValueError(
-            f"조기상환 레벨 개수({len(els.early_levels)})가 "
-            f"관측 횟수({n_obs})와 일치하지 않습니다."
-        )
-    
-    # 관측일 계산 (캘린더 기반)
-    obs_dates = get_observation_dates(start_date, els.maturity_months, els.obs_interval_months)
-    
-    # 조기상환 체크
-    for i, (obs_date, lvl) in enumerate(zip(obs_dates, els.early_levels)):
-        # 관측일을 실제 거래일로 스냅 (익영업일 원칙)
-        obs_eval = snap_next_trading_day(norm.index, obs_date)
-        
-        if obs_eval is None:
-            # 관측일이 데이터 범위를 벗어남
-            break
-        
-        # 관측일까지의 KI 발생 여부 체크 (중요!)
-        ki_up_to_obs = bool((worst_series.loc[:obs_eval] < els.knock_in).any())
-        
-        # 관측일의 worst 성과
-        obs_worst = float(worst_series.loc[obs_eval])
-        
-        if obs_worst >= float(lvl):
-            # 조기상환 성공
-            holding_days = (obs_eval - start_date).days
-            holding_years = holding_days / 365.25
-            payoff = 1.0 + els.coupon_annual * holding_years
-            
-            if return_detail:
-                detail = {
-                    "dates": worst_series.index.tolist(),
-                    "worst_path": worst_series.values.tolist(),
-                    "asset_paths": norm.to_dict('list'),  # 개별 자산 경로 추가
-                    "asset_names": norm.columns.tolist(),  # 자산 이름
-                    "ki_level": els.knock_in,
-                    "ki_touched": ki_up_to_obs,
-                    "ki_touch_date": worst_series[worst_series < els.knock_in].index[0] if ki_up_to_obs else None,
-                    "redemption_date": obs_eval,
-                    "redemption_step": i + 1
-                }
-                return payoff - 1.0, ki_up_to_obs, i + 1, detail
-            
-            return payoff - 1.0, ki_up_to_obs, i + 1
-    
-    # 만기까지 도달 - KI 체크
-    ki_occurred = bool((worst_series < els.knock_in).any())
-    final_worst = float(worst_series.iloc[-1])
-    
-    if ki_occurred:
-        # 낙인 찍힘 → 손실 확정
-        payoff = final_worst
-    else:
-        # 낙인 안 찍힘 → 원금 + 만기 쿠폰
-        maturity_years = els.maturity_months / 12.0
-        payoff = 1.0 + els.coupon_annual * maturity_years
-    
-    if return_detail:
-        detail = {
-            "dates": worst_series.index.tolist(),
-            "worst_path": worst_series.values.tolist(),
-            "asset_paths": norm.to_dict('list'),  # 개별 자산 경로 추가
-            "asset_names": norm.columns.tolist(),  # 자산 이름
-            "ki_level": els.knock_in,
-            "ki_touched": ki_occurred,
-            "ki_touch_date": worst_series[worst_series < els.knock_in].index[0] if ki_occurred else None,
-            "redemption_date": worst_series.index[-1],
-            "redemption_step": None
-        }
-        return payoff - 1.0, ki_occurred, None, detail
-    
-    return payoff - 1.0, ki_occurred, None
+    raw = download_prices(tickers, start, end)
+    if raw is None:
+        return None
+    if monitoring == "low":
+        store = download_ohlc(tickers, start, end)
+        if store is None:
+            return None
+        return align_prices(raw, max_ffill, low=store.frame("Low", [t for t in raw.columns if t in store.data]))
+    return align_prices(raw, max_ffill)
 
-def render_compact_stats(df, els):
-    """HTML 기반의 콤팩트한 통계 대시보드 출력"""
+def render_compact_stats(df, els, ci=None):
+    """HTML 기반의 콤팩트한 통계 대시보드 출력 (ci: 블록 부트스트랩 신뢰구간)"""
     N = len(df)
-    win = (df["return"] >= 0).mean() * 100
-    avg_return = df["return"].mean() * 100
-    median_return = df["return"].median() * 100
-    std = df["return"].std() * 100
+    # 샘플링 발행일이면 weight 열(대표하는 일별 발행일 수)로 가중 (매일 발행이면 모두 1)
+    w = case_weights(df)
+    W = w.sum()
+    ret = df["return"].to_numpy()
+    win = w[ret >= 0].sum() / W * 100
+    avg_return = np.dot(w, ret) / W * 100
+    median_return = weighted_median(ret, w) * 100
     
     ki_n = int(df["ki"].sum())
-    loss_n = int((df["return"] < 0).sum())
+    ki_pct = w[df["ki"].to_numpy()].sum() / W * 100
     min_return = df["return"].min() * 100
     min_date = df.loc[df["return"].idxmin(), "start_date"].strftime("%Y-%m-%d")
     
@@ -364,16 +296,19 @@ def render_compact_stats(df, els):
             <div class="stat-title">상환 성공률</div>
             <div class="stat-value" style="color: {'#00ff88' if win==100 else '#ff4b4b'}">{win:.1f}%</div>
             <div class="stat-sub">총 {N}건</div>
+            <div class="stat-sub">{format_ci(ci, "success_rate")}</div>
         </div>
         <div class="stat-box">
             <div class="stat-title">평균 수익률</div>
             <div class="stat-value">{avg_return:.2f}%</div>
             <div class="stat-sub">중위: {median_return:.2f}%</div>
+            <div class="stat-sub">{format_ci(ci, "avg_return", digits=2)}</div>
         </div>
         <div class="stat-box">
             <div class="stat-title">낙인(KI) 발생</div>
             <div class="stat-value" style="color: {'#ff4b4b' if ki_n > 0 else '#888'}">{ki_n}건</div>
-            <div class="stat-sub">({ki_n/N*100:.1f}%)</div>
+            <div class="stat-sub">({ki_pct:.1f}%)</div>
+            <div class="stat-sub">{format_ci(ci, "ki_rate")}</div>
         </div>
         <div class="stat-box">
             <div class="stat-title">최악의 수익률</div>
@@ -390,16 +325,18 @@ def render_compact_stats(df, els):
     
     # 조기상환
     for i in range(1, len(els.early_levels) + 1):
-        c = int((df["step"] == i).sum())
+        hit = (df["step"] == i).to_numpy()
+        c = int(hit.sum())
         if c > 0: # 0건인 차수는 숨겨서 공간 절약 (원하면 주석 해제)
             cols.append(f"{i}차")
-            vals.append(f"{c}<br><span style='font-size:10px; color:#888'>({c/N*100:.1f}%)</span>")
+            vals.append(f"{c}<br><span style='font-size:10px; color:#888'>({w[hit].sum()/W*100:.1f}%)</span>")
     
     # 만기 상환
-    maturity_n = int(df["step"].isna().sum())
+    at_maturity = df["step"].isna().to_numpy()
+    maturity_n = int(at_maturity.sum())
     if maturity_n > 0:
         cols.append("만기")
-        vals.append(f"{maturity_n}<br><span style='font-size:10px; color:#888'>({maturity_n/N*100:.1f}%)</span>")
+        vals.append(f"{maturity_n}<br><span style='font-size:10px; color:#888'>({w[at_maturity].sum()/W*100:.1f}%)</span>")
         
     # 테이블 HTML 생성
     header_html = "".join([f"<td><div class='dist-header'>{c}</div></td>" for c in cols])
@@ -415,108 +352,34 @@ def render_compact_stats(df, els):
     </div>
     """, unsafe_allow_html=True)
 
-def run_backtest(prices, els, show_progress=False):
-    """백테스트 실행 (캘린더 기반, 익영업일 원칙)"""
-    rows = []
-    
-    # 전체 케이스 수 계산 (progress bar용)
-    total_cases = 0
-    for start_date in prices.index:
-        maturity_date = pd.Timestamp(start_date + relativedelta(months=els.maturity_months))
-        mat_eval = snap_next_trading_day(prices.index, maturity_date)
-        if mat_eval is None:
-            break
-        total_cases += 1
-    
-    # Progress bar
-    if show_progress:
-        progress_bar = st.progress(0)
-        progress_text = st.empty()
-    
-    # 백테스트 실행
-    case_idx = 0
-    for start_date in prices.index:
-        # 만기일 계산 (캘린더 기반)
-        maturity_date = pd.Timestamp(start_date + relativedelta(months=els.maturity_months))
-        
-        # 만기일을 실제 거래일로 스냅 (익영업일 원칙)
-        mat_eval = snap_next_trading_day(prices.index, maturity_date)
-        
-        if mat_eval is None:
-            # 만기일이 데이터 범위를 벗어남
-            break
-        
-        if mat_eval < start_date:
-            # 논리적 오류 (발생 가능성 낮음)
-            continue
-        
-        # 해당 기간 데이터 추출 (정확하게 스냅된 만기일까지)
-        try:
-            window = prices.loc[start_date:mat_eval]
-        except Exception:
-            continue
-        
-        if len(window) < 10:  # 최소 데이터 체크
-            continue
-        
-        try:
-            r, ki, step = simulate_els(window, els, start_date)
-            
-            rows.append({
-                "start_date": start_date,
-                "return": r, 
-                "ki": ki, 
-                "step": step,
-                "year": start_date.year
-            })
-            
-            # Progress 업데이트
-            case_idx += 1
-            if show_progress and case_idx % 10 == 0:  # 10건마다 업데이트
-                progress = case_idx / total_cases
-                progress_bar.progress(progress)
-                progress_text.text(f"백테스트 진행 중... {case_idx}/{total_cases} ({progress*100:.1f}%)")
-                
-        except Exception:
-            # 개별 케이스 오류는 조용히 스킵
-            continue
-    
-    # Progress bar 정리
-    if show_progress:
-        progress_bar.progress(1.0)
-        progress_text.text(f"백테스트 완료! 총 {len(rows)}개 케이스 분석")
-        import time
-        time.sleep(0.5)
-        progress_bar.empty()
-        progress_text.empty()
-    
-    if len(rows) == 0:
-        return None
-    
-    return pd.DataFrame(rows)
-
 # =============================
 # 리포트 생성
 # =============================
-def build_report(df, els):
+def build_report(df, els, ci=None, mc=None):
     N = len(df)
-    win = (df["return"] >= 0).mean() * 100
-    avg_return = df["return"].mean() * 100
-    median_return = df["return"].median() * 100
-    
-    ki_n = int(df["ki"].sum())
-    loss_n = int((df["return"] < 0).sum())
-    ki_recovery = int(((df["ki"]) & (df["return"] >= 0)).sum())
+    # 비율·평균은 케이스 가중치 기준 (샘플링 발행일이면 일별 발행 기준 근사)
+    w = case_weights(df)
+    W = w.sum()
+    ret = df["return"].to_numpy()
+    ki = df["ki"].to_numpy()
+    pct = lambda mask: w[mask].sum() / W * 100
+    win = pct(ret >= 0)
+    avg_return = np.dot(w, ret) / W * 100
+    median_return = weighted_median(ret, w) * 100
+    
+    ki_n = int(ki.sum())
+    loss_n = int((ret < 0).sum())
+    ki_recovery = int((ki & (ret >= 0)).sum())
     
     # 리스크 지표
-    std = df["return"].std() * 100
+    std = weighted_std(ret, w) * 100
     min_return = df["return"].min() * 100
     min_return_date = df.loc[df["return"].idxmin(), "start_date"]
-    loss_10pct = int((df["return"] < -0.1).sum())
-    loss_20pct = int((df["return"] < -0.2).sum())
+    loss_10pct = int((ret < -0.1).sum())
+    loss_20pct = int((ret < -0.2).sum())
     
     lines = [
-        f"■ 통계 분석 결과 (총 {N}건)",
+        f"■ 통계 분석 결과 (총 {N}건{', 발행일 가중' if 'weight' in df.columns else ''})",
         f"  • 상환 성공률   : {win:6.2f} %",
         f"  • 평균 수익률   : {avg_return:6.2f} %",
         f"  • 중위 수익률   : {median_return:6.2f} %",
@@ -525,38 +388,83 @@ def build_report(df, els):
         "[ 리스크 지표 ]",
         f"  • 최소 수익률   : {min_return:6.2f} %",
         f"    └ 발생일      : {min_return_date.date()}",
-        f"  • 10% 이상 손실 : {loss_10pct:4d} ({loss_10pct/N*100:4.1f}%)",
-        f"  • 20% 이상 손실 : {loss_20pct:4d} ({loss_20pct/N*100:4.1f}%)",
+        f"  • 10% 이상 손실 : {loss_10pct:4d} ({pct(ret < -0.1):4.1f}%)",
+        f"  • 20% 이상 손실 : {loss_20pct:4d} ({pct(ret < -0.2):4.1f}%)",
         "",
         "[ 낙인(KI) 발생 현황 ]",
-        f"  • 낙인 발생     : {ki_n:4d} ({ki_n/N*100:4.1f}%)",
-        f"  • 원금 손실 확정 : {loss_n:4d} ({loss_n/N*100:4.1f}%)",
-        f"  • 낙인 후 회복   : {ki_recovery:4d} ({ki_recovery/N*100:4.1f}%)",
+        f"  • 낙인 발생     : {ki_n:4d} ({pct(ki):4.1f}%)",
+        f"  • 원금 손실 확정 : {loss_n:4d} ({pct(ret < 0):4.1f}%)",
+        f"  • 낙인 후 회복   : {ki_recovery:4d} ({pct(ki & (ret >= 0)):4.1f}%)",
         "",
         "[ 상환 차수 분포 ]"
     ]
     
     for i in range(1, len(els.early_levels) + 1):
-        c = int((df["step"] == i).sum())
-        lines.append(f"  • {i}차 조기상환 : {c:4d} ({c/N*100:4.1f}%)")
-    
-    maturity = int(df["step"].isna().sum())
-    lines.append(f"  • 만기상환     : {maturity:4d} ({maturity/N*100:4.1f}%)")
+        hit = (df["step"] == i).to_numpy()
+        lines.append(f"  • {i}차 조기상환 : {int(hit.sum()):4d} ({pct(hit):4.1f}%)")
+    
+    at_maturity = df["step"].isna().to_numpy()
+    lines.append(f"  • 만기상환     : {int(at_maturity.sum()):4d} ({pct(at_maturity):4.1f}%)")
+    
+    # 경로 통계 (run_backtest가 path_stats로 계산한 열이 있을 때만)
+    if "min_worst" in df.columns:
+        drawdown = df["max_drawdown"].to_numpy(dtype=float)
+        days_below = df["days_below_ki"].to_numpy(dtype=float)
+        recovery = df["recovery_days"].to_numpy(dtype=float)
+        recovered = ~np.isnan(recovery)
+        lines += [
+            "",
+            "[ 경로 통계 ]",
+            f"  • 평균 최대 하락률 : {np.dot(w, drawdown) / W * 100:6.2f} %",
+            f"  • 최악 최대 하락률 : {drawdown.max()*100:6.2f} %",
+            f"  • 배리어 최소 여유 : {weighted_median(df['barrier_distance'].to_numpy(dtype=float), w)*100:6.2f} %p (중위)",
+            f"  • 낙인 체류일     : {np.dot(w[ki], days_below[ki]) / w[ki].sum() if ki_n else 0:6.1f} 일 (낙인 케이스 평균)",
+            f"  • 낙인→회복 기간  : {weighted_median(recovery[recovered], w[recovered]) if recovered.any() else float('nan'):6.0f} 일 (중위, {int(recovered.sum())}건)",
+        ]
+
+    # 블록 부트스트랩 신뢰구간 (겹치는 발행 구간의 상관을 반영)
+    if ci is not None:
+        labels = {"success_rate": "상환 성공률", "avg_return": "평균 수익률", "ki_rate": "낙인 비율"}
+        lines += ["", f"[ {ci.attrs['confidence']*100:.0f}% 신뢰구간 (블록 {ci.attrs['block_length']}건, 리샘플 {ci.attrs['n_resamples']}회) ]"]
+        for metric, label in labels.items():
+            row = ci.loc[metric]
+            lines.append(f"  • {label:<10s}: {row['lower']*100:6.2f} ~ {row['upper']*100:6.2f} %")
+
+    # 중요도 샘플링 몬테카를로 꼬리 위험 (희귀 손실 확률)
+    if mc is not None:
+        est = mc.estimates
+        lines += [
+            "",
+            f"[ 몬테카를로 꼬리 위험 ({mc.method}, {mc.n_paths:,}경로, ESS {mc.ess:,.0f}) ]",
+            f"  • 손실 확률     : {est.loc['loss_prob', 'estimate']*100:7.3f} % (± {est.loc['loss_prob', 'std_error']*100:.3f})",
+            f"  • 낙인 확률     : {est.loc['ki_prob', 'estimate']*100:7.3f} % (± {est.loc['ki_prob', 'std_error']*100:.3f})",
+            f"  • 기대 손실     : {est.loc['expected_loss', 'estimate']*100:7.3f} % (± {est.loc['expected_loss', 'std_error']*100:.3f})",
+            f"  • 단순 MC 환산  : {mc.equivalent_paths():,.0f} 경로",
+        ]
     
     return "\n".join(lines)
 
 def build_yearly_report(df):
-    """연도별 성과 분석"""
-    yearly = df.groupby("year").agg({
-        "return": ["mean", "median", "std", "count"],
-        "ki": "sum"
-    }).round(4)
+    """연도별 성과 분석 (평균·중위·변동성·성공률은 케이스 가중, 샘플 수·낙인 발생은 건수)"""
+    w = case_weights(df)
+    rows = {}
+    for year, idx in df.groupby("year").indices.items():
+        ret = df["return"].to_numpy()[idx]
+        wy = w[idx]
+        rows[year] = {
+            "평균 수익률": np.dot(wy, ret) / wy.sum(),
+            "중위 수익률": weighted_median(ret, wy),
+            "변동성": weighted_std(ret, wy) if len(idx) > 1 else np.nan,
+            "샘플 수": len(idx),
+            "낙인 발생": int(df["ki"].to_numpy()[idx].sum()),
+            "상환 성공률(%)": wy[ret >= 0].sum() / wy.sum() * 100,
+        }
+    yearly = pd.DataFrame.from_dict(rows, orient="index").rename_axis("year")
     
-    yearly.columns = ["평균 수익률", "중위 수익률", "변동성", "샘플 수", "낙인 발생"]
     yearly["평균 수익률"] = (yearly["평균 수익률"] * 100).round(2)
     yearly["중위 수익률"] = (yearly["중위 수익률"] * 100).round(2)
     yearly["변동성"] = (yearly["변동성"] * 100).round(2)
-    yearly["상환 성공률(%)"] = df.groupby("year").apply(lambda x: (x["return"] >= 0).mean() * 100).round(2)
+    yearly["상환 성공률(%)"] = yearly["상환 성공률(%)"].round(2)
     
     return yearly
 
@@ -564,20 +472,23 @@ def build_yearly_report(df):
 # 시각화
 # =============================
 def plot_return_distribution(df):
-    """수익률 분포 히스토그램"""
+    """수익률 분포 히스토그램 (케이스 가중 빈도)"""
     fig = go.Figure()
     
     returns_pct = df["return"] * 100
+    w = case_weights(df)
     
     fig.add_trace(go.Histogram(
         x=returns_pct,
+        y=w,
+        histfunc="sum",
         nbinsx=50,
         name="Return Distribution",
         marker_color="rgba(99, 110, 250, 0.7)",
-        hovertemplate="Return: %{x:.2f}%<br>Count: %{y}<extra></extra>"
+        hovertemplate="Return: %{x:.2f}%<br>Count: %{y:.0f}<extra></extra>"
     ))
     
-    avg = returns_pct.mean()
+    avg = np.dot(w, returns_pct) / w.sum()
     fig.add_vline(x=avg, line_dash="dash", line_color="red", 
                   annotation_text=f"평균: {avg:.2f}%", annotation_position="top")
     
@@ -596,9 +507,11 @@ def plot_return_distribution(df):
     return fig
 
 def plot_yearly_performance(df):
-    """연도별 성과"""
-    yearly_avg = df.groupby("year")["return"].mean() * 100
-    yearly_win = df.groupby("year").apply(lambda x: (x["return"] >= 0).mean() * 100)
+    """연도별 성과 (케이스 가중 평균 수익률·상환 성공률)"""
+    w = pd.Series(case_weights(df), index=df.index)
+    by_year = w.groupby(df["year"]).sum()
+    yearly_avg = (df["return"] * w).groupby(df["year"]).sum() / by_year * 100
+    yearly_win = w[df["return"] >= 0].groupby(df["year"]).sum().reindex(by_year.index, fill_value=0) / by_year * 100
     
     fig = go.Figure()
     
@@ -639,12 +552,14 @@ def plot_step_distribution(df, els):
     step_counts = []
     labels = []
     
+    # 케이스 가중 건수 (샘플링 발행일이면 일별 발행 기준 근사)
+    w = case_weights(df)
     for i in range(1, len(els.early_levels) + 1):
-        count = (df["step"] == i).sum()
+        count = w[(df["step"] == i).to_numpy()].sum()
         step_counts.append(count)
         labels.append(f"{i}차")
     
-    maturity_count = df["step"].isna().sum()
+    maturity_count = w[df["step"].isna().to_numpy()].sum()
     step_counts.append(maturity_count)
     labels.append("만기")
     
@@ -652,9 +567,9 @@ def plot_step_distribution(df, els):
         labels=labels,
         values=step_counts,
         hole=0.4,
-        marker=dict(colors=px.colors.qualitative.Set3),
+        marker=dict(colors=qualitative.Set3),
         textinfo='label+percent',
-        hovertemplate="<b>%{label}</b><br>횟수: %{value}<br>비율: %{percent}<extra></extra>"
+        hovertemplate="<b>%{label}</b><br>횟수: %{value:,.0f}<br>비율: %{percent}<extra></extra>"
     )])
     
     fig.update_layout(
@@ -669,6 +584,7 @@ def plot_single_case_path(detail, start_date):
     """
     [수정] 낙인 여부와 상관없이 'Worst-of' 라인을 항상 그려서
     만기 시점의 진짜 수익률 위치를 시각적으로 확인하도록 개선
+    (라인은 Scattergl + 다운샘플링, 낙인/상환 마커는 원본 값 그대로 표시)
     """
     fig = go.Figure()
     
@@ -677,13 +593,32 @@ def plot_single_case_path(detail, start_date):
     ki_level = detail["ki_level"] * 100
     
     asset_paths = detail.get("asset_paths", {})
+
+    # 마커 위치는 다운샘플링 후에도 라인 위에 정확히 남도록 고정
+    keep = []
+    ki_idx = None
+    redemption_idx = None
+    if detail["ki_touched"] and detail["ki_touch_date"]:
+        try:
+            ki_idx = dates.index(detail["ki_touch_date"])
+            keep.append(ki_idx)
+        except ValueError:
+            pass
+    try:
+        redemption_idx = dates.index(detail["redemption_date"])
+        keep.append(redemption_idx)
+    except ValueError:
+        pass
+
+    dates_arr = np.asarray(dates)
     
     # 1. 개별 자산들 흐리게 그리기 (배경)
     colors = ['#FFA07A', '#98FB98', '#87CEFA'] # 연한 색상들
     for i, (name, path) in enumerate(asset_paths.items()):
-        path_pct = [x * 100 for x in path]
-        fig.add_trace(go.Scatter(
-            x=dates, y=path_pct,
+        path_pct = np.asarray(path) * 100
+        idx = downsample_indices(path_pct, keep=keep)
+        fig.add_trace(go.Scattergl(
+            x=dates_arr[idx], y=path_pct[idx],
             mode='lines',
             name=name,
             line=dict(width=1, dash='dot'), # 점선으로 얇게
@@ -691,14 +626,28 @@ def plot_single_case_path(detail, start_date):
         ))
 
     # 2. Worst-of 라인 (진한 파란색) - 이것이 진짜 내 돈의 운명
-    fig.add_trace(go.Scatter(
-        x=dates, y=worst_path,
+    worst_arr = np.asarray(worst_path)
+    idx = downsample_indices(worst_arr, keep=keep)
+    fig.add_trace(go.Scattergl(
+        x=dates_arr[idx], y=worst_arr[idx],
         mode='lines',
         name='Worst-of (평가 기준)',
         line=dict(color='white', width=3), # 흰색 굵은 실선 (다크모드용)
         hovertemplate="<b>Worst-of</b><br>날짜: %{x}<br>성과: %{y:.2f}%<extra></extra>"
     ))
     
+    # 장중 저가 관측이면 낙인 판정에 쓰인 저가 worst-of도 표시
+    ki_path = np.asarray(detail.get("ki_path", detail["worst_path"]), dtype=float) * 100
+    if detail.get("monitoring") == "low":
+        idx = downsample_indices(np.nan_to_num(ki_path, nan=100.0), keep=keep)
+        fig.add_trace(go.Scattergl(
+            x=dates_arr[idx], y=ki_path[idx],
+            mode='lines',
+            name='Worst-of 장중 저가 (낙인 관측)',
+            line=dict(color='#ff6b6b', width=1),
+            hovertemplate="<b>저가 Worst-of</b><br>날짜: %{x}<br>성과: %{y:.2f}%<extra></extra>"
+        ))
+
     # 3. 낙인 배리어
     fig.add_hline(
         y=ki_level, line_dash="dash", line_color="red", line_width=2,
@@ -709,27 +658,21 @@ def plot_single_case_path(detail, start_date):
     fig.add_hline(y=100, line_color="gray", line_width=1)
     
     # 5. 낙인 발생 지점 (X 표시)
-    if detail["ki_touched"] and detail["ki_touch_date"]:
-        ki_date = detail["ki_touch_date"]
-        try:
-            ki_idx = dates.index(ki_date)
-            ki_val = worst_path[ki_idx]
-            fig.add_trace(go.Scatter(
-                x=[ki_date], y=[ki_val],
-                mode='markers',
-                name='낙인 발생',
-                marker=dict(color='red', size=12, symbol='x-open', line=dict(width=3)),
-            ))
-        except: pass
+    if ki_idx is not None:
+        ki_date = dates[ki_idx]
+        ki_val = ki_path[ki_idx]
+        fig.add_trace(go.Scatter(
+            x=[ki_date], y=[ki_val],
+            mode='markers',
+            name='낙인 발생',
+            marker=dict(color='red', size=12, symbol='x-open', line=dict(width=3)),
+        ))
         
     # 6. 상환 지점 (별표)
-    redemption_date = detail["redemption_date"]
-    try:
-        redemption_idx = dates.index(redemption_date)
+    if redemption_idx is not None:
+        redemption_date = dates[redemption_idx]
         redemption_val = worst_path[redemption_idx]
         
-        # 만기 시점의 Worst 값이 낙인 배리어보다 높은지 낮은지 확인
-        is_happy_ending = (redemption_val >= ki_level) if detail["ki_touched"] else True
         # ※ 주의: 낙인을 이미 터치했다면, 만기 때 조기상환 배리어(보통 70~80)를 넘어야 함.
         # 시각적 편의를 위해 수익(+)이면 초록, 손실(-)이면 빨강으로 표시
         final_return = redemption_val - 100
@@ -743,7 +686,6 @@ def plot_single_case_path(detail, start_date):
             textposition="top center",
             marker=dict(color=marker_color, size=15, symbol='star'),
         ))
-    except: pass
 
     fig.update_layout(
         title=f"케이스 상세: {start_date.date()} 발행 (Worst-of 기준)",
@@ -753,6 +695,539 @@ def plot_single_case_path(detail, start_date):
     
     return fig
 
+def plot_price_history(prices):
+    """
+    기초자산 가격 차트 (Scattergl + 다운샘플링)
+    평균 가격이 3배 이상 차이나면 Y축을 좌/우로 분리
+    """
+    fig = go.Figure()
+    index = prices.index.values
+
+    # 가격 범위 계산
+    price_ranges = {}
+    for col in prices.columns:
+        avg_price = prices[col].mean()
+        price_ranges[col] = avg_price
+
+    # 최대/최소 가격
+    max_price = max(price_ranges.values())
+    min_price = min(price_ranges.values())
+    ratio = max_price / min_price if min_price > 0 else 1
+
+    def add_price_trace(col, **kwargs):
+        values = prices[col].values
+        idx = downsample_indices(values)
+        fig.add_trace(go.Scattergl(
+            x=index[idx],
+            y=values[idx],
+            mode='lines',
+            hovertemplate=f"{col}<br>날짜: %{{x}}<br>가격: %{{y:,.2f}}<extra></extra>",
+            **kwargs
+        ))
+
+    # 비율이 3배 이상 차이나면 Y축 분리
+    if ratio > 3.0 and len(prices.columns) > 1:
+        # 중간값 기준으로 분리
+        threshold = (max_price + min_price) / 2
+
+        y1_cols = [col for col, price in price_ranges.items() if price >= threshold]
+        y2_cols = [col for col, price in price_ranges.items() if price < threshold]
+
+        # Y1 축 데이터 (고가)
+        for col in y1_cols:
+            add_price_trace(col, name=f"{col} (좌)", yaxis='y1')
+
+        # Y2 축 데이터 (저가)
+        for col in y2_cols:
+            add_price_trace(col, name=f"{col} (우)", yaxis='y2', line=dict(dash='dot'))
+
+        fig.update_layout(
+            title="기초자산 가격",
+            xaxis_title="날짜",
+            yaxis=dict(
+                title=f"가격",
+                side="left"
+            ),
+            yaxis2=dict(
+                title=f"가격",
+                side="right",
+                overlaying="y"
+            ),
+            height=400,
+            template="plotly_dark",
+            hovermode="x unified",
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            )
+        )
+    else:
+        # 비슷한 가격대 - Y축 1개만 사용
+        for col in prices.columns:
+            add_price_trace(col, name=col)
+
+        fig.update_layout(
+            title="기초자산 가격",
+            xaxis_title="날짜",
+            yaxis_title="가격",
+            height=400,
+            template="plotly_dark",
+            hovermode="x unified"
+        )
+
+    return fig
+
+SURFACE_LABELS = {
+    "loss_prob": "손실 확률 (%)",
+    "avg_return": "평균 수익률 (%)",
+    "ki_rate": "낙인 비율 (%)",
+}
+
+def plot_sensitivity_heatmap(surface, metric):
+    """KI × 쿠폰 민감도 히트맵"""
+    frame = surface.frame(metric) * 100
+    fig = go.Figure(go.Heatmap(
+        z=frame.values,
+        x=frame.columns,
+        y=frame.index,
+        colorscale="RdYlGn_r" if metric != "avg_return" else "RdYlGn",
+        colorbar=dict(title="%"),
+        hovertemplate="쿠폰: %{x:.1f}%<br>KI: %{y:.0f}%<br>값: %{z:.2f}%<extra></extra>"
+    ))
+    fig.update_layout(
+        title=f"KI × 쿠폰 민감도: {SURFACE_LABELS[metric]}",
+        xaxis_title="제시 수익률 (연 %)",
+        yaxis_title="낙인 배리어 (%)",
+        height=450,
+        template="plotly_dark"
+    )
+    return fig
+
+def plot_sensitivity_slice(x, y, metric, x_title, marker_x):
+    """민감도 곡면 단면 (선택 지점 표시)"""
+    fig = go.Figure(go.Scatter(
+        x=x, y=y, mode="lines",
+        line=dict(width=2, color="#4facfe"),
+        hovertemplate=f"{x_title}: %{{x:.1f}}<br>{SURFACE_LABELS[metric]}: %{{y:.2f}}<extra></extra>"
+    ))
+    fig.add_vline(x=marker_x, line_dash="dash", line_color="orange")
+    fig.update_layout(
+        xaxis_title=x_title, yaxis_title=SURFACE_LABELS[metric],
+        height=300, template="plotly_dark", margin=dict(t=30), showlegend=False
+    )
+    return fig
+
+def plot_hedge_pnl(frame, weights):
+    """발행사 손익 분포: 헤지 없음 vs 델타 헤지 (비용 차감, 케이스 가중 빈도)"""
+    fig = go.Figure()
+    for name, values, color in [
+        ("헤지 없음", (1.0 - frame["payoff"]) * 100, "rgba(250, 110, 99, 0.6)"),
+        ("델타 헤지", frame["issuer_pnl"] * 100, "rgba(79, 172, 254, 0.7)"),
+    ]:
+        fig.add_trace(go.Histogram(
+            x=values, y=weights, histfunc="sum", nbinsx=60, name=name, marker_color=color,
+            hovertemplate=f"{name}<br>손익: %{{x:.2f}}%<br>빈도: %{{y:.0f}}<extra></extra>"
+        ))
+    fig.add_vline(x=0, line_dash="dot", line_color="white")
+    fig.update_layout(
+        barmode="overlay", xaxis_title="발행사 손익 (액면 대비 %)", yaxis_title="빈도",
+        height=380, template="plotly_dark", margin=dict(t=30)
+    )
+    return fig
+
+REGIME_LABELS = {
+    "avg_return": "평균 수익률 (%)",
+    "success_rate": "상환 성공률 (%)",
+    "loss_prob": "손실 확률 (%)",
+    "ki_rate": "낙인 비율 (%)",
+    "min_return": "최저 수익률 (%)",
+}
+
+def regime_bucket_labels(table, kind):
+    """국면 구간 표시 이름 (변동성은 %, 상관은 계수)"""
+    if kind == "vol":
+        return [f"{lo*100:.1f}~{hi*100:.1f}%" for lo, hi in zip(table["lower"], table["upper"])]
+    return [f"{lo:.2f}~{hi:.2f}" for lo, hi in zip(table["lower"], table["upper"])]
+
+def plot_regime_bars(table, metric, kind, feature_label):
+    """국면 구간별 지표 막대 (구간별 케이스 수 표시)"""
+    labels = regime_bucket_labels(table, kind)
+    fig = go.Figure(go.Bar(
+        x=labels, y=table[metric] * 100,
+        text=[f"{n}건" for n in table["n_cases"]], textposition="outside",
+        marker_color="#4facfe",
+        hovertemplate=f"{feature_label}: %{{x}}<br>{REGIME_LABELS[metric]}: %{{y:.2f}}<extra></extra>"
+    ))
+    fig.update_layout(
+        xaxis_title=f"발행 직전 {feature_label} 구간", yaxis_title=REGIME_LABELS[metric],
+        height=350, template="plotly_dark", margin=dict(t=30), showlegend=False
+    )
+    return fig
+
+@st.fragment
+def render_analysis_tabs(result):
+    """
+    분석 탭 영역
+    st.fragment로 분리해 탭 전환·지표 선택·슬라이더 조작 시 입력 패널, 데이터 확인,
+    요약 통계는 다시 실행하지 않음 (백테스트 실행 시에만 전체 재실행)
+    """
+    df = result['df']
+    prices = result['prices']
+    els = result['els']
+    start = result.get('start')
+    end = result.get('end')
+
+    # 차트들
+    selected_tab = st.radio(
+        "분석 항목 선택",
+        options=["📊 수익률 분포", "📈 연도별 성과", "🥧 상환 차수", "📋 연도별 테이블", "🔍 케이스 분석", "🌡️ 민감도 분석", "🧪 스트레스 테스트", "🌦️ 시장 국면", "🛡️ 발행사 헤지", "🧭 바스켓 스크리너"],
+        horizontal=True,
+        key="selected_tab_radio",
+        label_visibility="collapsed"
+    )
+    
+    if selected_tab == "📊 수익률 분포":
+        st.plotly_chart(get_cached_figure("distribution", plot_return_distribution, df), use_container_width=True)
+    
+    elif selected_tab == "📈 연도별 성과":
+        st.plotly_chart(get_cached_figure("yearly", plot_yearly_performance, df), use_container_width=True)
+    
+    elif selected_tab == "🥧 상환 차수":
+        st.plotly_chart(get_cached_figure("steps", plot_step_distribution, df, els), use_container_width=True)
+    
+    elif selected_tab == "📋 연도별 테이블":
+        yearly_report = build_yearly_report(df)
+        st.dataframe(yearly_report, use_container_width=True)
+    
+    elif selected_tab == "🔍 케이스 분석":
+        st.markdown("### 🔍 특정 발행일 케이스 분석")
+        st.markdown('<div class="debug-highlight">', unsafe_allow_html=True)
+        st.caption("특정 날짜에 발행된 ELS의 전체 경로를 분석합니다. 낙인 터치 시점, 조기상환/만기상환 여부 등을 확인할 수 있습니다.")
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        # 백테스트가 이미 평가한 발행일 색인 (빠른 선택·탐색은 재시뮬레이션 없이 조회)
+        cases = get_case_index(result)
+        
+        # 빠른 선택 옵션
+        col1, col2 = st.columns([1, 1])
+        
+        with col1:
+            quick_select = st.selectbox(
+                "빠른 선택",
+                options=["첫 번째 날짜", "최대 손실 케이스", "최초 KI 케이스", "케이스 탐색", "직접 입력"],
+                index=0,
+                key="quick_select_case"
+            )
+        
+        # 빠른 선택에 따라 케이스 행 결정 (-1이면 날짜 직접 입력)
+        row = -1
+        selected_date = None
+        if quick_select == "첫 번째 날짜":
+            row = 0
+        elif quick_select == "최대 손실 케이스":
+            row = cases.worst_loss()
+        elif quick_select == "최초 KI 케이스":
+            row = cases.first_ki()
+        elif quick_select == "케이스 탐색":
+            row = 0
+            if len(cases) > 1:
+                with col2:
+                    row = st.slider("케이스 번호 (발행일 순)", 1, len(cases), 1, key="case_browse") - 1
+        
+        if row < 0:  # 직접 입력 (해당 케이스가 없는 빠른 선택 포함)
+            with col2:
+                # 연-월-일 분리 입력
+                date_col1, date_col2, date_col3 = st.columns(3)
+                
+                # 사용 가능한 연도 범위
+                min_year = df["start_date"].min().year
+                max_year = df["start_date"].max().year
+                
+                year = date_col1.number_input(
+                    "연도",
+                    min_value=min_year,
+                    max_value=max_year,
+                    value=2021,
+                    step=1,
+                    key="input_year"
+                )
+                
+                month = date_col2.number_input(
+                    "월",
+                    min_value=1,
+                    max_value=12,
+                    value=2,
+                    step=1,
+                    key="input_month"
+                )
+                
+                day = date_col3.number_input(
+                    "일",
+                    min_value=1,
+                    max_value=31,
+                    value=1,
+                    step=1,
+                    key="input_day"
+                )
+                
+                try:
+                    selected_date = pd.Timestamp(year=year, month=month, day=day)
+                except:
+                    st.error("유효하지 않은 날짜입니다.")
+                    selected_date = cases.start_dates[0]
+            row = cases.locate(selected_date)
+        
+        if row < 0:
+            st.warning(
+                f"선택한 날짜({selected_date.date()}) 이후에 평가된 발행 케이스가 없습니다. "
+                f"(마지막 발행일: {cases.start_dates[-1].date()})"
+            )
+        else:
+            start_eval = cases.start_dates[row]
+            st.info(f"📅 선택된 발행일: **{start_eval.date()}** ({row + 1} / {len(cases)})")
+            if selected_date is not None and start_eval != selected_date:
+                st.caption(f"💡 {selected_date.date()}는 평가된 발행일이 아니므로 다음 발행일({start_eval.date()})로 분석합니다.")
+            
+            try:
+                r, ki, step, detail = cases.detail(get_path_index(result), row)
+                
+                # 결과 요약
+                st.markdown("#### 📋 케이스 요약")
+                col1, col2, col3, col4 = st.columns(4)
+                
+                col1.metric("수익률", f"{r*100:+.2f}%")
+                col2.metric("낙인 터치", "예" if ki else "아니오", delta="Recovery" if (ki and r >= 0) else None)
+                col3.metric("상환 방식", f"{step}차 조기" if step else "만기")
+                col4.metric("상환일", str(detail["redemption_date"].date()))
+                
+                if detail["ki_touched"]:
+                    st.warning(f"⚠️ 낙인 터치: {detail['ki_touch_date'].date()} (최저 {np.nanmin(detail['ki_path'])*100:.2f}%)")
+                
+                # 경로 차트 (케이스를 넘겨 봐도 캐시가 쌓이지 않도록 직전 케이스 차트만 보관)
+                cache = st.session_state.figure_cache
+                for key in [k for k in cache if isinstance(k, tuple) and k[0] == "case" and k[1] != start_eval]:
+                    del cache[key]
+                st.plotly_chart(get_cached_figure(("case", start_eval), plot_single_case_path, detail, start_eval), use_container_width=True)
+            except Exception as e:
+                st.error(f"케이스 조회 오류: {str(e)}")
+                import traceback
+                st.code(traceback.format_exc())
+
+    elif selected_tab == "🌡️ 민감도 분석":
+        st.markdown("### 🌡️ KI × 쿠폰 민감도")
+        st.caption(
+            "현재 기초자산·만기·상환 기준으로 낙인 배리어와 제시 수익률을 바꿨을 때의 결과입니다. "
+            "백테스트 한 번의 발행일별 최저 worst-of와 상환 차수로 계산하므로 다시 실행할 필요가 없습니다."
+        )
+        from sensitivity import COUPON_GRID, KI_GRID, sensitivity_surface
+        if result.get('sensitivity') is None:
+            result['sensitivity'] = sensitivity_surface(df, els)
+        surface = result['sensitivity']
+
+        metric = st.selectbox(
+            "지표", list(SURFACE_LABELS), format_func=SURFACE_LABELS.get, key="surface_metric"
+        )
+        st.plotly_chart(
+            get_cached_figure(("surface", metric), plot_sensitivity_heatmap, surface, metric),
+            use_container_width=True
+        )
+
+        ki_pct = np.round(KI_GRID * 100).astype(int)
+        coupon_pct = np.round(COUPON_GRID * 100, 1)
+        sc1, sc2 = st.columns(2)
+        sel_ki = sc1.slider(
+            "낙인 배리어 (%)", int(ki_pct[0]), int(ki_pct[-1]),
+            int(np.clip(round(els.knock_in * 100), ki_pct[0], ki_pct[-1])), 1, key="surface_ki"
+        )
+        sel_coupon = sc2.slider(
+            "제시 수익률 (연 %)", float(coupon_pct[0]), float(coupon_pct[-1]),
+            float(np.clip(round(els.coupon_annual * 200) / 2, coupon_pct[0], coupon_pct[-1])), 0.5,
+            key="surface_coupon"
+        )
+        point = surface.at(sel_ki / 100.0, sel_coupon / 100.0)
+        mc1, mc2, mc3 = st.columns(3)
+        mc1.metric("손실 확률", f"{point['loss_prob'] * 100:.2f}%")
+        mc2.metric("평균 수익률", f"{point['avg_return'] * 100:.2f}%")
+        mc3.metric("낙인 비율", f"{point['ki_rate'] * 100:.2f}%")
+
+        frame = surface.frame(metric) * 100
+        lc1, lc2 = st.columns(2)
+        lc1.plotly_chart(get_cached_figure(
+            ("surface_slice", metric, "ki", sel_ki, sel_coupon), plot_sensitivity_slice,
+            frame.columns, frame.loc[float(sel_ki)].values, metric, "제시 수익률 (연 %)", sel_coupon
+        ), use_container_width=True)
+        lc2.plotly_chart(get_cached_figure(
+            ("surface_slice", metric, "coupon", sel_coupon, sel_ki), plot_sensitivity_slice,
+            frame.index, frame[float(sel_coupon)].values, metric, "낙인 배리어 (%)", sel_ki
+        ), use_container_width=True)
+
+    elif selected_tab == "🧪 스트레스 테스트":
+        st.markdown("### 🧪 위기 구간 스트레스 테스트")
+        st.caption("위기 직전 구간에 발행됐다면 어땠을지 현재 구조와 대표 구조를 함께 평가합니다. 분석 기간 밖의 시나리오는 비어 있습니다.")
+
+        from montecarlo import calibrate_gbm, run_monte_carlo
+        from stress import SHELF_PRESETS, STRESS_SCENARIOS, run_stress
+        structures = {"현재 구조": els, **SHELF_PRESETS}
+        if result.get('stress') is None:
+            result['stress'] = run_stress(prices, structures, path_index=get_path_index(result))
+        stress = result['stress']
+
+        metric_labels = {
+            "avg_return": "평균 수익률 (%)",
+            "min_return": "최저 수익률 (%)",
+            "loss_prob": "손실 확률 (%)",
+            "ki_rate": "낙인 비율 (%)",
+            "recovery_days": "낙인 후 회복 기간 (일, 중앙값)",
+            "n_cases": "발행 케이스 수",
+        }
+        metric = st.selectbox("지표", list(metric_labels), format_func=metric_labels.get, key="stress_metric")
+        matrix = stress[metric].unstack("structure").reindex(index=list(STRESS_SCENARIOS), columns=list(structures))
+        if metric in ("avg_return", "min_return", "loss_prob", "ki_rate"):
+            matrix = (matrix * 100).round(2)
+        st.dataframe(matrix, use_container_width=True)
+
+        st.markdown("#### 🎲 몬테카를로 꼬리 위험")
+        st.caption(
+            "분석 기간 일별 수익률로 추정한 상관 GBM(드리프트 0)에서 지금 발행한다고 보고 손실 확률을 추정합니다. "
+            "낙인 쪽으로 이동한 측도에서 경로를 뽑고 우도비로 보정하는 중요도 샘플링이라 "
+            "백테스트에 손실 케이스가 거의 없는 보수적 구조도 적은 경로로 추정할 수 있습니다."
+        )
+        if st.button("꼬리 위험 추정", key="run_tail_mc"):
+            with st.spinner("시뮬레이션 중..."):
+                result['mc'] = run_monte_carlo(calibrate_gbm(prices, drift=0.0), els, start=prices.index[-1],
+                                             exchanges=result.get('exchanges', ()))
+        mc = result.get('mc')
+        if mc is not None:
+            est = mc.estimates
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("손실 확률", f"{est.loc['loss_prob', 'estimate']*100:.3f}%",
+                      f"± {est.loc['loss_prob', 'std_error']*100:.3f}%p", delta_color="off")
+            c2.metric("낙인 확률", f"{est.loc['ki_prob', 'estimate']*100:.3f}%",
+                      f"± {est.loc['ki_prob', 'std_error']*100:.3f}%p", delta_color="off")
+            c3.metric("유효 표본 수 (ESS)", f"{mc.ess:,.0f}", f"{mc.n_paths:,}경로", delta_color="off")
+            c4.metric("단순 MC 환산 경로", f"{mc.equivalent_paths():,.0f}", delta_color="off")
+
+    elif selected_tab == "🌦️ 시장 국면":
+        st.markdown("### 🌦️ 발행 시점 시장 국면별 성과")
+        st.caption(
+            "발행일까지의 후행 창으로 계산한 바스켓 평균 변동성(연율)과 자산 간 평균 상관으로 "
+            "발행 케이스를 분위 구간으로 나눠 성과를 비교합니다. 창이 다 차지 않은 초기 발행일은 제외됩니다."
+        )
+        from regimes import REGIME_WINDOWS, attach_regimes, regime_table
+        features = get_regime_features(result)
+        kinds = {"vol": "변동성"}
+        if prices.shape[1] > 1:
+            kinds["corr"] = "상관"
+        rc1, rc2, rc3, rc4 = st.columns(4)
+        kind = rc1.selectbox("국면 특성", list(kinds), format_func=kinds.get, key="regime_kind")
+        window = rc2.selectbox("후행 창 (거래일)", list(REGIME_WINDOWS), index=1, key="regime_window")
+        n_buckets = rc3.selectbox("구간 수", [2, 3, 4, 5], index=1, key="regime_buckets")
+        metric = rc4.selectbox("지표", list(REGIME_LABELS), format_func=REGIME_LABELS.get, key="regime_metric")
+
+        feature = f"{kind}_{window}"
+        table = regime_table(attach_regimes(df, features), feature, n_buckets)
+        feature_label = f"{window}일 {kinds[kind]}"
+        st.plotly_chart(
+            get_cached_figure(("regime", feature, n_buckets, metric), plot_regime_bars, table, metric, kind, feature_label),
+            use_container_width=True
+        )
+        view = table.copy()
+        view.index = regime_bucket_labels(table, kind)
+        for col in ("success_rate", "avg_return", "min_return", "loss_prob", "ki_rate"):
+            view[col] = (view[col] * 100).round(2)
+        st.dataframe(
+            view.drop(columns=["lower", "upper"]).rename(columns={
+                "n_cases": "케이스 수", "success_rate": "상환 성공률 (%)", "avg_return": "평균 수익률 (%)",
+                "min_return": "최저 수익률 (%)", "loss_prob": "손실 확률 (%)", "ki_rate": "낙인 비율 (%)",
+            }).rename_axis(feature_label),
+            use_container_width=True
+        )
+
+    elif selected_tab == "🛡️ 발행사 헤지":
+        st.markdown("### 🛡️ 발행사 델타 헤지 손익")
+        st.caption(
+            "발행한 노트마다 매일 종가에 worst-of 자산으로 델타 헤지했을 때의 발행사 손익입니다 (액면 1, 이자율 0). "
+            "델타는 (관측일까지 남은 기간, worst-of 수준, 낙인 여부) 가격 격자에서 조회하는 1요인 근사입니다."
+        )
+        from hedging import DEFAULT_COST_BPS, hedge_backtest, hedge_summary, hedge_vol
+        hc1, hc2 = st.columns(2)
+        vol_pct = hc1.number_input(
+            "격자 변동성 (%)", min_value=5.0, max_value=100.0,
+            value=round(hedge_vol(prices) * 100, 1), step=0.5, key="hedge_vol",
+            help="기본값은 분석 기간 자산별 변동성 중 최대값"
+        )
+        cost_bps = hc2.number_input("거래 비용 (bp)", min_value=0.0, max_value=100.0,
+                                    value=DEFAULT_COST_BPS, step=1.0, key="hedge_cost")
+        hedge_key = (vol_pct, cost_bps)
+        hedges = result.setdefault('hedge', {})   # (변동성, 비용)별 결과 (탭을 오가도 재계산 없음)
+        if hedge_key not in hedges:
+            with st.spinner("헤지 백테스트 중..."):
+                hedges[hedge_key] = hedge_backtest(get_path_index(result), get_case_index(result), els,
+                                                   vol=vol_pct / 100, cost_bps=cost_bps)
+        frame = hedges[hedge_key]
+        weights = case_weights(df.sort_values("start_date"))   # 헤지 결과는 발행일 순 (CaseIndex)
+        summary = hedge_summary(frame, weights)
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("격자 발행 가치", f"{frame['model_value'].iloc[0]*100:.2f}%")
+        m2.metric("헤지 없음 손익", f"{summary.loc['unhedged', 'mean']*100:+.2f}%",
+                  f"σ {summary.loc['unhedged', 'std']*100:.2f}%p", delta_color="off")
+        m3.metric("델타 헤지 손익", f"{summary.loc['hedged', 'mean']*100:+.2f}%",
+                  f"σ {summary.loc['hedged', 'std']*100:.2f}%p", delta_color="off")
+        m4.metric("평균 거래 비용", f"{summary.loc['costs', 'mean']*100:.2f}%",
+                  f"회전율 {np.average(frame['turnover'], weights=weights):.1f}배", delta_color="off")
+        st.plotly_chart(get_cached_figure(("hedge",) + hedge_key, plot_hedge_pnl, frame, weights),
+                        use_container_width=True)
+
+        # 연도별 가중 평균 (샘플링 발행일이면 일별 발행 기준 근사)
+        cols = ["unhedged", "issuer_pnl", "hedge_error", "costs"]
+        year = frame.index.year
+        weighted = frame.assign(unhedged=1.0 - frame["payoff"])[cols].mul(weights, axis=0)
+        yearly = weighted.groupby(year).sum().div(pd.Series(weights).groupby(year).sum().to_numpy(), axis=0) * 100
+        st.dataframe(
+            yearly.round(2).rename(columns={
+                "unhedged": "헤지 없음 (%)", "issuer_pnl": "델타 헤지 (%)",
+                "hedge_error": "복제 오차 (%)", "costs": "거래 비용 (%)",
+            }).rename_axis("발행 연도"),
+            use_container_width=True
+        )
+
+    elif selected_tab == "🧭 바스켓 스크리너":
+        st.markdown("### 🧭 기초자산 조합 스크리너")
+        st.caption(
+            f"현재 구조로 {len(ASSETS)}개 자산의 1~3개 조합 전체를 같은 기간에 백테스트해 "
+            "손실 확률 · 낙인 비율 · 평균 수익률 순으로 정렬합니다. "
+            "모든 조합이 하나의 합집합 캘린더를 공유하므로 개별 백테스트와 평가일이 하루 이틀 다를 수 있습니다."
+        )
+
+        if result.get('screener') is None and st.button("전체 조합 스크리닝 실행", key="run_screener"):
+            with st.spinner("유니버스 데이터 다운로드 및 스크리닝 중..."):
+                universe = load_aligned_prices(
+                    [a["ticker"] for a in ASSETS], start, end,
+                    result.get('max_ffill', DEFAULT_MAX_FFILL)
+                )
+                if universe is None:
+                    st.error("유니버스 데이터를 가져올 수 없습니다.")
+                else:
+                    from screener import screen_baskets
+                    frame = universe.frame.rename(columns={a["ticker"]: a["name"] for a in ASSETS})
+                    result['screener'] = screen_baskets(frame, els)
+
+        ranked = result.get('screener')
+        if ranked is not None:
+            display = ranked.copy()
+            for col in ["loss_prob", "avg_return", "min_return", "ki_rate"]:
+                display[col] = (display[col] * 100).round(2)
+            display = display.rename(columns={
+                "basket": "기초자산", "n_assets": "자산 수", "n_cases": "케이스 수",
+                "loss_prob": "손실 확률(%)", "avg_return": "평균 수익률(%)",
+                "min_return": "최저 수익률(%)", "ki_rate": "낙인 비율(%)",
+            })
+            st.dataframe(display, use_container_width=True, hide_index=True)
+
 # =============================
 # UI
 # =============================
@@ -834,13 +1309,57 @@ with left:
 
     lookback = st.slider("과거 데이터 분석 기간 (년)", 3, 25, 15)
 
+    max_ffill = st.number_input(
+        "결측 허용 일수",
+        min_value=0,
+        max_value=20,
+        value=DEFAULT_MAX_FFILL,
+        step=1,
+        help="휴장 등으로 가격이 빈 구간을 직전 종가로 채우는 최대 연속 거래일 수 (0이면 모든 자산이 거래된 날만 사용)"
+    )
+
+    from fx import FX_MODES
+    fx_mode = st.radio(
+        "통화 구조",
+        options=list(FX_MODES),
+        format_func={"quanto": "퀀토 (현지 통화 수익률)", "compo": "콤포 (원화 환산 수익률)"}.get,
+        horizontal=True,
+        key="fx_mode",
+        help="콤포는 해외 기초자산 가격에 원화 환율을 곱해 환율 변동까지 반영합니다."
+    )
+
+    monitoring = st.radio(
+        "낙인 관측",
+        options=list(MONITORING_MODES),
+        format_func={"close": "종가", "low": "장중 저가 (연속 관측)"}.get,
+        horizontal=True,
+        key="monitoring",
+        help="장중 저가는 발행일 다음 거래일부터 매일 저가로 낙인을 판정합니다 (조기상환·만기 평가는 종가)."
+    )
+
+    sampling = st.selectbox(
+        "발행일 샘플링",
+        options=list(SAMPLING_MODES),
+        format_func={"daily": "매일", "weekly": "매주 (첫 거래일)", "monthly": "매월 (첫 거래일)", "calendar": "발행 캘린더 파일"}.get,
+        key="sampling",
+        help="매주/매월은 샘플 발행일만 평가하고, 각 샘플이 대표하는 일별 발행일 수로 가중해 통계를 냅니다."
+    )
+    issue_dates = None
+    if sampling == "calendar":
+        calendar_file = st.file_uploader("발행일 CSV (첫 열: 발행일)", type=["csv"], key="issue_calendar")
+        if calendar_file is not None:
+            try:
+                issue_dates = pd.to_datetime(pd.read_csv(calendar_file).iloc[:, 0]).dropna()
+            except (ValueError, IndexError) as e:
+                st.error(f"발행일 파일을 읽을 수 없습니다: {e}")
+
     st.markdown("</div>", unsafe_allow_html=True)
 
     run = st.button(
         "백테스트 실행하기",
         type="primary",
         use_container_width=True,
-        disabled=(len(selected) == 0)
+        disabled=(len(selected) == 0 or (sampling == "calendar" and issue_dates is None))
     )
 
 with right:
@@ -866,20 +1385,47 @@ with right:
         </div>
         """, unsafe_allow_html=True)
 
+        # 오늘 발행 가정 시 평가 일정 (거래소 휴장일 캘린더 기준, 가격 데이터 불필요)
+        with st.expander("📅 오늘 발행 시 평가 일정", expanded=False):
+            from calendars import forward_schedule
+            exchanges = tuple(sorted({a["exchange"] for a in selected}))
+            obs_days, maturity_day = forward_schedule(
+                pd.Timestamp(date.today()), int(maturity), int(obs), exchanges
+            )
+            schedule = pd.DataFrame({
+                "평가일": [d.date() for d in obs_days],
+                "상환 기준(%)": [int(x * 100) for x in early_levels[:len(obs_days)]],
+            }, index=[f"{i+1}차" for i in range(len(obs_days))])
+            st.caption(f"공동 영업일 기준 거래소: {', '.join(exchanges)} · 만기 평가일 {maturity_day.date()}")
+            st.dataframe(schedule, use_container_width=True)
+
     if run:
+        from fx import compo_basket, fx_tickers
         tickers = [a["ticker"] for a in selected]
         names = [a["name"] for a in selected]
+        currencies = [a["currency"] for a in selected]
+        # 환율도 기초자산과 같은 다운로드 캐시·캘린더 정렬로 함께 받음
+        download = tickers + (fx_tickers(currencies) if fx_mode == "compo" else [])
 
         end = date.today()
         start = date(end.year - lookback, end.month, end.day)
 
         with st.spinner("Downloading data..."):
-            prices = download_prices(tickers, start, end)
+            aligned = load_aligned_prices(download, start, end, int(max_ffill), monitoring)
+            lows = None
+            try:
+                prices = compo_basket(aligned, tickers, currencies, fx_mode) if aligned is not None else None
+                if prices is not None and monitoring == "low":
+                    lows = compo_basket(aligned, tickers, currencies, fx_mode, field="low").set_axis(names, axis=1)
+            except ValueError as e:
+                st.error(str(e))
+                prices = None
             
         if prices is None or prices.empty:
             st.error("데이터를 가져올 수 없습니다. 티커를 확인하거나 기간을 조정해주세요.")
         else:
-            prices.columns = names
+            prices = prices.set_axis(names, axis=1)
+            gap_report = aligned.gap_report.rename(index=dict(zip(tickers, names)))
 
             els = StepDownELS(
                 maturity_months=maturity,
@@ -891,7 +1437,9 @@ with right:
 
             with st.spinner("Running backtest..."):
                 try:
-                    df = run_backtest(prices, els, show_progress=True)
+                    path_index = PathIndex(prices, lows=lows)
+                    df = run_backtest(prices, els, path_index=path_index,
+                                      sampling=sampling, issue_dates=issue_dates)
                 except Exception as e:
                     st.error(f"백테스트 실행 중 오류: {str(e)}")
                     import traceback
@@ -903,11 +1451,20 @@ with right:
                 st.session_state.backtest_result = {
                     'df': df,
                     'prices': prices,
+                    'path_index': path_index,
+                    'gap_report': gap_report,
+                    'max_ffill': int(max_ffill),
+                    'fx_mode': fx_mode,
+                    'sampling': sampling,
+                    'lows': lows,
+                    'monitoring': monitoring,
                     'els': els,
+                    'exchanges': tuple(sorted({a["exchange"] for a in selected})),
                     'maturity': maturity,
                     'start': start,
                     'end': end
                 }
+                st.session_state.figure_cache = {}
     
     # Session State에서 결과 불러오기
     if st.session_state.backtest_result is not None:
@@ -926,96 +1483,15 @@ with right:
                         st.write(f"**요청 기간**: {start} ~ {end}")
                     st.write(f"**실제 기간**: {prices.index[0].date()} ~ {prices.index[-1].date()}")
                     st.write(f"**총 거래일**: {len(prices)}일")
+                    if result.get('fx_mode') == "compo":
+                        st.write("**통화 구조**: 콤포 (가격 × 원화 환율로 환산한 값)")
+                    if result.get('monitoring') == "low":
+                        st.write("**낙인 관측**: 장중 저가 (수정 비율 적용 OHLC)")
+                    if result.get('sampling', "daily") != "daily":
+                        st.write(f"**발행일 샘플링**: {result['sampling']} · 평가 {len(df)}건 (가중치 합 {case_weights(df).sum():.0f}일)")
                     
                     # 실제 가격 차트만 표시 (비율 기준 Y축 분리)
-                    fig = go.Figure()
-                    
-                    # 가격 범위 계산
-                    price_ranges = {}
-                    for col in prices.columns:
-                        avg_price = prices[col].mean()
-                        price_ranges[col] = avg_price
-                    
-                    # 최대/최소 가격
-                    max_price = max(price_ranges.values())
-                    min_price = min(price_ranges.values())
-                    ratio = max_price / min_price if min_price > 0 else 1
-                    
-                    # 비율이 3배 이상 차이나면 Y축 분리
-                    if ratio > 3.0 and len(prices.columns) > 1:
-                        # 중간값 기준으로 분리
-                        threshold = (max_price + min_price) / 2
-                        
-                        y1_cols = [col for col, price in price_ranges.items() if price >= threshold]
-                        y2_cols = [col for col, price in price_ranges.items() if price < threshold]
-                        
-                        # Y1 축 데이터 (고가)
-                        for col in y1_cols:
-                            fig.add_trace(go.Scatter(
-                                x=prices.index,
-                                y=prices[col],
-                                mode='lines',
-                                name=f"{col} (좌)",
-                                yaxis='y1',
-                                hovertemplate=f"{col}<br>날짜: %{{x}}<br>가격: %{{y:,.2f}}<extra></extra>"
-                            ))
-                        
-                        # Y2 축 데이터 (저가)
-                        for col in y2_cols:
-                            fig.add_trace(go.Scatter(
-                                x=prices.index,
-                                y=prices[col],
-                                mode='lines',
-                                name=f"{col} (우)",
-                                yaxis='y2',
-                                line=dict(dash='dot'),
-                                hovertemplate=f"{col}<br>날짜: %{{x}}<br>가격: %{{y:,.2f}}<extra></extra>"
-                            ))
-                        
-                        fig.update_layout(
-                            title="기초자산 가격",
-                            xaxis_title="날짜",
-                            yaxis=dict(
-                                title=f"가격",
-                                side="left"
-                            ),
-                            yaxis2=dict(
-                                title=f"가격",
-                                side="right",
-                                overlaying="y"
-                            ),
-                            height=400,
-                            template="plotly_dark",
-                            hovermode="x unified",
-                            legend=dict(
-                                orientation="h",
-                                yanchor="bottom",
-                                y=1.02,
-                                xanchor="right",
-                                x=1
-                            )
-                        )
-                    else:
-                        # 비슷한 가격대 - Y축 1개만 사용
-                        for col in prices.columns:
-                            fig.add_trace(go.Scatter(
-                                x=prices.index,
-                                y=prices[col],
-                                mode='lines',
-                                name=col,
-                                hovertemplate=f"{col}<br>날짜: %{{x}}<br>가격: %{{y:,.2f}}<extra></extra>"
-                            ))
-                        
-                        fig.update_layout(
-                            title="기초자산 가격",
-                            xaxis_title="날짜",
-                            yaxis_title="가격",
-                            height=400,
-                            template="plotly_dark",
-                            hovermode="x unified"
-                        )
-                    
-                    st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(get_cached_figure("prices", plot_price_history, prices), use_container_width=True)
                     
                     # 통계 테이블
                     stats = pd.DataFrame({
@@ -1026,143 +1502,30 @@ with right:
                         "수익률(%)": ((prices.iloc[-1] / prices.iloc[0] - 1) * 100).round(2)
                     })
                     st.dataframe(stats)
+
+                    # 결측 구간 리포트
+                    gap_report = result.get('gap_report')
+                    if gap_report is not None and not gap_report.empty:
+                        unfilled = int((~gap_report["filled"]).sum())
+                        st.write(f"**결측 구간**: {len(gap_report)}건 (한도 초과로 제외된 구간 {unfilled}건)")
+                        st.dataframe(
+                            gap_report.rename(columns={
+                                "start": "시작일", "end": "종료일", "length": "거래일 수",
+                                "trailing": "최근 구간", "filled": "직전값 채움"
+                            }).rename_axis("자산"),
+                            use_container_width=True
+                        )
                 
                 # 통계 리포트
-                render_compact_stats(df, els)
-                
-                # 차트들 - on_change로 탭 위치 저장
-                selected_tab = st.radio(
-                    "분석 항목 선택",
-                    options=["📊 수익률 분포", "📈 연도별 성과", "🥧 상환 차수", "📋 연도별 테이블", "🔍 케이스 분석"],
-                    horizontal=True,
-                    key="selected_tab_radio",
-                    label_visibility="collapsed"
-                )
-                
-                if selected_tab == "📊 수익률 분포":
-                    st.plotly_chart(plot_return_distribution(df), use_container_width=True)
+                render_compact_stats(df, els, get_bootstrap_ci(result))
                 
-                elif selected_tab == "📈 연도별 성과":
-                    st.plotly_chart(plot_yearly_performance(df), use_container_width=True)
-                
-                elif selected_tab == "🥧 상환 차수":
-                    st.plotly_chart(plot_step_distribution(df, els), use_container_width=True)
-                
-                elif selected_tab == "📋 연도별 테이블":
-                    yearly_report = build_yearly_report(df)
-                    st.dataframe(yearly_report, use_container_width=True)
-                
-                elif selected_tab == "🔍 케이스 분석":
-                    st.markdown("### 🔍 특정 발행일 케이스 분석")
-                    st.markdown('<div class="debug-highlight">', unsafe_allow_html=True)
-                    st.caption("특정 날짜에 발행된 ELS의 전체 경로를 분석합니다. 낙인 터치 시점, 조기상환/만기상환 여부 등을 확인할 수 있습니다.")
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    # 빠른 선택 옵션
-                    col1, col2 = st.columns([1, 1])
-                    
-                    with col1:
-                        quick_select = st.selectbox(
-                            "빠른 선택",
-                            options=["첫 번째 날짜", "최대 손실 케이스", "최초 KI 케이스", "직접 입력"],
-                            index=0,
-                            key="quick_select_case"
-                        )
-                    
-                    # 빠른 선택에 따라 날짜 결정
-                    if quick_select == "첫 번째 날짜":
-                        selected_date = df["start_date"].iloc[0]
-                    elif quick_select == "최대 손실 케이스" and len(df[df["return"] < 0]) > 0:
-                        worst_case = df.loc[df["return"].idxmin()]
-                        selected_date = worst_case["start_date"]
-                    elif quick_select == "최초 KI 케이스" and len(df[df["ki"]]) > 0:
-                        selected_date = df[df["ki"]]["start_date"].iloc[0]
-                    else:  # 직접 입력
-                        with col2:
-                            # 연-월-일 분리 입력
-                            date_col1, date_col2, date_col3 = st.columns(3)
-                            
-                            # 사용 가능한 연도 범위
-                            min_year = df["start_date"].min().year
-                            max_year = df["start_date"].max().year
-                            
-                            year = date_col1.number_input(
-                                "연도",
-                                min_value=min_year,
-                                max_value=max_year,
-                                value=2021,
-                                step=1,
-                                key="input_year"
-                            )
-                            
-                            month = date_col2.number_input(
-                                "월",
-                                min_value=1,
-                                max_value=12,
-                                value=2,
-                                step=1,
-                                key="input_month"
-                            )
-                            
-                            day = date_col3.number_input(
-                                "일",
-                                min_value=1,
-                                max_value=31,
-                                value=1,
-                                step=1,
-                                key="input_day"
-                            )
-                            
-                            try:
-                                selected_date = pd.Timestamp(year=year, month=month, day=day)
-                            except:
-                                st.error("유효하지 않은 날짜입니다.")
-                                selected_date = df["start_date"].iloc[0]
-                    
-                    # 선택된 날짜 표시
-                    st.info(f"📅 선택된 발행일: **{selected_date.date()}**")
-                    
-                    # 선택된 날짜로 시뮬레이션
-                    # 발행일을 실제 거래일로 스냅
-                    start_eval = snap_next_trading_day(prices.index, selected_date)
-                    
-                    if start_eval is None:
-                        st.warning(f"선택한 날짜({selected_date.date()}) 이후에 거래일이 없습니다.")
-                    else:
-                        if start_eval != selected_date:
-                            st.caption(f"💡 {selected_date.date()}는 거래일이 아니므로 다음 거래일({start_eval.date()})로 분석합니다.")
-                        
-                        maturity_date = pd.Timestamp(start_eval + relativedelta(months=maturity))
-                        mat_eval = snap_next_trading_day(prices.index, maturity_date)
-                        
-                        if mat_eval is None:
-                            st.warning(f"만기일({maturity_date.date()})이 데이터 범위를 벗어납니다.")
-                        else:
-                            try:
-                                window = prices.loc[start_eval:mat_eval]
-                                
-                                r, ki, step, detail = simulate_els(window, els, start_eval, return_detail=True)
-                                
-                                # 결과 요약
-                                st.markdown("#### 📋 케이스 요약")
-                                col1, col2, col3, col4 = st.columns(4)
-                                
-                                col1.metric("수익률", f"{r*100:+.2f}%")
-                                col2.metric("낙인 터치", "예" if ki else "아니오", delta="Recovery" if (ki and r >= 0) else None)
-                                col3.metric("상환 방식", f"{step}차 조기" if step else "만기")
-                                col4.metric("상환일", str(detail["redemption_date"].date()))
-                                
-                                if detail["ki_touched"]:
-                                    st.warning(f"⚠️ 낙인 터치: {detail['ki_touch_date'].date()} (최저 {min(detail['worst_path'])*100:.2f}%)")
-                                
-                                # 경로 차트
-                                st.plotly_chart(plot_single_case_path(detail, start_eval), use_container_width=True)
-                            except Exception as e:
-                                st.error(f"시뮬레이션 오류: {str(e)}")
-                                import traceback
-                                st.code(traceback.format_exc())
+                # 분석 탭 (fragment: 탭 안의 위젯 조작은 이 영역만 다시 실행)
+                render_analysis_tabs(result)
         else:
             st.error("백테스트 결과가 없습니다.")
     else:
 
         st.info("왼쪽에서 조건을 설정하고 실행하세요.")
+
+# 첫 화면을 그린 뒤 무거운 import를 백그라운드에서 미리 수행 (첫 백테스트 클릭 지연 방지)
+start_warmup()
@@ -0,0 +1,553 @@
+"""
+전체 상품 재백테스트 배치 실행기 (Streamlit 비의존 모듈)
+
+야간 배치처럼 (바스켓 × 구조 × 분석 기간) 조합이 많은 작업을 멱등 태스크로 나눠
+작업 큐에 넣고, 여러 워커(여러 노드 가능)가 태스크를 가져가 실행한다.
+
+- 태스크: (바스켓, 분석 기간, 구조 청크) 하나. 태스크 ID는 내용 해시라 다시 제출해도 중복되지 않음
+- 큐: 기본은 로컬 SQLite 파일 큐, 선택적으로 Redis 호환 큐 (pip install redis)
+  태스크는 리스(lease)로 가져가고 실행 중에는 주기적으로 연장하며,
+  워커가 죽어 리스가 만료되면 다른 워커가 다시 가져감
+- 가격: 공유 가격 저장소(정렬된 합집합 캘린더 가격 Parquet)를 워커마다 한 번 읽어 캐시
+- 결과: basket=…/lookback=…/chunk=<청크 번호>-<태스크 ID>.parquet 로 파티션된 Parquet.
+  임시 파일에 쓴 뒤 교체하므로 중간에 죽어도 반쯤 쓴 파일이 남지 않고,
+  같은 태스크(같은 ID)의 결과 파일이 이미 있으면 계산을 건너뜀 (재시작/재제출 시 이어서 실행).
+  기준일·구조 조건·구조 구성이 바뀌면 ID가 달라져 다시 계산하고, 같은 청크 번호의 이전 결과는 지움
+
+사용 예:
+  python batch.py submit job.json --queue sqlite:///runs/queue.db
+  python batch.py worker --queue sqlite:///runs/queue.db           # 노드/프로세스마다 실행
+  python batch.py local job.json --workers 4                         # 로컬 워커 프로세스로 전체 실행
+  python batch.py status --queue sqlite:///runs/queue.db
+
+job.json 예:
+  {
+    "prices": "store/universe.parquet",
+    "output": "results",
+    "baskets": [["S&P500", "KOSPI"], ["S&P500", "HSCEI", "EURO50"]],
+    "structures": {"3Y 90-85 KI45": {"maturity_months": 36, "obs_interval_months": 6,
+                   "early_levels": [0.9, 0.9, 0.85, 0.85, 0.8, 0.75], "coupon_annual": 0.07, "knock_in": 0.45}},
+    "lookbacks": [10, 15],
+    "as_of": "2025-01-02",
+    "chunk_size": 64
+  }
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from engine import PathIndex, StepDownELS, build_schedule, evaluate, result_frame
+
+DEFAULT_QUEUE = "sqlite:///batch_queue.db"
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_LEASE_SECONDS = 60      # 워커가 실행 중 lease_seconds / 3 간격으로 연장
+DEFAULT_MAX_ATTEMPTS = 3
+LEASE_EXPIRED_ERROR = "리스 만료 (워커 비정상 종료 반복, 재시도 한도 초과)"
+
+RESULT_COLUMNS = ["structure", "start_date", "return", "ki", "step", "year"]
+
+
+# =============================
+# 태스크
+# =============================
+def task_id(task):
+    """태스크 내용 해시 (같은 작업은 항상 같은 ID → 멱등 제출)"""
+    return hashlib.sha1(json.dumps(task, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+
+
+def expand_job(job):
+    """
+    작업 명세 → 태스크 목록 (바스켓 × 분석 기간 × 구조 청크)
+    태스크에 구조 정의를 그대로 담아 워커는 큐와 가격 저장소만 있으면 실행 가능
+    """
+    names = sorted(job["structures"])
+    chunk_size = int(job.get("chunk_size", DEFAULT_CHUNK_SIZE))
+    chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+    tasks = []
+    for basket in job["baskets"]:
+        for lookback in job["lookbacks"]:
+            for c, chunk in enumerate(chunks):
+                tasks.append({
+                    "prices": job["prices"],
+                    "output": job["output"],
+                    "as_of": job.get("as_of"),
+                    "backend": job.get("backend", "auto"),
+                    "basket": list(basket),
+                    "lookback": int(lookback),
+                    "chunk": c,
+                    "structures": {n: job["structures"][n] for n in chunk},
+                })
+    return tasks
+
+
+def output_path(task):
+    """
+    태스크 결과 파일 경로 (hive 파티션: basket / lookback / chunk)
+    파일 이름에 태스크 ID를 넣어 내용이 바뀐 태스크가 이전 결과를 재사용하지 않도록 함
+    """
+    basket = quote("+".join(task["basket"]), safe="+")
+    return os.path.join(
+        task["output"], f"basket={basket}", f"lookback={task['lookback']}",
+        f"chunk={task['chunk']:05d}-{task_id(task)}.parquet",
+    )
+
+
+def _remove_stale(path, chunk):
+    """같은 파티션·청크 번호의 다른 태스크 ID 결과(이전 제출분) 삭제 → 데이터셋에 중복 행이 남지 않음"""
+    folder, name = os.path.split(path)
+    prefix = f"chunk={chunk:05d}-"
+    for other in os.listdir(folder):
+        if other.startswith(prefix) and other.endswith(".parquet") and other != name:
+            try:
+                os.remove(os.path.join(folder, other))
+            except FileNotFoundError:
+                pass
+
+
+def _temp_path(path):
+    """같은 폴더의 숨김 임시 파일 (Parquet 데이터셋 읽기에서 제외되는 '.' 접두사)"""
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.tmp-{os.getpid()}")
+
+
+# =============================
+# 가격 저장소
+# =============================
+def save_price_store(frame, path):
+    """정렬된 가격(열=자산, 합집합 캘린더, 결측은 NaN)을 공유 저장소에 기록"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = _temp_path(path)
+    frame.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=4)
+def load_price_store(path):
+    """공유 가격 저장소 읽기 (워커 프로세스당 한 번)"""
+    return pd.read_parquet(path)
+
+
+@lru_cache(maxsize=16)
+def basket_path_index(path, basket, lookback, as_of):
+    """
+    바스켓 × 분석 기간 PathIndex (같은 바스켓의 다른 구조 청크가 재사용)
+    모든 자산 가격이 있는 행만 사용 (market_data.AlignedPrices.basket과 같은 규칙)
+    """
+    frame = load_price_store(path)
+    missing = [a for a in basket if a not in frame.columns]
+    if missing:
+        raise KeyError(f"가격 저장소에 없는 자산입니다: {', '.join(missing)}")
+    end = pd.Timestamp(as_of) if as_of else frame.index[-1]
+    start = end - pd.DateOffset(years=lookback)
+    sub = frame.loc[start:end, list(basket)]
+    sub = sub[~np.isnan(sub.values).any(axis=1)]
+    return PathIndex(sub)
+
+
+def run_task(task):
+    """
+    태스크 실행 → 결과 Parquet 경로
+    같은 태스크 ID의 결과 파일이 이미 있으면 계산하지 않음 (멱등)
+    """
+    path = output_path(task)
+    if os.path.exists(path):
+        return path
+
+    path_index = basket_path_index(task["prices"], tuple(task["basket"]), task["lookback"], task["as_of"])
+    structures = {name: StepDownELS(**spec) for name, spec in task["structures"].items()}
+
+    # 만기/평가주기가 같은 구조끼리 스케줄을 공유해 한 번에 평가
+    groups = {}
+    for name, els in structures.items():
+        groups.setdefault((els.maturity_months, els.obs_interval_months), []).append(name)
+
+    frames = []
+    for (maturity, interval), names in groups.items():
+        schedule = build_schedule(path_index, maturity, interval)
+        if len(schedule) == 0:
+            continue
+        result = evaluate(path_index, schedule, [structures[n] for n in names], backend=task["backend"])
+        for j, name in enumerate(names):
+            df = result_frame(path_index, schedule, result, j)
+            df.insert(0, "structure", name)
+            frames.append(df)
+
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+    # 파일마다 스키마가 같아야 파티션 전체를 한 데이터셋으로 읽을 수 있음
+    out = out[RESULT_COLUMNS].astype({"return": float, "ki": bool, "step": float, "year": np.int64})
+    out["start_date"] = pd.to_datetime(out["start_date"])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = _temp_path(path)
+    out.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    _remove_stale(path, task["chunk"])
+    return path
+
+
+def load_results(output):
+    """파티션 결과 전체 읽기 (basket, lookback 열 포함)"""
+    return pd.read_parquet(output)
+
+
+# =============================
+# 작업 큐
+# =============================
+class SQLiteQueue:
+    """
+    로컬 SQLite 파일 큐 (같은 머신의 여러 워커 프로세스용)
+
+    상태: pending → running(리스) → done / failed
+    리스가 만료된 running 태스크는 다시 가져갈 수 있음 (워커 비정상 종료 복구)
+    단, 시도 횟수가 max_attempts에 이르렀으면 실패 처리 (워커를 반복해서 죽이는 태스크가 무한 재시도되지 않도록)
+    """
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                """CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )"""
+            )
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            yield con
+        finally:
+            con.close()
+
+    def put(self, tasks):
+        """태스크 등록 (이미 있는 ID는 무시) → 새로 등록된 개수"""
+        rows = [(task_id(t), json.dumps(t, sort_keys=True)) for t in tasks]
+        with self._connect() as con:
+            before = con.total_changes
+            con.execute("BEGIN IMMEDIATE")
+            con.executemany("INSERT OR IGNORE INTO tasks (id, body) VALUES (?, ?)", rows)
+            con.execute("COMMIT")
+            return con.total_changes - before
+
+    def claim(self, worker):
+        """대기 중이거나 리스가 만료된 태스크 하나를 리스로 가져감 → (id, task) 또는 None"""
+        now = time.time()
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            con.execute(
+                """UPDATE tasks SET status = 'failed', lease_until = NULL, error = ?
+                   WHERE status = 'running' AND lease_until < ? AND attempts >= ?""",
+                (LEASE_EXPIRED_ERROR, now, self.max_attempts),
+            )
+            row = con.execute(
+                """SELECT id, body FROM tasks
+                   WHERE status = 'pending' OR (status = 'running' AND lease_until < ?)
+                   ORDER BY rowid LIMIT 1""",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                con.execute(
+                    "UPDATE tasks SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker, now + self.lease_seconds, row[0]),
+                )
+            con.execute("COMMIT")
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def renew(self, tid, worker):
+        """실행 중 리스 연장 (다른 워커가 이미 가져갔으면 무시)"""
+        with self._connect() as con:
+            con.execute(
+                "UPDATE tasks SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, tid, worker),
+            )
+
+    def complete(self, tid, worker):
+        """완료 기록 (결과 파일은 멱등이므로 리스가 다른 워커로 넘어갔어도 완료로 봄)"""
+        with self._connect() as con:
+            con.execute("UPDATE tasks SET status = 'done', lease_until = NULL, error = NULL WHERE id = ?", (tid,))
+
+    def fail(self, tid, worker, error):
+        """실패 기록, 재시도 한도 전이면 다시 대기열로 (리스를 가진 워커일 때만)"""
+        with self._connect() as con:
+            con.execute(
+                """UPDATE tasks SET lease_until = NULL, error = ?,
+                   status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END
+                   WHERE id = ? AND worker = ? AND status = 'running'""",
+                (error, self.max_attempts, tid, worker),
+            )
+
+    def counts(self):
+        """상태별 태스크 수"""
+        with self._connect() as con:
+            return dict(con.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+
+class RedisQueue:
+    """
+    Redis 호환 큐 (여러 노드의 워커용, pip install redis)
+
+    {name}:tasks   해시 id → 태스크 JSON
+    {name}:pending 리스트 (대기열)
+    {name}:leases  정렬 집합 id → 리스 만료 시각
+    {name}:status / {name}:attempts / {name}:errors / {name}:workers 해시
+    등록·가져가기·만료 리스 회수·완료·실패는 Lua 스크립트로 원자적으로 처리
+    """
+
+    _PUT = """
+    if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then return 0 end
+    redis.call('HSET', KEYS[2], ARGV[1], 'pending')
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+    return 1
+    """
+
+    _REQUEUE = """
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    for _, id in ipairs(ids) do
+        redis.call('ZREM', KEYS[1], id)
+        if tonumber(redis.call('HGET', KEYS[4], id) or '0') >= tonumber(ARGV[2]) then
+            redis.call('HSET', KEYS[2], id, 'failed')
+            redis.call('HSET', KEYS[5], id, ARGV[3])
+        else
+            redis.call('HSET', KEYS[2], id, 'pending')
+            redis.call('RPUSH', KEYS[3], id)
+        end
+    end
+    return #ids
+    """
+
+    _CLAIM = """
+    local id = redis.call('LPOP', KEYS[1])
+    if not id then return nil end
+    redis.call('ZADD', KEYS[2], ARGV[1], id)
+    redis.call('HSET', KEYS[3], id, 'running')
+    redis.call('HINCRBY', KEYS[4], id, 1)
+    redis.call('HSET', KEYS[5], id, ARGV[2])
+    return id
+    """
+
+    # 완료: 리스 해제 + 대기열에 남은 같은 ID 제거 (결과가 있으므로 다시 실행할 필요 없음)
+    _COMPLETE = """
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    redis.call('LREM', KEYS[3], 0, ARGV[1])
+    redis.call('HSET', KEYS[2], ARGV[1], 'done')
+    return 1
+    """
+
+    # 실패: 지금 리스를 가진 워커일 때만 (만료 후 회수·재배정된 태스크를 두 번 넣지 않음)
+    _FAIL = """
+    if redis.call('HGET', KEYS[6], ARGV[1]) ~= ARGV[2] then return 0 end
+    if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then return 0 end
+    redis.call('HSET', KEYS[5], ARGV[1], ARGV[3])
+    if tonumber(redis.call('HGET', KEYS[4], ARGV[1]) or '0') >= tonumber(ARGV[4]) then
+        redis.call('HSET', KEYS[2], ARGV[1], 'failed')
+    else
+        redis.call('HSET', KEYS[2], ARGV[1], 'pending')
+        redis.call('RPUSH', KEYS[3], ARGV[1])
+    end
+    return 1
+    """
+
+    def __init__(self, url, name="els-batch", lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.keys = {k: f"{name}:{k}" for k in
+                     ("tasks", "pending", "leases", "status", "attempts", "errors", "workers")}
+        self._claim = self.client.register_script(self._CLAIM)
+        self._put = self.client.register_script(self._PUT)
+        self._requeue = self.client.register_script(self._REQUEUE)
+        self._complete = self.client.register_script(self._COMPLETE)
+        self._fail = self.client.register_script(self._FAIL)
+
+    def put(self, tasks):
+        """태스크 등록 (이미 있는 ID는 무시, 태스크·상태·대기열 기록은 한 스크립트로) → 새로 등록된 개수"""
+        keys = [self.keys["tasks"], self.keys["status"], self.keys["pending"]]
+        added = 0
+        for t in tasks:
+            added += int(self._put(keys=keys, args=[task_id(t), json.dumps(t, sort_keys=True)]))
+        return added
+
+    def _requeue_expired(self):
+        """만료 리스 회수: 재시도 한도 전이면 대기열로, 한도에 이르렀으면 실패 처리"""
+        self._requeue(
+            keys=[self.keys["leases"], self.keys["status"], self.keys["pending"],
+                  self.keys["attempts"], self.keys["errors"]],
+            args=[time.time(), self.max_attempts, LEASE_EXPIRED_ERROR],
+        )
+
+    def claim(self, worker):
+        self._requeue_expired()
+        tid = self._claim(
+            keys=[self.keys["pending"], self.keys["leases"], self.keys["status"], self.keys["attempts"],
+                  self.keys["workers"]],
+            args=[time.time() + self.lease_seconds, worker],
+        )
+        if tid is None:
+            return None
+        return tid, json.loads(self.client.hget(self.keys["tasks"], tid))
+
+    def renew(self, tid, worker):
+        # XX: 리스가 남아 있을 때만 갱신 (만료되어 다시 대기열에 들어간 태스크는 건드리지 않음)
+        self.client.zadd(self.keys["leases"], {tid: time.time() + self.lease_seconds}, xx=True)
+
+    def complete(self, tid, worker):
+        self._complete(keys=[self.keys["leases"], self.keys["status"], self.keys["pending"]], args=[tid])
+
+    def fail(self, tid, worker, error):
+        self._fail(
+            keys=[self.keys["leases"], self.keys["status"], self.keys["pending"],
+                  self.keys["attempts"], self.keys["errors"], self.keys["workers"]],
+            args=[tid, worker, error, self.max_attempts],
+        )
+
+    def counts(self):
+        out = {}
+        for status in self.client.hvals(self.keys["status"]):
+            out[status] = out.get(status, 0) + 1
+        return out
+
+
+def open_queue(url=DEFAULT_QUEUE, **kwargs):
+    """큐 URL → 큐 객체 (sqlite:///경로 또는 redis://호스트:포트/DB)"""
+    if url.startswith("sqlite:///"):
+        return SQLiteQueue(url[len("sqlite:///"):], **kwargs)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisQueue(url, **kwargs)
+    raise ValueError(f"지원하지 않는 큐 URL입니다: {url} (sqlite:///… 또는 redis://…)")
+
+
+# =============================
+# 워커
+# =============================
+def _heartbeat(queue, tid, worker, stop):
+    """태스크 실행 중 리스 연장 (워커가 살아 있는 동안만)"""
+    while not stop.wait(queue.lease_seconds / 3):
+        queue.renew(tid, worker)
+
+
+def run_worker(queue_url=DEFAULT_QUEUE, worker=None, max_tasks=None, poll_seconds=1.0, exit_when_idle=True,
+               lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    큐에서 태스크를 가져와 실행하는 워커 루프 → 처리한 태스크 수
+    exit_when_idle: 대기·실행 중인 태스크가 모두 없으면 종료 (아니면 계속 대기)
+    """
+    queue = open_queue(queue_url, lease_seconds=lease_seconds)
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    while max_tasks is None or processed < max_tasks:
+        claimed = queue.claim(worker)
+        if claimed is None:
+            counts = queue.counts()
+            if exit_when_idle and not counts.get("pending") and not counts.get("running"):
+                break
+            time.sleep(poll_seconds)
+            continue
+        tid, task = claimed
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(queue, tid, worker, stop), daemon=True)
+        heartbeat.start()
+        try:
+            run_task(task)
+        except Exception as e:
+            queue.fail(tid, worker, f"{type(e).__name__}: {e}")
+        else:
+            queue.complete(tid, worker)
+        finally:
+            stop.set()
+            heartbeat.join()
+        processed += 1
+    return processed
+
+
+def submit(job, queue_url=DEFAULT_QUEUE):
+    """작업 제출 → (전체 태스크 수, 새로 등록된 수)"""
+    tasks = expand_job(job)
+    return len(tasks), open_queue(queue_url).put(tasks)
+
+
+def run_local(job, workers=None, queue_url=None):
+    """
+    로컬 워커 프로세스로 작업 전체 실행 → 상태별 태스크 수
+    큐 기본값은 결과 폴더 안의 SQLite 파일 (같은 명령을 다시 실행하면 남은 태스크만 처리)
+    """
+    os.makedirs(job["output"], exist_ok=True)
+    queue_url = queue_url or f"sqlite:///{os.path.join(job['output'], '_queue.db')}"
+    submit(job, queue_url)
+    workers = workers or os.cpu_count() or 1
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=run_worker, args=(queue_url,)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return open_queue(queue_url).counts()
+
+
+def _load_job(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ELS 전체 상품 배치 백테스트")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("submit", help="작업을 큐에 등록")
+    p.add_argument("job")
+    p.add_argument("--queue", default=DEFAULT_QUEUE)
+
+    p = sub.add_parser("worker", help="큐에서 태스크를 가져와 실행")
+    p.add_argument("--queue", default=DEFAULT_QUEUE)
+    p.add_argument("--max-tasks", type=int)
+    p.add_argument("--wait", action="store_true", help="큐가 비어도 종료하지 않고 대기")
+    p.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="태스크 리스 (초)")
+
+    p = sub.add_parser("local", help="로컬 워커 프로세스로 전체 실행")
+    p.add_argument("job")
+    p.add_argument("--workers", type=int)
+    p.add_argument("--queue")
+
+    p = sub.add_parser("status", help="상태별 태스크 수")
+    p.add_argument("--queue", default=DEFAULT_QUEUE)
+
+    args = parser.parse_args(argv)
+    if args.command == "submit":
+        total, added = submit(_load_job(args.job), args.queue)
+        print(f"태스크 {total}개 중 {added}개 새로 등록")
+    elif args.command == "worker":
+        n = run_worker(args.queue, max_tasks=args.max_tasks, exit_when_idle=not args.wait, lease_seconds=args.lease)
+        print(f"태스크 {n}개 처리")
+    elif args.command == "local":
+        t0 = time.perf_counter()
+        counts = run_local(_load_job(args.job), args.workers, args.queue)
+        print(f"{counts} ({time.perf_counter() - t0:.1f}초)")
+    else:
+        print(open_queue(args.queue).counts())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+블록 부트스트랩 신뢰구간 (Streamlit 비의존 모듈)
+
+발행일이 하루씩 밀린 백테스트 케이스는 만기 구간이 대부분 겹쳐 서로 강하게 상관되어 있으므로
+케이스를 독립 표본으로 보는 단순 부트스트랩은 신뢰구간을 과소 추정한다.
+발행일 순서의 연속 블록을 원형으로 다시 뽑는 circular block bootstrap을 사용한다.
+
+평균형 지표(상환 성공률, 평균 수익률, 낙인 비율)는 리샘플 평균이 블록 합의 합이므로
+- 누적합 차이로 모든 시작 위치의 블록 합을 한 번에 구하고
+- (리샘플 B × 블록 k) 시작 위치 행렬로 gather 후 합산
+해서 리샘플별 파이썬 루프 없이 계산한다. 리샘플은 메모리 예산 청크로 나누고,
+청크마다 독립 시드로 스레드 병렬 실행할 수 있다 (NumPy 연산은 GIL 해제).
+
+주별/월별 샘플링 결과(weight 열)는 가중 평균 Σwx / Σw 를 리샘플 통계로 쓰므로
+가중치 행을 함께 블록 합산한다 (가중치가 모두 1이면 단순 평균과 동일).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine import case_weights
+from planner import plan_chunks
+
+DEFAULT_RESAMPLES = 5000
+DEFAULT_CONFIDENCE = 0.95
+MIN_BLOCKS = 10  # 블록 길이 상한: 리샘플당 최소 블록 수
+BOOTSTRAP_MEMORY_BUDGET = 64 * 2**20
+
+BOOTSTRAP_METRICS = ["success_rate", "avg_return", "ki_rate"]
+
+
+def metric_arrays(df):
+    """지표별 케이스 값 (M, N): 상환 성공 여부, 수익률, 낙인 여부 (발행일 순)"""
+    df = df.sort_values("start_date")
+    ret = df["return"].to_numpy(dtype=float)
+    return np.vstack([
+        (ret >= 0).astype(float),
+        ret,
+        df["ki"].to_numpy(dtype=float),
+    ])
+
+
+def default_block_length(start_dates, maturity_months):
+    """
+    기본 블록 길이: 만기 구간 하나에 들어가는 발행일 수의 중앙값
+    (이 간격 안의 케이스들이 경로를 공유) — 리샘플당 MIN_BLOCKS개 이상이 되도록 제한
+    """
+    starts = pd.DatetimeIndex(start_dates).sort_values()
+    n = len(starts)
+    ends = starts.searchsorted(starts + pd.DateOffset(months=int(maturity_months)), side="left")
+    per_window = int(np.median(ends - np.arange(n))) if n else 1
+    return int(max(1, min(per_window, n // MIN_BLOCKS)))
+
+
+def _block_sums(values, block_length):
+    """원형 블록 합 (M, N): i 위치에서 시작하는 길이 L 블록의 합"""
+    n = values.shape[1]
+    L = block_length
+    ext = np.concatenate([values, values[:, :L - 1]], axis=1) if L > 1 else values
+    cs = np.zeros((values.shape[0], n + L))
+    np.cumsum(ext, axis=1, out=cs[:, 1:])
+    return cs[:, L:L + n] - cs[:, :n]
+
+
+def _resample_means(block_sums, n_blocks, n_resamples, seed):
+    """리샘플 가중 평균 (M, B): block_sums 마지막 행은 가중치 블록 합"""
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, block_sums.shape[1], size=(n_resamples, n_blocks))
+    totals = block_sums[:, starts].sum(axis=2)        # (M+1, B)
+    return totals[:-1] / totals[-1]
+
+
+def block_bootstrap(values, block_length, n_resamples=DEFAULT_RESAMPLES, seed=0, workers=1,
+                    memory_budget=BOOTSTRAP_MEMORY_BUDGET, weights=None):
+    """
+    원형 블록 부트스트랩 리샘플 (가중) 평균 (M, B)
+
+    values      : (M, N) 발행일 순 지표 값
+    block_length: 블록 길이 L (리샘플 길이는 ceil(N/L) × L)
+    workers     : 리샘플 청크 병렬 스레드 수
+    weights     : (N,) 케이스 가중치 (None이면 모두 1)
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    M, n = values.shape
+    if n == 0:
+        return np.full((M, n_resamples), np.nan)
+    w = np.ones(n) if weights is None else np.asarray(weights, dtype=float)
+    L = int(min(max(1, block_length), n))
+    k = -(-n // L)
+    sums = _block_sums(np.vstack([values * w, w]), L)
+
+    plan = plan_chunks(n_resamples, (M + 1) * k * 8 * 2, memory_budget)
+    chunks = list(plan.chunks(n_resamples))
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [(sums, k, stop - start, s) for (start, stop), s in zip(chunks, seeds)]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(lambda a: _resample_means(*a), jobs))
+    else:
+        parts = [_resample_means(*a) for a in jobs]
+    return np.concatenate(parts, axis=1)
+
+
+def bootstrap_ci(df, maturity_months, block_length=None, n_resamples=DEFAULT_RESAMPLES,
+                 confidence=DEFAULT_CONFIDENCE, seed=0, workers=1):
+    """
+    헤드라인 지표의 블록 부트스트랩 신뢰구간
+
+    반환: BOOTSTRAP_METRICS 행, [estimate, lower, upper, std_error] 열 DataFrame
+          (attrs에 block_length, n_resamples, confidence 기록)
+    weight 열이 있으면(주별/월별 샘플링) 가중 평균 기준
+    """
+    values = metric_arrays(df)
+    weights = case_weights(df.sort_values("start_date"))
+    if block_length is None:
+        block_length = default_block_length(df["start_date"], maturity_months)
+    means = block_bootstrap(values, block_length, n_resamples, seed=seed, workers=workers, weights=weights)
+    alpha = (1.0 - confidence) / 2
+    lower, upper = np.nanquantile(means, [alpha, 1.0 - alpha], axis=1) if values.shape[1] else (np.nan, np.nan)
+    out = pd.DataFrame({
+        "estimate": values @ weights / weights.sum() if values.shape[1] else np.nan,
+        "lower": lower,
+        "upper": upper,
+        "std_error": means.std(axis=1, ddof=1) if values.shape[1] else np.nan,
+    }, index=pd.Index(BOOTSTRAP_METRICS, name="metric"))
+    out.attrs.update(block_length=int(block_length), n_resamples=int(n_resamples), confidence=confidence)
+    return out
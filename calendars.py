@@ -0,0 +1,144 @@
+"""
+거래소 휴장일 캘린더 (Streamlit 비의존 모듈)
+
+거래소별 휴장일 테이블을 1990~2060년 범위로 한 번 계산해 캐시하고,
+바스켓 구성 거래소들의 합집합 휴장일로 공동 영업일 캘린더를 만든다.
+관측일 스케줄은 np.busday_offset으로 한 번에(벡터화) 익영업일 스냅한다.
+"""
+from datetime import date
+from functools import lru_cache
+
+import holidays
+import numpy as np
+import pandas as pd
+from dateutil.easter import easter
+
+CALENDAR_FIRST_YEAR = 1990
+CALENDAR_LAST_YEAR = 2060
+
+# 거래소 코드 -> holidays 패키지 금융 캘린더 코드
+EXCHANGE_CODES = {
+    "KRX": "XKRX",
+    "NYSE": "XNYS",
+    "HKEX": "XHKG",
+    "JPX": "XJPX",
+}
+
+# 금융 캘린더가 지원하지 않는 과거 연도는 국가 공휴일로 보완
+COUNTRY_FALLBACK = {
+    "KRX": "KR",
+    "HKEX": "HK",
+}
+
+EXCHANGES = ["KRX", "NYSE", "HKEX", "EUREX", "JPX"]
+
+
+def _eurex_holidays(years):
+    """Eurex 휴장일: 신정, 성금요일, 부활절 월요일, 노동절, 12/24~26, 12/31"""
+    days = []
+    for y in years:
+        e = easter(y)
+        days += [
+            date(y, 1, 1),
+            e - pd.Timedelta(days=2),
+            e + pd.Timedelta(days=1),
+            date(y, 5, 1),
+            date(y, 12, 24),
+            date(y, 12, 25),
+            date(y, 12, 26),
+            date(y, 12, 31),
+        ]
+    return days
+
+
+def _exchange_holidays(exchange, years):
+    if exchange == "EUREX":
+        return _eurex_holidays(years)
+
+    code = EXCHANGE_CODES[exchange]
+    financial = holidays.financial_holidays(code, years=years)
+    days = list(financial.keys())
+
+    # 금융 캘린더 시작 연도 이전은 국가 공휴일로 채움 (+ 연말 휴장)
+    start_year = getattr(financial, "start_year", years[0])
+    early = [y for y in years if y < start_year]
+    if early and exchange in COUNTRY_FALLBACK:
+        days += list(holidays.country_holidays(COUNTRY_FALLBACK[exchange], years=early).keys())
+        if exchange == "KRX":
+            days += [date(y, 12, 31) for y in early]
+    return days
+
+
+@lru_cache(maxsize=None)
+def holiday_table(exchange, first_year=CALENDAR_FIRST_YEAR, last_year=CALENDAR_LAST_YEAR):
+    """
+    거래소 휴장일 테이블 (주말에 겹친 휴일은 제외, datetime64[D] 정렬 배열)
+    거래소·연도 범위별로 한 번만 계산
+    """
+    if exchange not in EXCHANGES:
+        raise ValueError(f"지원하지 않는 거래소입니다: {exchange}")
+    years = list(range(first_year, last_year + 1))
+    days = np.array(sorted(set(_exchange_holidays(exchange, years))), dtype="datetime64[D]")
+    return days[np.is_busday(days)]
+
+
+@lru_cache(maxsize=None)
+def joint_calendar(exchanges):
+    """
+    바스켓 공동 영업일 캘린더 (구성 거래소 휴장일 합집합)
+    exchanges는 정렬된 튜플로 정규화해서 캐시 키로 사용
+    """
+    tables = [holiday_table(ex) for ex in exchanges]
+    merged = np.unique(np.concatenate(tables)) if tables else np.array([], dtype="datetime64[D]")
+    return np.busdaycalendar(holidays=merged)
+
+
+def _calendar_for(exchanges):
+    return joint_calendar(tuple(sorted(set(exchanges))))
+
+
+def snap_business_days(dates, exchanges):
+    """날짜 배열을 공동 영업일로 익영업일 스냅 (벡터화)"""
+    days = np.asarray(pd.DatetimeIndex(dates).values.astype("datetime64[D]"))
+    snapped = np.busday_offset(days, 0, roll="forward", busdaycal=_calendar_for(exchanges))
+    return pd.DatetimeIndex(snapped)
+
+
+def business_days(start, end, exchanges):
+    """[start, end] 구간의 공동 영업일 인덱스"""
+    days = np.arange(np.datetime64(pd.Timestamp(start).date(), "D"),
+                     np.datetime64(pd.Timestamp(end).date(), "D") + 1)
+    days = days[np.is_busday(days, busdaycal=_calendar_for(exchanges))]
+    return pd.DatetimeIndex(days)
+
+
+def observation_schedule(start_dates, maturity_months, obs_interval_months, exchanges):
+    """
+    발행일 배열 × 관측 차수 평가일 행렬 (익영업일 원칙, 벡터화)
+
+    반환: ((N, n_obs) 차수별 평가일, (N,) 만기 평가일) datetime64[D] 배열
+    """
+    starts = pd.DatetimeIndex(start_dates)
+    n_obs = maturity_months // obs_interval_months
+    cal = _calendar_for(exchanges)
+
+    obs = np.empty((len(starts), n_obs), dtype="datetime64[D]")
+    for i in range(1, n_obs + 1):
+        target = (starts + pd.DateOffset(months=i * obs_interval_months)).values.astype("datetime64[D]")
+        obs[:, i - 1] = np.busday_offset(target, 0, roll="forward", busdaycal=cal)
+
+    maturity = (starts + pd.DateOffset(months=maturity_months)).values.astype("datetime64[D]")
+    maturity = np.busday_offset(maturity, 0, roll="forward", busdaycal=cal)
+    return obs, maturity
+
+
+@lru_cache(maxsize=256)
+def forward_schedule(start_date, maturity_months, obs_interval_months, exchanges):
+    """
+    단일 발행일 기준 향후 평가 일정 (가격 데이터 없이 생성, 캐시)
+    반환: (차수별 평가일 DatetimeIndex, 만기 평가일 Timestamp)
+    """
+    obs, maturity = observation_schedule(
+        [pd.Timestamp(start_date)], maturity_months, obs_interval_months, exchanges
+    )
+    return pd.DatetimeIndex(obs[0]), pd.Timestamp(maturity[0])
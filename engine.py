@@ -0,0 +1,868 @@
+"""
+ELS 평가 엔진 (Streamlit 비의존 모듈)
+
+simulate_els는 발행일 한 건을 pandas로 평가하는 기준(reference) 구현이고,
+PathIndex / build_schedule / evaluate는 같은 규칙을 전체 발행일 × 여러 구조에
+대해 한 번에 계산하는 벡터화 엔진이다.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from kernels import evaluate_starts, resolve_backend
+from planner import DEFAULT_MEMORY_BUDGET, plan_evaluation, resolve_dtype
+
+MIN_WINDOW_DAYS = 10  # 발행~만기 구간 최소 거래일 수 (이보다 짧으면 케이스 제외)
+
+# 발행일 샘플링: 매 거래일 / 주 첫 거래일 / 월 첫 거래일 / 실제 발행 캘린더
+SAMPLING_MODES = ("daily", "weekly", "monthly", "calendar")
+
+# 낙인 관측: 종가 / 장중 저가(연속 관측 배리어, 발행일 다음 거래일부터)
+MONITORING_MODES = ("close", "low")
+
+# =============================
+# 유틸리티 함수
+# =============================
+def snap_next_trading_day(index: pd.DatetimeIndex, target: pd.Timestamp):
+    """
+    target 이상의 첫 거래일 반환 (익영업일 원칙)
+    ELS 평가일이 휴일이면 다음 영업일로 연기되는 실무 관행 반영
+    """
+    if not isinstance(target, pd.Timestamp):
+        target = pd.Timestamp(target)
+    pos = index.searchsorted(target, side="left")
+    if pos >= len(index):
+        return None
+    return index[pos]
+
+
+# =============================
+# ELS 구조
+# =============================
+@dataclass
+class StepDownELS:
+    maturity_months: int
+    obs_interval_months: int
+    early_levels: list
+    coupon_annual: float
+    knock_in: float
+
+# =============================
+# 캘린더 기반 관측일 계산
+# =============================
+def get_observation_dates(start_date, maturity_months, obs_interval_months):
+    """캘린더 기반으로 정확한 관측일 계산"""
+    obs_dates = []
+    n_obs = maturity_months // obs_interval_months
+    
+    # start_date가 Timestamp가 아니면 변환
+    if not isinstance(start_date, pd.Timestamp):
+        start_date = pd.Timestamp(start_date)
+    
+    for i in range(1, n_obs + 1):
+        obs_date = start_date + relativedelta(months=i * obs_interval_months)
+        # Timestamp로 변환
+        obs_date = pd.Timestamp(obs_date)
+        obs_dates.append(obs_date)
+    
+    return obs_dates
+
+# =============================
+# 시뮬레이션 (KI 버그 수정)
+# =============================
+def simulate_els(price_window, els, start_date, return_detail=False, low_window=None):
+    """
+    ELS 시뮬레이션 (조기상환 케이스도 KI 여부를 올바르게 기록)
+    
+    return_detail=True면 일별 경로 데이터도 반환
+    low_window가 있으면 낙인은 장중 저가 / 발행일 종가로 관측 (발행일 당일 제외),
+    조기상환·만기 평가는 그대로 종가 기준
+    """
+    norm = price_window / price_window.iloc[0]
+    
+    # 단일 자산이면 DataFrame으로 변환
+    if isinstance(norm, pd.Series):
+        norm = norm.to_frame()
+    
+    # worst-of 경로 (일자별, 종가 기준)
+    worst_series = norm.min(axis=1)
+
+    # 낙인 관측 경로: 종가 기준이면 worst-of 경로 그대로
+    if low_window is None:
+        ki_series = worst_series
+    else:
+        close = np.asarray(price_window, dtype=float).reshape(len(price_window), -1)
+        low = np.fmin(np.asarray(low_window, dtype=float).reshape(close.shape), close)   # PathIndex.monitor와 같은 규칙
+        ki_series = pd.Series((low / close[0]).min(axis=1), index=worst_series.index)
+        ki_series.iloc[0] = np.inf
+    
+    # early_levels 길이 검증
+    n_obs = els.maturity_months // els.obs_interval_months
+    if len(els.early_levels) != n_obs:
+        raise ValueError(
+            f"조기상환 레벨 개수({len(els.early_levels)})가 "
+            f"관측 횟수({n_obs})와 일치하지 않습니다."
+        )
+    
+    # 관측일 계산 (캘린더 기반)
+    obs_dates = get_observation_dates(start_date, els.maturity_months, els.obs_interval_months)
+    
+    # 조기상환 체크
+    for i, (obs_date, lvl) in enumerate(zip(obs_dates, els.early_levels)):
+        # 관측일을 실제 거래일로 스냅 (익영업일 원칙)
+        obs_eval = snap_next_trading_day(norm.index, obs_date)
+        
+        if obs_eval is None:
+            # 관측일이 데이터 범위를 벗어남
+            break
+        
+        # 관측일까지의 KI 발생 여부 체크 (중요!)
+        ki_up_to_obs = bool((ki_series.loc[:obs_eval] < els.knock_in).any())
+        
+        # 관측일의 worst 성과
+        obs_worst = float(worst_series.loc[obs_eval])
+        
+        if obs_worst >= float(lvl):
+            # 조기상환 성공
+            holding_days = (obs_eval - start_date).days
+            holding_years = holding_days / 365.25
+            payoff = 1.0 + els.coupon_annual * holding_years
+            
+            if return_detail:
+                detail = {
+                    "dates": worst_series.index.tolist(),
+                    "worst_path": worst_series.values.tolist(),
+                    "ki_path": ki_series.replace(np.inf, np.nan).tolist(),  # 낙인 관측 경로 (저가 관측 시 발행일은 NaN)
+                    "monitoring": "close" if low_window is None else "low",
+                    "asset_paths": norm.to_dict('list'),  # 개별 자산 경로 추가
+                    "asset_names": norm.columns.tolist(),  # 자산 이름
+                    "ki_level": els.knock_in,
+                    "ki_touched": ki_up_to_obs,
+                    "ki_touch_date": ki_series[ki_series < els.knock_in].index[0] if ki_up_to_obs else None,
+                    "redemption_date": obs_eval,
+                    "redemption_step": i + 1
+                }
+                return payoff - 1.0, ki_up_to_obs, i + 1, detail
+            
+            return payoff - 1.0, ki_up_to_obs, i + 1
+    
+    # 만기까지 도달 - KI 체크
+    ki_occurred = bool((ki_series < els.knock_in).any())
+    final_worst = float(worst_series.iloc[-1])
+    
+    if ki_occurred:
+        # 낙인 찍힘 → 손실 확정
+        payoff = final_worst
+    else:
+        # 낙인 안 찍힘 → 원금 + 만기 쿠폰
+        maturity_years = els.maturity_months / 12.0
+        payoff = 1.0 + els.coupon_annual * maturity_years
+    
+    if return_detail:
+        detail = {
+            "dates": worst_series.index.tolist(),
+            "worst_path": worst_series.values.tolist(),
+            "ki_path": ki_series.replace(np.inf, np.nan).tolist(),
+            "monitoring": "close" if low_window is None else "low",
+            "asset_paths": norm.to_dict('list'),  # 개별 자산 경로 추가
+            "asset_names": norm.columns.tolist(),  # 자산 이름
+            "ki_level": els.knock_in,
+            "ki_touched": ki_occurred,
+            "ki_touch_date": ki_series[ki_series < els.knock_in].index[0] if ki_occurred else None,
+            "redemption_date": worst_series.index[-1],
+            "redemption_step": None
+        }
+        return payoff - 1.0, ki_occurred, None, detail
+    
+    return payoff - 1.0, ki_occurred, None
+
+def run_backtest_reference(prices, els, lows=None):
+    """
+    기준(reference) 백테스트: 발행일마다 prices.loc 구간을 잘라 simulate_els 호출
+    벡터화 엔진 검증용으로 유지하는 원래 루프 구현
+    lows(prices와 같은 모양의 장중 저가)가 있으면 저가 기준 낙인 관측
+    """
+    rows = []
+    for start_date in prices.index:
+        # 만기일 계산 (캘린더 기반)
+        maturity_date = pd.Timestamp(start_date + relativedelta(months=els.maturity_months))
+        
+        # 만기일을 실제 거래일로 스냅 (익영업일 원칙)
+        mat_eval = snap_next_trading_day(prices.index, maturity_date)
+        
+        if mat_eval is None:
+            # 만기일이 데이터 범위를 벗어남
+            break
+        
+        if mat_eval < start_date:
+            # 논리적 오류 (발생 가능성 낮음)
+            continue
+        
+        # 해당 기간 데이터 추출 (정확하게 스냅된 만기일까지)
+        try:
+            window = prices.loc[start_date:mat_eval]
+        except Exception:
+            continue
+        
+        if len(window) < MIN_WINDOW_DAYS:  # 최소 데이터 체크
+            continue
+        
+        try:
+            low_window = lows.loc[start_date:mat_eval] if lows is not None else None
+            r, ki, step = simulate_els(window, els, start_date, low_window=low_window)
+            
+            rows.append({
+                "start_date": start_date,
+                "return": r, 
+                "ki": ki, 
+                "step": step,
+                "year": start_date.year
+            })
+        except Exception:
+            # 개별 케이스 오류는 조용히 스킵
+            continue
+    
+    if len(rows) == 0:
+        return None
+    
+    return pd.DataFrame(rows)
+
+
+# =============================
+# 벡터화 엔진
+# =============================
+class PathIndex:
+    """
+    가격 행렬 전처리 결과 (발행일/구조와 무관하게 한 번만 계산)
+
+    자산별 구간 최소값·위치를 O(1)로 조회하는 sparse table을 보관.
+    min(P[t]) / P[s] 는 min(P[t] / P[s]) 와 부동소수점까지 동일하므로
+    정규화 없이 원가격으로 낙인 판정용 구간 최소값을 구할 수 있음
+
+    lows(종가와 같은 인덱스·열의 장중 저가)가 있으면 낙인 관측 행렬 monitor를
+    min(저가, 종가)로 두고 sparse table을 그 위에 만든다 (종가 관측과 같은 비용).
+    이때 낙인 관측 구간은 발행일 다음 거래일부터 (monitor_offset = 1)
+    """
+
+    def __init__(self, prices, precision="float64", lows=None):
+        if isinstance(prices, pd.Series):
+            prices = prices.to_frame()
+        self.index = pd.DatetimeIndex(prices.index)
+        self.columns = list(prices.columns)
+        self.values = prices.to_numpy(dtype=resolve_dtype(precision))
+        self.precision = precision
+        self.days = self.index.values.astype("datetime64[D]")
+        if lows is None:
+            self.monitoring, self.monitor_offset, self.monitor = "close", 0, self.values
+        else:
+            low = np.asarray(lows, dtype=self.values.dtype).reshape(self.values.shape)
+            self.monitoring, self.monitor_offset = "low", 1
+            self.monitor = np.fmin(low, self.values)   # 저가 결측(NaN)이면 종가
+
+        n = len(self.values)
+        self._log2 = (np.frexp(np.arange(n + 1))[1] - 1).astype(np.int64)  # floor(log2(k)), k >= 1
+        n_levels = int(self._log2[n]) + 1 if n > 0 else 1
+
+        mins = np.full((n_levels,) + self.values.shape, np.inf, dtype=self.values.dtype)
+        args = np.zeros((n_levels,) + self.values.shape, dtype=np.int64)
+        mins[0] = self.monitor
+        args[0] = np.arange(n)[:, None]
+        for k in range(1, n_levels):
+            half = 1 << (k - 1)
+            width = n - (1 << k) + 1
+            left_v, right_v = mins[k - 1, :width], mins[k - 1, half:half + width]
+            take_right = right_v < left_v  # 동률이면 앞쪽 위치 유지
+            mins[k, :width] = np.where(take_right, right_v, left_v)
+            args[k, :width] = np.where(take_right, args[k - 1, half:half + width], args[k - 1, :width])
+        self._min = mins
+        self._argmin = args
+
+    def __len__(self):
+        return len(self.values)
+
+    def range_min(self, lo, hi):
+        """
+        [lo, hi] 구간(양끝 포함)의 자산별 최소 관측 가격(monitor)과 그 위치
+        lo, hi: 같은 shape의 정수 배열 → 반환 shape (..., 자산 수)
+        """
+        lo = np.asarray(lo)
+        hi = np.asarray(hi)
+        k = self._log2[hi - lo + 1]
+        right = hi - (1 << k) + 1
+        lv, rv = self._min[k, lo], self._min[k, right]
+        take_right = rv < lv
+        values = np.where(take_right, rv, lv)
+        positions = np.where(take_right, self._argmin[k, right], self._argmin[k, lo])
+        return values, positions
+
+    def first_below(self, lo, hi, base, level):
+        """
+        [lo, hi] 구간에서 worst-of(P[t] / base)가 처음 level 미만이 되는 위치 (없으면 -1)
+        구간 최소값에 대한 이분 탐색 (벡터화)
+        """
+        lo = np.asarray(lo)
+        hi = np.asarray(hi)
+        level = np.asarray(level)[..., None]
+        values, _ = self.range_min(lo, hi)
+        hit = (values / base < level).any(axis=-1)
+
+        a, b = lo.copy(), hi.copy()
+        while True:
+            active = hit & (a < b)
+            if not active.any():
+                break
+            mid = (a + b) // 2
+            values, _ = self.range_min(lo, mid)
+            left = (values / base < level).any(axis=-1)
+            b = np.where(active & left, mid, b)
+            a = np.where(active & ~left, mid + 1, a)
+        return np.where(hit, a, -1)
+
+
+@dataclass
+class Schedule:
+    """
+    발행일별 평가 스케줄 (가격 인덱스 위치 기준, 익영업일 스냅 완료)
+
+    starts   : (N,) 발행일 위치 (만기 평가가 가능한 발행일만)
+    obs      : (N, n_obs) 차수별 평가일 위치
+    maturity : (N,) 만기 평가일 위치
+    obs_days : (N, n_obs) 발행일부터 평가일까지 달력 일수 (쿠폰 경과일)
+    """
+    starts: np.ndarray
+    obs: np.ndarray
+    maturity: np.ndarray
+    obs_days: np.ndarray
+    maturity_months: int
+    obs_interval_months: int
+
+    def __len__(self):
+        return len(self.starts)
+
+
+def _eligible(index, pos, maturity_months):
+    """발행일 위치별 만기 평가일 위치와 평가 가능 여부 (만기가 데이터 안, 구간 10거래일 이상)"""
+    maturity = index.searchsorted(index[pos] + pd.DateOffset(months=maturity_months), side="left")
+    return maturity, (maturity < len(index)) & (maturity - pos + 1 >= MIN_WINDOW_DAYS)
+
+
+def build_schedule(path_index, maturity_months, obs_interval_months, starts=None):
+    """
+    발행일 배열 전체의 관측/만기 평가일 위치를 한 번에 계산
+    run_backtest 규칙과 동일: 만기 평가일이 데이터 밖이면 제외, 구간이 10거래일 미만이면 제외
+    """
+    index = path_index.index
+    n = len(index)
+    pos = np.arange(n) if starts is None else np.asarray(starts, dtype=np.int64)
+
+    maturity, keep = _eligible(index, pos, maturity_months)
+    pos, maturity = pos[keep], maturity[keep]
+    start_dates = index[pos]
+
+    n_obs = maturity_months // obs_interval_months
+    obs = np.empty((len(pos), n_obs), dtype=np.int64)
+    for i in range(1, n_obs + 1):
+        target = start_dates + pd.DateOffset(months=i * obs_interval_months)
+        obs[:, i - 1] = index.searchsorted(target, side="left")
+
+    days = path_index.days
+    obs_days = (days[obs] - days[pos][:, None]).astype(np.int64)
+    return Schedule(
+        starts=pos,
+        obs=obs,
+        maturity=maturity,
+        obs_days=obs_days,
+        maturity_months=maturity_months,
+        obs_interval_months=obs_interval_months,
+    )
+
+
+def sample_starts(path_index, sampling="daily", issue_dates=None):
+    """
+    발행일 샘플링 → 발행일 위치 배열 (정렬, 중복 없음)
+
+    daily   : 모든 거래일
+    weekly  : 주별 첫 거래일
+    monthly : 월별 첫 거래일
+    calendar: issue_dates(실제 발행일 목록)를 익영업일로 스냅, 데이터 밖 날짜는 제외
+    """
+    if sampling not in SAMPLING_MODES:
+        raise ValueError(f"지원하지 않는 샘플링입니다: {sampling} (가능: {', '.join(SAMPLING_MODES)})")
+    index = path_index.index
+    n = len(index)
+    if sampling == "daily":
+        return np.arange(n, dtype=np.int64)
+    if sampling == "calendar":
+        if issue_dates is None:
+            raise ValueError("calendar 샘플링에는 발행일 목록(issue_dates)이 필요합니다.")
+        pos = index.searchsorted(pd.DatetimeIndex(issue_dates).normalize(), side="left")
+        return np.unique(pos[pos < n]).astype(np.int64)
+
+    period = index.to_period("W" if sampling == "weekly" else "M").asi8
+    first = np.ones(n, dtype=bool)
+    first[1:] = period[1:] != period[:-1]
+    return np.flatnonzero(first).astype(np.int64)
+
+
+def sampling_weights(path_index, schedule, sampling="daily"):
+    """
+    샘플 발행일별 가중치 (N,)
+
+    weekly/monthly: 다음 샘플 전까지 대표하는 평가 가능 일별 발행일 수
+                    → 가중 통계가 매일 발행 기준 통계를 근사
+    daily/calendar: 1 (실제 발행 캘린더는 발행 한 건이 상품 하나)
+    """
+    starts = schedule.starts
+    if sampling in ("daily", "calendar") or len(starts) == 0:
+        return np.ones(len(starts))
+    index = path_index.index
+    n = len(index)
+    _, eligible = _eligible(index, np.arange(n), schedule.maturity_months)
+    cum = np.concatenate([[0], np.cumsum(eligible)])
+    bounds = np.append(starts[1:], n)
+    return (cum[bounds] - cum[starts]).astype(float)
+
+
+def case_weights(df):
+    """결과 DataFrame의 케이스 가중치 (weight 열이 없으면 모두 1)"""
+    if "weight" in df.columns:
+        return df["weight"].to_numpy(dtype=float)
+    return np.ones(len(df))
+
+
+@dataclass
+class BatchResult:
+    """
+    구조(S) × 발행일(N) 평가 결과
+
+    returns    : 수익률
+    ki         : 상환 시점까지 낙인 발생 여부
+    step       : 조기상환 차수 (0이면 만기상환)
+    redemption : 상환(또는 만기) 평가일 위치
+    knock_in   : (S,) 구조별 낙인 배리어
+    ki_index   : 최초 낙인 터치 위치 (-1이면 없음, ki_touch/path_stats일 때만 계산)
+
+    path_stats=True일 때만 채워지는 경로 통계 (발행일~상환 평가일 구간 기준)
+    min_worst     : worst-of 최저값 (기준가 대비 비율)
+    min_index     : worst-of 최저값 위치
+    days_below_ki : worst-of가 낙인 배리어 미만이었던 거래일 수
+    """
+    returns: np.ndarray
+    ki: np.ndarray
+    step: np.ndarray
+    redemption: np.ndarray
+    knock_in: np.ndarray = None
+    ki_index: np.ndarray = None
+    min_worst: np.ndarray = None
+    min_index: np.ndarray = None
+    days_below_ki: np.ndarray = None
+
+
+PATH_STATS_CELL_BUDGET = 2_000_000  # 낙인 체류일 계산 시 청크당 (케이스 × 거래일) 셀 수
+
+
+def _count_below(path_index, base, lo, hi, level):
+    """
+    행별 [lo, hi] 구간에서 worst-of(M[t] / base) < level 인 거래일 수 (M: 낙인 관측 행렬)
+    구간 길이순으로 정렬해 청크마다 자기 최대 길이까지만 패딩 (낙인 발생 케이스에만 사용)
+    """
+    counts = np.zeros(len(lo), dtype=np.int64)
+    if len(lo) == 0:
+        return counts
+    P = path_index.monitor
+    last = len(P) - 1
+    order = np.argsort(hi - lo, kind="stable")
+    c = 0
+    while c < len(order):
+        width = int(hi[order[c]] - lo[order[c]]) + 1
+        rows = max(1, PATH_STATS_CELL_BUDGET // width)
+        sl = order[c:c + rows]
+        width = int((hi[sl] - lo[sl]).max()) + 1
+        pos = lo[sl, None] + np.arange(width)
+        inside = pos <= hi[sl, None]
+        below = (P[np.minimum(pos, last)] / base[sl, None, :] < level[sl, None, None]).any(axis=2)
+        counts[sl] = (below & inside).sum(axis=1)
+        c += rows
+    return counts
+
+
+def _check_levels(els):
+    n_obs = els.maturity_months // els.obs_interval_months
+    if len(els.early_levels) != n_obs:
+        raise ValueError(
+            f"조기상환 레벨 개수({len(els.early_levels)})가 "
+            f"관측 횟수({n_obs})와 일치하지 않습니다."
+        )
+
+
+class _Workspace:
+    """evaluate 작업 버퍼: 청크 크기로 한 번 할당하고 모든 청크에서 재사용"""
+
+    def __init__(self, n_structures, chunk, n_obs, n_assets, dtype):
+        S, C = n_structures, chunk
+        self.base = np.empty((C, n_assets), dtype)
+        self.obs_ratio = np.empty((C, n_obs, n_assets), dtype)
+        self.obs_worst = np.empty((C, n_obs), dtype)
+        self.end_ratio = np.empty((C, n_assets), dtype)
+        self.end_worst = np.empty(C, dtype)
+        self.end_return = np.empty(C)
+        self.hit = np.empty((S, C, n_obs), dtype=bool)
+        self.first = np.empty((S, C), dtype=np.int64)
+        self.redeemed = np.empty((S, C), dtype=bool)
+        self.not_redeemed = np.empty((S, C), dtype=bool)
+        self.row_offsets = np.arange(C, dtype=np.int64) * n_obs
+        for name in ("flat", "redemption", "held", "lo", "length", "k", "right"):
+            setattr(self, name, np.empty((S, C), dtype=np.int64))
+        self.lv = np.empty((S, C, n_assets), dtype)
+        self.rv = np.empty((S, C, n_assets), dtype)
+        self.pos_l = np.empty((S, C, n_assets), dtype=np.int64)
+        self.pos_r = np.empty((S, C, n_assets), dtype=np.int64)
+        self.take_right = np.empty((S, C, n_assets), dtype=bool)
+        self.worst_min = np.empty((S, C), dtype)
+        self.early = np.empty((S, C))
+
+
+def _evaluate_compiled(path_index, schedule, structures, ki_touch, path_stats):
+    """컴파일 커널(numba) 백엔드: 구조마다 발행일 전체를 병렬 루프로 평가"""
+    outs = [evaluate_starts(path_index.values, schedule, els, path_index.monitor, path_index.monitor_offset)
+            for els in structures]
+    stack = {k: np.stack([o[k] for o in outs]) for k in outs[0]}
+    result = BatchResult(
+        returns=stack["returns"], ki=stack["ki"], step=stack["step"],
+        redemption=stack["redemption"],
+        knock_in=np.array([els.knock_in for els in structures], dtype=float),
+    )
+    if ki_touch or path_stats:
+        result.ki_index = stack["ki_index"]
+    if path_stats:
+        result.min_worst = stack["min_worst"]
+        result.min_index = stack["min_index"]
+        result.days_below_ki = stack["days_below_ki"]
+    return result
+
+
+def evaluate(path_index, schedule, structures, ki_touch=False, path_stats=False, backend="auto",
+             memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    같은 만기/평가주기를 가진 여러 구조를 스케줄의 전체 발행일에 대해 한 번에 평가
+    simulate_els와 동일한 규칙 (365.25일 쿠폰 경과, 상환 평가일까지의 낙인만 반영)
+    낙인 관측은 path_index.monitoring을 따름 (PathIndex(prices, lows=...)면 장중 저가)
+
+    path_stats=True면 낙인 판정에 쓰는 구간 최소값/위치를 그대로 이용해
+    worst-of 최저값·위치, 최초 낙인 위치, 낙인 체류일을 같은 패스에서 함께 계산
+
+    backend: 'auto'(numba 있으면 컴파일 커널), 'numba', 'numpy'
+    memory_budget: NumPy 백엔드 작업 버퍼 예산 (바이트). 발행일을 청크로 나누고
+                   청크 크기로 한 번 잡은 버퍼를 모든 청크에서 재사용
+    정밀도는 path_index의 dtype을 따름 (PathIndex(prices, precision="float32"))
+    """
+    for els in structures:
+        _check_levels(els)
+        if (els.maturity_months, els.obs_interval_months) != (schedule.maturity_months, schedule.obs_interval_months):
+            raise ValueError("스케줄과 만기/평가주기가 다른 구조는 함께 평가할 수 없습니다.")
+
+    if resolve_backend(backend) == "numba" and len(schedule):
+        return _evaluate_compiled(path_index, schedule, structures, ki_touch, path_stats)
+
+    S, N = len(structures), len(schedule)
+    n_obs = schedule.obs.shape[1]
+    P = path_index.values
+    T, A = P.shape
+
+    levels = np.array([[float(l) for l in els.early_levels] for els in structures]).reshape(S, n_obs)
+    coupons = np.array([els.coupon_annual for els in structures], dtype=float)[:, None]
+    knock_in = np.array([els.knock_in for els in structures], dtype=float)[:, None]
+    maturity_coupon = (1.0 + coupons * np.array([els.maturity_months / 12.0 for els in structures])[:, None]) - 1.0
+
+    result = BatchResult(
+        returns=np.empty((S, N)),
+        ki=np.empty((S, N), dtype=bool),
+        step=np.empty((S, N), dtype=np.int64),
+        redemption=np.empty((S, N), dtype=np.int64),
+        knock_in=knock_in[:, 0],
+    )
+    if ki_touch or path_stats:
+        result.ki_index = np.full((S, N), -1, dtype=np.int64)
+    if path_stats:
+        result.min_worst = np.empty((S, N), dtype=P.dtype)
+        result.min_index = np.empty((S, N), dtype=np.int64)
+        result.days_below_ki = np.zeros((S, N), dtype=np.int64)
+    if N == 0:
+        return result
+
+    plan = plan_evaluation(N, S, n_obs, A, memory_budget=memory_budget, precision=path_index.precision)
+    ws = _Workspace(S, plan.chunk_size, n_obs, A, P.dtype)
+    min_flat = path_index._min.reshape(-1, A)
+    arg_flat = path_index._argmin.reshape(-1, A)
+
+    for c0, c1 in plan.chunks(N):
+        c = c1 - c0
+        starts = schedule.starts[c0:c1]
+        obs = schedule.obs[c0:c1]
+        maturity = schedule.maturity[c0:c1]
+        base, obs_ratio, obs_worst = ws.base[:c], ws.obs_ratio[:c], ws.obs_worst[:c]
+        end_ratio, end_worst = ws.end_ratio[:c], ws.end_worst[:c]
+        hit, first, redeemed, not_redeemed = ws.hit[:, :c], ws.first[:, :c], ws.redeemed[:, :c], ws.not_redeemed[:, :c]
+        flat, redemption, held = ws.flat[:, :c], ws.redemption[:, :c], ws.held[:, :c]
+        lo, length, k, right = ws.lo[:, :c], ws.length[:, :c], ws.k[:, :c], ws.right[:, :c]
+        lv, rv, take_right, worst_min = ws.lv[:, :c], ws.rv[:, :c], ws.take_right[:, :c], ws.worst_min[:, :c]
+        early, end_return = ws.early[:, :c], ws.end_return[:c]
+
+        # 발행일/관측일/만기 worst-of
+        np.take(P, starts, axis=0, out=base)
+        np.take(P, obs, axis=0, out=obs_ratio)
+        np.divide(obs_ratio, base[:, None, :], out=obs_ratio)
+        np.min(obs_ratio, axis=2, out=obs_worst, initial=np.inf)
+        np.take(P, maturity, axis=0, out=end_ratio)
+        np.divide(end_ratio, base, out=end_ratio)
+        np.min(end_ratio, axis=1, out=end_worst)
+
+        # 조기상환 차수: 처음으로 worst >= 상환 기준인 관측
+        np.greater_equal(obs_worst[None], levels[:, None, :], out=hit)
+        np.any(hit, axis=2, out=redeemed)
+        np.logical_not(redeemed, out=not_redeemed)
+        if n_obs:
+            np.argmax(hit, axis=2, out=first)
+        else:
+            first.fill(0)
+        np.add(first, ws.row_offsets[:c], out=flat)
+        if n_obs:
+            np.take(obs.reshape(-1), flat, out=redemption)
+            np.take(schedule.obs_days[c0:c1].reshape(-1), flat, out=held)
+        else:
+            held.fill(0)
+        np.copyto(redemption, np.broadcast_to(maturity, redemption.shape), where=not_redeemed)
+
+        # 상환 평가일까지의 낙인 여부: sparse table 구간 최소값 (버퍼 재사용)
+        np.copyto(lo, np.broadcast_to(starts, lo.shape))
+        lo += path_index.monitor_offset
+        np.subtract(redemption, lo, out=length)
+        length += 1
+        np.take(path_index._log2, length, out=k)
+        np.left_shift(1, k, out=right)
+        np.subtract(redemption, right, out=right)
+        right += 1
+        np.multiply(k, T, out=flat)
+        np.add(flat, lo, out=lo)            # lo 버퍼를 좌측 평탄 인덱스로 재사용
+        np.add(flat, right, out=right)      # right 버퍼를 우측 평탄 인덱스로 재사용
+        np.take(min_flat, lo, axis=0, out=lv)
+        np.take(min_flat, right, axis=0, out=rv)
+        np.less(rv, lv, out=take_right)
+        np.copyto(lv, rv, where=take_right)
+        if path_stats:
+            pos_l, pos_r = ws.pos_l[:, :c], ws.pos_r[:, :c]
+            np.take(arg_flat, lo, axis=0, out=pos_l)
+            np.take(arg_flat, right, axis=0, out=pos_r)
+            np.copyto(pos_l, pos_r, where=take_right)
+        np.divide(lv, base[None], out=lv)
+        np.min(lv, axis=2, out=worst_min)
+        ki = result.ki[:, c0:c1]
+        np.less(worst_min, knock_in, out=ki)
+
+        # 수익률: (1 + 쿠폰 × 경과일/365.25) - 1, 만기는 낙인 시 worst-of 손실
+        np.divide(held, 365.25, out=early)
+        np.multiply(early, coupons, out=early)
+        early += 1.0
+        early -= 1.0
+        np.subtract(end_worst, 1.0, out=end_return)
+        ret = result.returns[:, c0:c1]
+        np.copyto(ret, np.broadcast_to(maturity_coupon, ret.shape))
+        np.copyto(ret, np.broadcast_to(end_return, ret.shape), where=ki)
+        np.copyto(ret, early, where=redeemed)
+
+        step = result.step[:, c0:c1]
+        np.add(first, 1, out=step)
+        np.copyto(step, 0, where=not_redeemed)
+        result.redemption[:, c0:c1] = redemption
+
+        if ki_touch or path_stats:
+            lo_pos = np.broadcast_to(starts + path_index.monitor_offset, redemption.shape)
+            touch = path_index.first_below(lo_pos, redemption, base[None], np.broadcast_to(knock_in, redemption.shape))
+            result.ki_index[:, c0:c1] = np.where(ki, touch, -1)
+
+        if path_stats:
+            worst_asset = lv.argmin(axis=2)
+            result.min_worst[:, c0:c1] = worst_min
+            result.min_index[:, c0:c1] = np.take_along_axis(pos_l, worst_asset[..., None], axis=2)[..., 0]
+
+            # 낙인 체류일: 낙인 케이스만 최초 터치~상환 구간을 직접 스캔
+            s_idx, n_idx = np.nonzero(ki)
+            result.days_below_ki[s_idx, c0 + n_idx] = _count_below(
+                path_index, base[n_idx], result.ki_index[s_idx, c0 + n_idx],
+                redemption[s_idx, n_idx], knock_in[s_idx, 0],
+            )
+
+    return result
+
+
+def result_frame(path_index, schedule, result, j=0):
+    """구조 j의 평가 결과를 run_backtest와 같은 형식의 DataFrame으로 변환"""
+    start_dates = path_index.index[schedule.starts]
+    step = result.step[j].astype(np.int64)
+    if (step == 0).any():
+        # 만기상환은 차수 없음(NaN) → float 열
+        step = np.where(step == 0, np.nan, step)
+    df = pd.DataFrame({
+        "start_date": start_dates,
+        "return": result.returns[j],
+        "ki": result.ki[j],
+        "step": step,
+        "year": np.asarray(start_dates.year, dtype=np.int64),
+    })
+    if result.min_worst is not None:
+        days = path_index.days
+        index = path_index.index
+        ki_index = result.ki_index[j]
+        touched = ki_index >= 0
+        red_days = days[result.redemption[j]]
+        df["redemption_date"] = index[result.redemption[j]]
+        df["ki_date"] = index[np.where(touched, ki_index, 0)].where(touched)
+        df["min_worst"] = result.min_worst[j]
+        df["final_worst"] = (path_index.values[result.redemption[j]] / path_index.values[schedule.starts]).min(axis=1)
+        df["min_date"] = index[result.min_index[j]]
+        df["max_drawdown"] = 1.0 - result.min_worst[j]
+        df["barrier_distance"] = result.min_worst[j] - result.knock_in[j]
+        df["days_below_ki"] = result.days_below_ki[j]
+        recovered = touched & (result.returns[j] >= 0)
+        df["recovery_days"] = np.where(
+            recovered, (red_days - days[np.where(touched, ki_index, 0)]).astype(np.int64), np.nan
+        )
+    return df
+
+
+
+@dataclass
+class CaseIndex:
+    """
+    발행일별 케이스 색인 (케이스 분석 탭의 조회용, 발행일 순)
+
+    result_frame의 경로 통계 열(상환일·낙인일·최저일)을 가격 인덱스 위치로 한 번 변환해 두고
+    케이스 하나의 경로 상세를 PathIndex 배열 슬라이스로 바로 만든다 (재시뮬레이션 없음).
+
+    starts / maturity / redemption / min_index : (N,) int32 가격 인덱스 위치
+    ki_index  : (N,) int32 낙인 최초 터치 위치 (없으면 -1)
+    step      : (N,) int8 조기상환 차수 (만기상환 0)
+    """
+    start_dates: pd.DatetimeIndex
+    starts: np.ndarray
+    maturity: np.ndarray
+    redemption: np.ndarray
+    ki_index: np.ndarray
+    min_index: np.ndarray
+    min_worst: np.ndarray
+    returns: np.ndarray
+    ki: np.ndarray
+    step: np.ndarray
+    knock_in: float
+
+    @classmethod
+    def from_frame(cls, path_index, df, els):
+        """경로 통계 열이 있는 백테스트 결과 DataFrame으로 색인 생성"""
+        if "redemption_date" not in df.columns:
+            raise ValueError("케이스 색인에는 경로 통계 열(path_stats=True)이 필요합니다.")
+        df = df.sort_values("start_date")
+        index = path_index.index
+        starts = index.get_indexer(df["start_date"])
+        ki_dates = df["ki_date"]
+        ki_index = np.full(len(df), -1, dtype=np.int32)
+        touched = ki_dates.notna().to_numpy()
+        ki_index[touched] = index.get_indexer(ki_dates[touched])
+        return cls(
+            start_dates=pd.DatetimeIndex(df["start_date"]),
+            starts=starts.astype(np.int32),
+            maturity=_eligible(index, starts, els.maturity_months)[0].astype(np.int32),
+            redemption=index.get_indexer(df["redemption_date"]).astype(np.int32),
+            ki_index=ki_index,
+            min_index=index.get_indexer(df["min_date"]).astype(np.int32),
+            min_worst=df["min_worst"].to_numpy(dtype=float),
+            returns=df["return"].to_numpy(dtype=float),
+            ki=df["ki"].to_numpy(dtype=bool),
+            step=df["step"].fillna(0).to_numpy().astype(np.int8),
+            knock_in=float(els.knock_in),
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def locate(self, date):
+        """date 당일 또는 이후 첫 발행 케이스 행 (없으면 -1)"""
+        row = int(self.start_dates.searchsorted(pd.Timestamp(date), side="left"))
+        return row if row < len(self) else -1
+
+    def worst_loss(self):
+        """최대 손실 케이스 행 (손실 케이스가 없으면 -1)"""
+        row = int(np.argmin(self.returns)) if len(self) else -1
+        return row if row >= 0 and self.returns[row] < 0 else -1
+
+    def first_ki(self):
+        """최초 낙인 케이스 행 (없으면 -1)"""
+        hits = np.flatnonzero(self.ki)
+        return int(hits[0]) if len(hits) else -1
+
+    def detail(self, path_index, row):
+        """
+        케이스 한 건의 경로 상세 (simulate_els(return_detail=True)의 detail과 같은 형식)
+        반환: (return, ki, step 또는 None, detail)
+        """
+        s, m = int(self.starts[row]), int(self.maturity[row])
+        base = path_index.values[s]
+        norm = path_index.values[s:m + 1] / base
+        worst = norm.min(axis=1)
+        ki_path = (path_index.monitor[s:m + 1] / base).min(axis=1)
+        if path_index.monitor_offset:
+            ki_path[0] = np.nan   # 저가 관측은 발행일 당일 제외
+        dates = path_index.index[s:m + 1]
+        touched = bool(self.ki[row])
+        step = int(self.step[row]) or None
+        detail = {
+            "dates": dates.tolist(),
+            "worst_path": worst.tolist(),
+            "ki_path": ki_path.tolist(),
+            "monitoring": path_index.monitoring,
+            "asset_paths": {name: norm[:, a].tolist() for a, name in enumerate(path_index.columns)},
+            "asset_names": list(path_index.columns),
+            "ki_level": self.knock_in,
+            "ki_touched": touched,
+            "ki_touch_date": path_index.index[self.ki_index[row]] if touched else None,
+            "redemption_date": path_index.index[self.redemption[row]],
+            "redemption_step": step,
+        }
+        return float(self.returns[row]), touched, step, detail
+
+def run_backtest(prices, els, path_index=None, path_stats=True, backend="auto",
+                 precision="float64", memory_budget=DEFAULT_MEMORY_BUDGET,
+                 sampling="daily", issue_dates=None, lows=None):
+    """
+    백테스트 실행 (캘린더 기반, 익영업일 원칙)
+    전체 발행일을 벡터화 엔진으로 한 번에 평가, 기본으로 경로 통계 열도 함께 반환
+
+    sampling: 'daily'(기본) 외에는 샘플 발행일만 평가하고 weight 열(sampling_weights)을 추가
+    lows    : 장중 저가 (prices와 같은 모양) → 저가 기준 낙인 관측 (path_index가 없을 때만 사용)
+    """
+    path_index = path_index if path_index is not None else PathIndex(prices, precision=precision, lows=lows)
+    starts = None if sampling == "daily" else sample_starts(path_index, sampling, issue_dates)
+    schedule = build_schedule(path_index, els.maturity_months, els.obs_interval_months, starts=starts)
+    if len(schedule) == 0:
+        return None
+    result = evaluate(path_index, schedule, [els], path_stats=path_stats, backend=backend,
+                      memory_budget=memory_budget)
+    df = result_frame(path_index, schedule, result)
+    if sampling != "daily":
+        df["weight"] = sampling_weights(path_index, schedule, sampling)
+    return df
+
+
+def assert_backend_parity(path_index, schedule, structures):
+    """
+    numpy / numba 백엔드가 같은 결과를 내는지 검증 (불일치 시 AssertionError)
+    수익률·낙인·차수·상환일·최초 낙인일·낙인 체류일·최저 worst-of는 완전 일치 비교
+    """
+    ref = evaluate(path_index, schedule, structures, path_stats=True, backend="numpy")
+    got = evaluate(path_index, schedule, structures, path_stats=True, backend="numba")
+    for name in ["returns", "ki", "step", "redemption", "ki_index", "days_below_ki", "min_worst"]:
+        a, b = getattr(ref, name), getattr(got, name)
+        if not np.array_equal(a, b):
+            bad = np.argwhere(a != b)
+            raise AssertionError(f"백엔드 불일치: {name} ({len(bad)}건, 첫 위치 {tuple(bad[0])})")
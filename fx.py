@@ -0,0 +1,76 @@
+"""
+환율 레이어 (퀀토 / 콤포, Streamlit 비의존 모듈)
+
+원화 투자자 기준으로 해외 기초자산 가격을 원화로 환산한 콤포(compo) 백테스트를 지원한다.
+- 퀀토(quanto): 기초자산 현지 통화 수익률 그대로 (환율 미반영, 기존 백테스트와 동일)
+- 콤포(compo): 가격 × 환율(원/외화)로 환산 → 평가일 비율 = 현지 수익률 × 환율 변동
+
+환율 시계열은 기초자산과 같은 다운로드 캐시·합집합 캘린더 정렬(AlignedPrices)로 받아오고,
+바스켓 행 필터링도 자산·환율 열을 함께 골라 한 번에 처리한다.
+엔진에는 원화 환산 가격 행렬을 넘기므로 추가 비용은 (T, A) 곱셈 한 번이다.
+"""
+import numpy as np
+
+BASE_CURRENCY = "KRW"
+
+# 통화 -> 원화 환율 티커 (1 외화당 원화, yfinance 기준)
+FX_TICKERS = {
+    "USD": "KRW=X",
+    "HKD": "HKDKRW=X",
+    "EUR": "EURKRW=X",
+    "JPY": "JPYKRW=X",
+}
+
+FX_MODES = ("quanto", "compo")
+
+
+def fx_tickers(currencies, base=BASE_CURRENCY):
+    """필요한 환율 티커 목록 (기준 통화 제외, 중복 제거, 입력 순서 유지)"""
+    out = []
+    for cur in currencies:
+        if cur == base:
+            continue
+        if cur not in FX_TICKERS:
+            raise ValueError(f"지원하지 않는 통화입니다: {cur} (가능: {', '.join(FX_TICKERS)})")
+        if FX_TICKERS[cur] not in out:
+            out.append(FX_TICKERS[cur])
+    return out
+
+
+def fx_matrix(frame, currencies, base=BASE_CURRENCY):
+    """
+    자산 열 순서에 맞춘 환율 행렬 (T, A), 기준 통화 자산은 1.0
+    frame: 환율 티커 열을 포함한 정렬 가격 (바스켓 행과 같은 인덱스)
+    """
+    out = np.ones((len(frame), len(currencies)))
+    for j, cur in enumerate(currencies):
+        if cur != base:
+            out[:, j] = frame[FX_TICKERS[cur]].to_numpy(dtype=float)
+    return out
+
+
+def compo_basket(aligned, tickers, currencies, mode="compo", base=BASE_CURRENCY, field="close"):
+    """
+    정렬 결과에서 바스켓 가격을 골라 통화 구조 적용
+
+    aligned   : market_data.AlignedPrices (기초자산 + 환율 티커를 함께 정렬한 결과)
+    tickers   : 기초자산 티커 (열 순서)
+    currencies: 자산별 가격 통화
+    mode      : 'quanto'는 현지 가격 그대로, 'compo'는 원화 환산 가격
+    field     : 'close'(종가) 또는 'low'(장중 저가, 콤포는 같은 날 환율 종가로 환산)
+    자산·환율이 모두 값을 가진 행만 남김 (AlignedPrices.basket 캐시 재사용)
+    """
+    if mode not in FX_MODES:
+        raise ValueError(f"지원하지 않는 통화 구조입니다: {mode} (가능: {', '.join(FX_MODES)})")
+    tickers = list(tickers)
+    pick = aligned.basket_low if field == "low" else aligned.basket
+    if mode == "quanto":
+        return pick(tickers)
+
+    needed = fx_tickers(currencies, base)
+    missing = [t for t in needed if t not in aligned.columns]
+    if missing:
+        raise ValueError(f"환율 데이터가 없습니다: {', '.join(missing)}")
+    frame = aligned.basket(tickers + needed)
+    prices = pick(tickers + needed)[tickers]
+    return prices * fx_matrix(frame, currencies, base)
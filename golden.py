@@ -0,0 +1,299 @@
+"""
+골든 결과 회귀 검증 하네스 (Streamlit 비의존 모듈)
+
+최적화 엔진(벡터화 NumPy, numba 커널, 메모리 청크, 다중 구조, 발행일 샘플링)이
+기준 구현 run_backtest_reference / simulate_els 와 완전히 같은 결과를 내는지
+무작위 합성 바스켓 × 무작위 StepDownELS 조건으로 검증하고, 속도 향상과 불일치를 보고한다.
+
+기준 구현의 규칙 중 특히 어긋나기 쉬운 부분을 일부러 건드리도록 데이터를 만든다.
+- 익영업일 스냅: 임의 휴장일 삭제, 수십 거래일짜리 데이터 공백
+- 10거래일 미만 구간 제외: 데이터 공백 직전 발행일은 만기 구간이 짧아짐
+- 상환 평가일까지만 낙인: 낮은 KI·높은 변동성 조합, 급락 점프
+- 배리어 경계값: 가격을 호가 단위로 반올림하고 상환 기준을 5%p 단위로 두어
+  worst-of가 상환/낙인 기준과 정확히 같은 경우(>=, < 판정)가 자주 나오게 함
+- 365.25일 쿠폰 경과: 수익률을 허용 오차 없이 완전 일치로 비교
+- 저가 기준 낙인 관측: 시행 절반은 합성 장중 저가(급락 꼬리 포함)를 붙여 비교
+
+사용 예:
+  python golden.py --trials 20 --seed 0
+  python golden.py --variants numpy chunked --max-days 800
+
+불일치가 있으면 종료 코드 1 (CI 게이트로 사용 가능)
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import (
+    PathIndex, StepDownELS, build_schedule, evaluate, result_frame,
+    run_backtest, run_backtest_reference, sample_starts, simulate_els,
+)
+from kernels import HAS_NUMBA
+from planner import DEFAULT_MEMORY_BUDGET, plan_evaluation
+
+COMPARE_COLUMNS = ["return", "ki", "step"]
+MATURITIES = [6, 12, 18, 24, 36]
+OBS_INTERVALS = [1, 2, 3, 4, 6, 12]
+KI_LEVELS = np.arange(45, 95, 5) / 100.0
+CHUNK_ROWS = 37          # chunked 변형: 청크당 발행일 수 (청크 경계가 여러 번 생기도록)
+DETAIL_SAMPLES = 5       # 시행마다 simulate_els(return_detail=True)로 상환일·최초 낙인일까지 비교할 케이스 수
+
+
+# =============================
+# 합성 데이터 / 무작위 구조
+# =============================
+def synthetic_basket(rng, n_days, n_assets, tick=None):
+    """
+    합성 바스켓 가격 (영업일 캘린더에서 임의 휴장일·데이터 공백 삭제)
+    tick이 있으면 가격을 호가 단위로 반올림 (배리어 경계값 케이스 생성)
+    """
+    start = pd.Timestamp(int(rng.integers(2000, 2016)), int(rng.integers(1, 13)), int(rng.integers(1, 29)))
+    index = pd.bdate_range(start, periods=n_days)
+    drop = rng.choice(n_days, n_days // 20, replace=False)
+    if rng.random() < 0.3:
+        gap = int(rng.integers(40, 120))
+        at = int(rng.integers(1, max(2, n_days - gap)))
+        drop = np.union1d(drop, np.arange(at, min(at + gap, n_days)))
+    index = index.delete(drop)
+
+    vol = rng.uniform(0.01, 0.035, n_assets)
+    log_ret = rng.normal(-0.0002, 1.0, (len(index), n_assets)) * vol
+    jumps = rng.random((len(index), n_assets)) < 0.002
+    log_ret[jumps] += rng.uniform(-0.25, -0.05, jumps.sum())
+    prices = 100 * np.exp(np.cumsum(log_ret, axis=0))
+    if tick:
+        prices = np.maximum(np.round(prices / tick), 1) * tick
+    return pd.DataFrame(prices, index=index, columns=[f"A{i}" for i in range(n_assets)])
+
+
+def synthetic_lows(rng, prices, tick=None):
+    """
+    합성 장중 저가: 종가 대비 일중 하락폭 |N(0, σ)| + 드물게 장중 급락 후 회복
+    호가 반올림으로 종가보다 높아지는 경우도 남겨 둠 (엔진이 min(저가, 종가)로 처리)
+    """
+    shape = prices.shape
+    dip = np.abs(rng.normal(0.0, 1.0, shape)) * rng.uniform(0.003, 0.02, shape[1])
+    flash = rng.random(shape) < 0.01
+    dip[flash] += rng.uniform(0.05, 0.3, flash.sum())
+    lows = prices.to_numpy() * np.exp(-dip)
+    if tick:
+        lows = np.maximum(np.round(lows / tick), 1) * tick
+    return pd.DataFrame(lows, index=prices.index, columns=prices.columns)
+
+
+def random_els(rng, maturity_months=None, obs_interval_months=None):
+    """무작위 스텝다운 구조 (상환 기준 5%p 단위, 쿠폰 0~20%, KI 45~90%)"""
+    maturity = int(maturity_months or rng.choice(MATURITIES))
+    if obs_interval_months is None:
+        obs_interval_months = int(rng.choice([o for o in OBS_INTERVALS if maturity % o == 0]))
+    n_obs = maturity // obs_interval_months
+    levels = np.round(rng.integers(12, 21, n_obs) * 0.05, 2)
+    return StepDownELS(
+        maturity_months=maturity,
+        obs_interval_months=int(obs_interval_months),
+        early_levels=[float(x) for x in levels],
+        coupon_annual=float(np.round(rng.uniform(0, 0.2), 4)),
+        knock_in=float(rng.choice(KI_LEVELS)),
+    )
+
+
+# =============================
+# 엔진 변형
+# =============================
+# 변형 함수: (prices, els, rng, lows) -> (결과 DataFrame, 비교 대상 발행일 또는 None=전체)
+def _engine(prices, els, lows=None, backend="numpy", memory_budget=DEFAULT_MEMORY_BUDGET, extra=()):
+    path_index = PathIndex(prices, lows=lows)
+    schedule = build_schedule(path_index, els.maturity_months, els.obs_interval_months)
+    if len(schedule) == 0:
+        return None
+    result = evaluate(path_index, schedule, [els, *extra], path_stats=True, backend=backend,
+                      memory_budget=memory_budget)
+    return result_frame(path_index, schedule, result)
+
+
+def _variant_numpy(prices, els, rng, lows=None):
+    return _engine(prices, els, lows, "numpy"), None
+
+
+def _variant_numba(prices, els, rng, lows=None):
+    return _engine(prices, els, lows, "numba"), None
+
+
+def _variant_chunked(prices, els, rng, lows=None):
+    n_obs = els.maturity_months // els.obs_interval_months
+    budget = plan_evaluation(1, 1, n_obs, prices.shape[1]).bytes_per_row * CHUNK_ROWS
+    return _engine(prices, els, lows, "numpy", memory_budget=budget), None
+
+
+def _variant_multi(prices, els, rng, lows=None):
+    """같은 만기/주기의 다른 구조와 함께 평가 (구조 축 브로드캐스트 검증)"""
+    extra = [random_els(rng, els.maturity_months, els.obs_interval_months) for _ in range(2)]
+    return _engine(prices, els, lows, "numpy", extra=extra), None
+
+
+def _variant_sampled(prices, els, rng, lows=None):
+    """주별 샘플링: 샘플 발행일의 결과가 일별 기준 결과의 해당 행과 같아야 함"""
+    df = run_backtest(prices, els, backend="numpy", sampling="weekly", lows=lows)
+    path_index = PathIndex(prices)
+    return df, path_index.index[sample_starts(path_index, "weekly")]
+
+
+VARIANTS = {
+    "numpy": _variant_numpy,
+    "chunked": _variant_chunked,
+    "multi": _variant_multi,
+    "sampled": _variant_sampled,
+}
+if HAS_NUMBA:
+    VARIANTS["numba"] = _variant_numba
+
+
+# =============================
+# 비교
+# =============================
+def compare_frames(ref, got, dates=None):
+    """
+    기준 결과와 변형 결과를 발행일 기준으로 완전 일치 비교
+    반환: 불일치 목록 [{start_date, column, expected, got}] (행 누락은 column='row')
+    """
+    ref = ref.set_index("start_date")[COMPARE_COLUMNS] if ref is not None else pd.DataFrame(columns=COMPARE_COLUMNS)
+    got = got.set_index("start_date")[COMPARE_COLUMNS] if got is not None else pd.DataFrame(columns=COMPARE_COLUMNS)
+    if dates is not None:
+        ref = ref[ref.index.isin(dates)]
+    out = []
+    for d in ref.index.difference(got.index):
+        out.append({"start_date": d, "column": "row", "expected": "present", "got": "missing"})
+    for d in got.index.difference(ref.index):
+        out.append({"start_date": d, "column": "row", "expected": "missing", "got": "present"})
+    common = ref.index.intersection(got.index)
+    for col in COMPARE_COLUMNS:
+        a, b = ref.loc[common, col].to_numpy(), got.loc[common, col].to_numpy()
+        same = (a == b) | (pd.isna(a) & pd.isna(b))
+        for k in np.flatnonzero(~same):
+            out.append({"start_date": common[k], "column": col, "expected": a[k], "got": b[k]})
+    return out
+
+
+def compare_details(prices, els, got, rng, n_samples=DETAIL_SAMPLES, lows=None):
+    """무작위 케이스의 상환 평가일·최초 낙인일을 simulate_els(return_detail=True)와 비교"""
+    out = []
+    if got is None or "redemption_date" not in got.columns or len(got) == 0:
+        return out
+    for k in rng.choice(len(got), min(n_samples, len(got)), replace=False):
+        row = got.iloc[k]
+        start = row["start_date"]
+        maturity = prices.index[prices.index.searchsorted(start + pd.DateOffset(months=els.maturity_months))]
+        low_window = lows.loc[start:maturity] if lows is not None else None
+        _, _, _, detail = simulate_els(prices.loc[start:maturity], els, start, return_detail=True, low_window=low_window)
+        ki_date = row["ki_date"] if pd.notna(row["ki_date"]) else None
+        for col, expected, value in [("redemption_date", detail["redemption_date"], row["redemption_date"]),
+                                     ("ki_date", detail["ki_touch_date"], ki_date)]:
+            if expected != value:
+                out.append({"start_date": start, "column": col, "expected": expected, "got": value})
+    return out
+
+
+def _warm_up(variants):
+    """JIT 컴파일 시간이 속도 측정에 들어가지 않도록 작은 입력으로 한 번씩 실행"""
+    rng = np.random.default_rng(0)
+    prices = synthetic_basket(rng, 300, 2)
+    els = StepDownELS(6, 3, [0.9, 0.85], 0.05, 0.6)
+    for fn in variants.values():
+        fn(prices, els, rng)
+        fn(prices, els, rng, synthetic_lows(rng, prices))
+
+
+# =============================
+# 실행
+# =============================
+def run_golden(n_trials=20, seed=0, variants=None, min_days=300, max_days=1500, max_assets=3,
+               detail_samples=DETAIL_SAMPLES):
+    """
+    무작위 시행 n_trials회: 시행마다 합성 바스켓·구조를 만들고 기준 구현과 각 변형을 비교
+
+    반환: (report, mismatches)
+      report    : 시행 × 변형별 [trial, variant, n_assets, n_days, maturity, obs, tick,
+                  monitoring, cases, mismatches, ref_ms, variant_ms, speedup]
+      mismatches: 불일치 상세 [trial, variant, start_date, column, expected, got]
+    """
+    variants = {name: VARIANTS[name] for name in (variants or VARIANTS)}
+    _warm_up(variants)
+    rng = np.random.default_rng(seed)
+    rows, bad = [], []
+    for trial in range(n_trials):
+        n_assets = int(rng.integers(1, max_assets + 1))
+        tick = float(rng.choice([0.5, 1.0, 5.0])) if rng.random() < 0.5 else None
+        prices = synthetic_basket(rng, int(rng.integers(min_days, max_days + 1)), n_assets, tick)
+        els = random_els(rng)
+        lows = synthetic_lows(rng, prices, tick) if rng.random() < 0.5 else None
+
+        t0 = time.perf_counter()
+        ref = run_backtest_reference(prices, els, lows=lows)
+        ref_ms = (time.perf_counter() - t0) * 1e3
+
+        for name, fn in variants.items():
+            t0 = time.perf_counter()
+            got, dates = fn(prices, els, np.random.default_rng([seed, trial]), lows)
+            ms = (time.perf_counter() - t0) * 1e3
+            found = compare_frames(ref, got, dates)
+            found += compare_details(prices, els, got, np.random.default_rng([seed, trial]), detail_samples, lows)
+            bad += [{"trial": trial, "variant": name, **m} for m in found]
+            rows.append({
+                "trial": trial, "variant": name, "n_assets": n_assets, "n_days": len(prices),
+                "maturity": els.maturity_months, "obs": els.obs_interval_months, "tick": tick,
+                "monitoring": "close" if lows is None else "low",
+                "cases": 0 if got is None else len(got), "mismatches": len(found),
+                "ref_ms": ref_ms, "variant_ms": ms, "speedup": ref_ms / ms if ms > 0 else np.nan,
+            })
+    mismatches = pd.DataFrame(bad, columns=["trial", "variant", "start_date", "column", "expected", "got"])
+    return pd.DataFrame(rows), mismatches
+
+
+def summarize(report):
+    """변형별 요약: 시행 수, 케이스 수, 불일치 수, 속도 향상 (중위/최소)"""
+    return report.groupby("variant", sort=False).agg(
+        trials=("trial", "count"),
+        cases=("cases", "sum"),
+        mismatches=("mismatches", "sum"),
+        speedup_median=("speedup", "median"),
+        speedup_min=("speedup", "min"),
+    )
+
+
+def check_golden(**kwargs):
+    """run_golden 실행 후 불일치가 있으면 AssertionError (첫 불일치 내용 포함)"""
+    report, mismatches = run_golden(**kwargs)
+    if len(mismatches):
+        first = mismatches.iloc[0]
+        raise AssertionError(
+            f"기준 구현과 불일치 {len(mismatches)}건: 시행 {first.trial} {first.variant} "
+            f"{first.start_date} {first.column} (기대 {first.expected}, 결과 {first.got})"
+        )
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="최적화 엔진 vs 기준 구현 골든 결과 검증")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS))
+    parser.add_argument("--min-days", type=int, default=300)
+    parser.add_argument("--max-days", type=int, default=1500)
+    parser.add_argument("--max-assets", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    report, mismatches = run_golden(args.trials, args.seed, args.variants, args.min_days,
+                                    args.max_days, args.max_assets)
+    with pd.option_context("display.width", 120, "display.max_columns", 20):
+        print(summarize(report).round(1))
+        if len(mismatches):
+            print(f"\n불일치 {len(mismatches)}건 (처음 20건)")
+            print(mismatches.head(20).to_string(index=False))
+    return 1 if len(mismatches) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+발행사 델타 헤지 손익 백테스트 (Streamlit 비의존 모듈)
+
+발행한 ELS 매도 포지션을 과거 경로에서 매일 종가에 델타 헤지했을 때의 손익을
+투자자 수익률과 함께 발행일별로 계산한다.
+
+델타는 노트마다 매일 다시 가격을 매기지 않고 구조별로 한 번 만든 가격 격자에서 조회한다.
+- 상태: (관측일까지 남은 시간, worst-of 수준, 낙인 여부) — worst-of 자산 하나를 상수 변동성
+  GBM으로 보는 1요인 근사 (무위험 이자율 0, 할인 없음)
+- 격자: 로그 worst-of 삼항 격자 역진 귀납, 낙인 전/후 두 층, 관측일마다 조기상환 경계 적용
+- 헤지: 그날 worst-of 자산 하나에 델타만큼 보유, worst-of 자산이 바뀌면 교체 매매
+
+노트의 실제 관측일(익영업일 스냅)과 격자의 명목 관측 시점(월 21거래일)은 다음 관측일까지 남은
+거래일로 맞춘다. 겹쳐 발행된 노트 수천 건을 (노트 × 경과일) 배열 청크로 한 번에 평가한다.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from engine import build_schedule, case_weights
+from planner import plan_chunks
+
+STEPS_PER_MONTH = 21
+TRADING_DAYS = 252
+DEFAULT_COST_BPS = 5.0
+HEDGE_MEMORY_BUDGET = 64 * 2**20
+GRID_RANGE = (0.02, 3.0)   # 격자 worst-of 범위 (발행 기준 비율)
+
+HEDGE_COLUMNS = ["model_value", "payoff", "hedge_pnl", "costs", "turnover", "hedge_error", "issuer_pnl"]
+
+
+# =============================
+# 가격 격자
+# =============================
+@dataclass
+class PricingGrid:
+    """
+    구조 하나의 1요인 가격 격자
+
+    x0, dx    : 로그 worst-of 격자 (x_j = x0 + j·dx)
+    obs_steps : (n_obs,) 명목 관측 시점 (격자 단계)
+    value     : (2, Tg+1, M) 조기상환 판정 전 연속 가치 (0: 낙인 전, 1: 낙인 후)
+    delta     : (2, Tg+1, M) dV/dw (worst-of 비율 1단위당)
+    """
+    x0: float
+    dx: float
+    vol: float
+    obs_steps: np.ndarray
+    value: np.ndarray
+    delta: np.ndarray
+
+    def _interp(self, table, ki, g, w):
+        """(낙인 여부, 격자 시점, worst-of) 배열 위치의 선형 보간"""
+        M = table.shape[2]
+        j = (np.log(w) - self.x0) / self.dx
+        j0 = np.clip(np.floor(j).astype(np.int64), 0, M - 2)
+        f = np.clip(j - j0, 0.0, 1.0)
+        k = np.asarray(ki, dtype=np.int64)
+        lo = table[k, g, j0]
+        hi = table[k, g, j0 + 1]
+        return lo + (hi - lo) * f
+
+    def value_at(self, ki, g, w):
+        return self._interp(self.value, ki, g, w)
+
+    def delta_at(self, ki, g, w):
+        return self._interp(self.delta, ki, g, w)
+
+
+def _trinomial_step(V, pu, pm, pd_):
+    """삼항 격자 한 단계 역진 (양끝은 선형 외삽)"""
+    out = np.empty_like(V)
+    out[1:-1] = pu * V[2:] + pm * V[1:-1] + pd_ * V[:-2]
+    out[0] = 2 * out[1] - out[2]
+    out[-1] = 2 * out[-2] - out[-3]
+    return out
+
+
+def build_pricing_grid(els, vol, steps_per_month=STEPS_PER_MONTH, grid_range=GRID_RANGE):
+    """
+    삼항 격자 역진 귀납으로 (격자 시점, 낙인 여부, 로그 worst-of) 가치·델타 표 생성
+    위험중립 드리프트 -½σ² (이자율 0), 쿠폰은 명목 경과 기간(개월/12) 기준
+    """
+    dt = 1.0 / TRADING_DAYS
+    nu = -0.5 * vol ** 2
+    dx = vol * np.sqrt(3.0 * dt)
+    pu = 1.0 / 6.0 + nu * np.sqrt(dt / (12.0 * vol ** 2))
+    pd_ = 1.0 / 6.0 - nu * np.sqrt(dt / (12.0 * vol ** 2))
+    pm = 2.0 / 3.0
+
+    x0 = np.log(grid_range[0])
+    M = int(np.ceil((np.log(grid_range[1]) - x0) / dx)) + 1
+    w = np.exp(x0 + dx * np.arange(M))
+    below = w < els.knock_in
+
+    n_obs = els.maturity_months // els.obs_interval_months
+    obs_steps = np.arange(1, n_obs + 1) * els.obs_interval_months * steps_per_month
+    Tg = int(obs_steps[-1])
+    levels = np.asarray(els.early_levels, dtype=float)
+    coupons = 1.0 + els.coupon_annual * np.arange(1, n_obs + 1) * els.obs_interval_months / 12.0
+    full = 1.0 + els.coupon_annual * els.maturity_months / 12.0
+
+    value = np.empty((2, Tg + 1, M))
+    # 만기: 마지막 관측 상환 또는 (낙인 후) worst-of / (낙인 전) 만기 쿠폰
+    V1 = np.where(w >= levels[-1], coupons[-1], w)
+    V0 = np.where(below, V1, np.where(w >= levels[-1], coupons[-1], full))
+    value[0, Tg], value[1, Tg] = V0, V1
+    obs_at = dict(zip(obs_steps[:-1].tolist(), range(n_obs - 1)))
+    for t in range(Tg - 1, -1, -1):
+        C1 = _trinomial_step(V1, pu, pm, pd_)
+        C0 = np.where(below, C1, _trinomial_step(V0, pu, pm, pd_))
+        value[0, t], value[1, t] = C0, C1
+        i = obs_at.get(t)
+        if i is not None:
+            called = w >= levels[i]
+            V0 = np.where(called, coupons[i], C0)
+            V1 = np.where(called, coupons[i], C1)
+        else:
+            V0, V1 = C0, C1
+
+    delta = np.gradient(value, dx, axis=2) / w
+    return PricingGrid(x0=x0, dx=dx, vol=float(vol), obs_steps=obs_steps,
+                       value=value.astype(np.float32), delta=delta.astype(np.float32))
+
+
+def hedge_vol(prices):
+    """격자 변동성 기본값: 자산별 일별 로그수익률 연율 변동성 중 최대 (worst-of 자산 근사)"""
+    logret = np.log(prices).diff().dropna()
+    return float(logret.std().max() * np.sqrt(TRADING_DAYS))
+
+
+# =============================
+# 헤지 백테스트
+# =============================
+def _grid_time(grid, obs_offsets, tau):
+    """
+    노트 경과일 tau (L,)의 격자 시점 (n, L): 다음 관측일까지 남은 거래일을 명목 관측 시점에서 뺀 값
+    (관측일 당일 미상환이면 그 관측 시점의 연속 가치)
+    """
+    n_obs = obs_offsets.shape[1]
+    nxt = np.minimum((tau[None, :, None] > obs_offsets[:, None, :]).sum(axis=2), n_obs - 1)
+    steps = grid.obs_steps
+    remaining = np.take_along_axis(obs_offsets, nxt, axis=1) - tau[None, :]
+    lower = np.where(nxt > 0, steps[np.maximum(nxt - 1, 0)] + 1, 0)
+    return np.clip(steps[nxt] - remaining, lower, steps[nxt])
+
+
+def _hedge_chunk(P, grid, starts, obs, life, ki_index, cost):
+    """노트 청크의 (헤지 손익, 거래 비용, 회전율) — 배열 (n,)"""
+    L = int(life.max()) + 1
+    tau = np.arange(L)
+    rows = np.minimum(starts[:, None] + tau, len(P) - 1)
+    R = P[rows] / P[starts][:, None, :]                         # (n, L, A) 발행 기준 비율
+    alive = tau[None, :] < life[:, None]                        # 그날 종가 이후 헤지 보유
+    worst_asset = R.argmin(axis=2)
+    W = np.take_along_axis(R, worst_asset[:, :, None], axis=2)[:, :, 0]
+    ki = (ki_index[:, None] >= 0) & (starts[:, None] + tau >= ki_index[:, None])
+    g = _grid_time(grid, obs - starts[:, None], tau)
+    delta = np.where(alive, grid.delta_at(ki, g, W), 0.0)
+
+    held = worst_asset[:, :-1, None]
+    move = np.take_along_axis(R[:, 1:], held, axis=2)[:, :, 0] - np.take_along_axis(R[:, :-1], held, axis=2)[:, :, 0]
+    pnl = (delta[:, :-1] * move).sum(axis=1)
+
+    # 자산별 보유량 변화 × 그날 비율 = 거래 금액 (상환일에 전량 청산)
+    A = R.shape[2]
+    holdings = delta[:, :, None] * (worst_asset[:, :, None] == np.arange(A))
+    trades = np.abs(np.diff(holdings, axis=1, prepend=0.0)) * R
+    turnover = trades.sum(axis=(1, 2))
+    return pnl, turnover * cost, turnover
+
+
+def hedge_backtest(path_index, cases, els, grid=None, vol=None, cost_bps=DEFAULT_COST_BPS,
+                   memory_budget=HEDGE_MEMORY_BUDGET):
+    """
+    발행일별 델타 헤지 손익 (발행사 = 노트 매도, 액면 1)
+
+    cases: engine.CaseIndex (상환·낙인 위치를 재평가 없이 사용)
+    반환: start_date 인덱스, HEDGE_COLUMNS 열 DataFrame
+      model_value : 발행 시점 격자 가치 V0
+      hedge_pnl   : 헤지 포지션 손익 (비용 전)
+      hedge_error : V0 - 상환금 + hedge_pnl (완전 복제면 0)
+      issuer_pnl  : 1 - 상환금 + hedge_pnl - costs
+    """
+    if grid is None:
+        grid = build_pricing_grid(els, vol if vol is not None else hedge_vol(
+            pd.DataFrame(path_index.values, index=path_index.index)))
+    schedule = build_schedule(path_index, els.maturity_months, els.obs_interval_months,
+                              starts=cases.starts.astype(np.int64))
+    P = np.asarray(path_index.values, dtype=float)
+    starts = cases.starts.astype(np.int64)
+    life = (cases.redemption - cases.starts).astype(np.int64)
+    ki_index = cases.ki_index.astype(np.int64)
+    cost = cost_bps / 1e4
+
+    n = len(starts)
+    A = P.shape[1]
+    L = int(life.max()) + 1 if n else 1
+    per_note = L * (A * 8 * 6 + 8 * 8 + schedule.obs.shape[1])
+    plan = plan_chunks(n, per_note, memory_budget)
+    pnl, costs, turnover = np.empty(n), np.empty(n), np.empty(n)
+    for lo, hi in plan.chunks(n):
+        # 청크는 가장 긴 노트 길이로 맞춤 (발행일 순 청크라 노트 길이가 비슷함)
+        pnl[lo:hi], costs[lo:hi], turnover[lo:hi] = _hedge_chunk(
+            P, grid, starts[lo:hi], schedule.obs[lo:hi], life[lo:hi], ki_index[lo:hi], cost)
+
+    v0 = float(grid.value_at(0, 0, 1.0))
+    payoff = 1.0 + cases.returns
+    return pd.DataFrame({
+        "model_value": v0,
+        "payoff": payoff,
+        "hedge_pnl": pnl,
+        "costs": costs,
+        "turnover": turnover,
+        "hedge_error": v0 - payoff + pnl,
+        "issuer_pnl": 1.0 - payoff + pnl - costs,
+    }, index=pd.Index(cases.start_dates, name="start_date"))
+
+
+def weighted_quantile(values, weights, q):
+    """가중 분위수 (누적 가중치가 q 비율에 닿는 첫 값)"""
+    order = np.argsort(values, kind="stable")
+    cum = np.cumsum(weights[order])
+    return values[order][min(np.searchsorted(cum, q * cum[-1]), len(cum) - 1)]
+
+
+def hedge_summary(frame, weights=None):
+    """
+    헤지 손익 요약: 헤지 없음 / 델타 헤지 발행사 손익 평균·표준편차·하위 5%
+
+    weights: frame 행(발행일 순)별 케이스 가중치 (engine.case_weights, 없으면 모두 1)
+             샘플링 발행일이면 일별 발행 기준 근사 — 최저값만 가중치와 무관
+    """
+    w = case_weights(frame) if weights is None else np.asarray(weights, dtype=float)
+    unhedged = 1.0 - frame["payoff"]
+    rows = {
+        "unhedged": unhedged,
+        "hedged": frame["issuer_pnl"],
+        "hedge_error": frame["hedge_error"],
+        "costs": frame["costs"],
+    }
+    W = w.sum()
+    stats = {}
+    for name, s in rows.items():
+        x = s.to_numpy(dtype=float)
+        mean = np.dot(w, x) / W
+        # 빈도 가중 표본 분산 (가중치가 모두 1이면 ddof=1 표준편차와 같음)
+        var = np.dot(w, (x - mean) ** 2) / (W - 1) if W > 1 else np.nan
+        stats[name] = {"mean": mean, "std": np.sqrt(var), "p05": weighted_quantile(x, w, 0.05), "min": x.min()}
+    return pd.DataFrame(stats).T
@@ -0,0 +1,216 @@
+"""
+가격 데이터 정렬 (Streamlit 비의존 모듈)
+
+거래소별 휴장일이 다른 자산들을 합집합 캘린더 위에 올려두고,
+자산별 유효 마스크와 결측 구간(gap) 리포트를 함께 보관한다.
+바스켓 구성은 정렬이 끝난 행렬에서 열만 골라 재정렬 없이 만든다.
+
+장중 저가 기준 낙인 관측용 OHLC는 티커별 float32 (T, 4) 배열로 보관하고
+(가격 열 4개를 float64 DataFrame으로 들고 있는 것보다 메모리·캐시 크기가 절반),
+시가·고가·저가에도 종가와 같은 수정주가 비율(Adj Close / Close)을 적용한다.
+"""
+import os
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_FFILL = 5  # 연속 결측 허용 일수 (설·추석 등 연휴 커버)
+
+OHLC_FIELDS = ("Open", "High", "Low", "Close")
+
+
+def _last_valid_positions(mask):
+    """각 행 기준 직전(자기 자신 포함) 유효 관측 위치, 없으면 -1"""
+    pos = np.where(mask, np.arange(mask.shape[0])[:, None], -1)
+    return np.maximum.accumulate(pos, axis=0)
+
+
+def _next_valid_positions(mask):
+    """각 행 기준 다음(자기 자신 포함) 유효 관측 위치, 없으면 행 개수"""
+    n = mask.shape[0]
+    pos = np.where(mask, np.arange(n)[:, None], n)
+    return np.minimum.accumulate(pos[::-1], axis=0)[::-1]
+
+
+@dataclass
+class AlignedPrices:
+    """
+    합집합 캘린더 기준 정렬 결과
+
+    frame    : 결측 구간 중 허용 한도 이하만 직전 값으로 채운 가격 (나머지는 NaN)
+    valid    : 실제 관측값 존재 여부 (채운 값은 False)
+    max_ffill: 채움 허용 한도 (연속 결측 거래일 수)
+    low      : 장중 저가 (frame과 같은 모양, 채운 날은 채운 종가, 저가 ≤ 종가). 없으면 None
+    """
+    frame: pd.DataFrame
+    valid: pd.DataFrame
+    max_ffill: int
+    low: pd.DataFrame = None
+    _baskets: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def basket(self, columns):
+        """
+        선택 자산들이 모두 가격을 가진 행만 추린 바스켓 가격 (요청 순서대로 열 정렬)
+        같은 조합은 캐시된 결과를 재사용
+        """
+        key = tuple(c for c in columns if c in self.frame.columns)
+        if key not in self._baskets:
+            sub = self.frame[list(key)]
+            rows = ~np.isnan(sub.values).any(axis=1)
+            self._baskets[key] = sub[rows]
+        return self._baskets[key]
+
+    def basket_low(self, columns):
+        """basket(columns)과 같은 행·열의 장중 저가"""
+        if self.low is None:
+            raise ValueError("장중 저가 데이터가 없습니다 (OHLC로 정렬한 결과가 필요).")
+        rows = self.basket(columns)
+        return self.low.loc[rows.index, list(rows.columns)]
+
+    @cached_property
+    def gap_report(self):
+        """
+        자산별 연속 결측 구간 리포트 (첫 관측 이전 구간은 제외)
+        filled=False인 구간은 허용 한도를 넘어 채우지 않은 구간
+        """
+        index = self.frame.index
+        mask = self.valid.values
+        n = mask.shape[0]
+        records = []
+        for j, col in enumerate(self.frame.columns):
+            m = mask[:, j]
+            observed = np.flatnonzero(m)
+            if len(observed) == 0:
+                continue
+            # 첫 관측 이후 결측 위치만 대상
+            miss = ~m
+            miss[:observed[0]] = False
+            if not miss.any():
+                continue
+            edges = np.diff(np.concatenate(([0], miss.astype(np.int8), [0])))
+            starts = np.flatnonzero(edges == 1)
+            ends = np.flatnonzero(edges == -1) - 1
+            for s, e in zip(starts, ends):
+                length = int(e - s + 1)
+                records.append({
+                    "asset": col,
+                    "start": index[s],
+                    "end": index[e],
+                    "length": length,
+                    "trailing": bool(e == n - 1),
+                    "filled": length <= self.max_ffill,
+                })
+        report = pd.DataFrame(records, columns=["asset", "start", "end", "length", "trailing", "filled"])
+        return report.set_index("asset")
+
+
+def align_prices(raw, max_ffill=DEFAULT_MAX_FFILL, low=None):
+    """
+    다운로드 원본(합집합 인덱스, 휴장일은 NaN)을 정렬
+
+    연속 결측 구간 길이가 max_ffill 이하인 경우에만 직전 값으로 채움.
+    더 긴 구간은 NaN으로 남겨 바스켓 구성 시 해당 행이 제외되도록 함.
+    전체 행렬을 한 번만 복사하고 NumPy 누적 연산으로 처리
+
+    low(같은 인덱스·열의 장중 저가)가 있으면 같은 캘린더로 정렬해 함께 보관.
+    채운 날(거래 없음)은 채운 종가를 저가로 쓰고, 저가는 종가를 넘지 않게 자름
+    """
+    raw = raw.sort_index()
+    values = raw.to_numpy(dtype=float, copy=True)
+    mask = ~np.isnan(values)
+
+    last_valid = _last_valid_positions(mask)
+    next_valid = _next_valid_positions(mask)
+    run_length = next_valid - last_valid - 1
+
+    fill = (~mask) & (last_valid >= 0) & (run_length <= max_ffill)
+    if fill.any():
+        rows, cols = np.nonzero(fill)
+        values[rows, cols] = values[last_valid[rows, cols], cols]
+
+    frame = pd.DataFrame(values, index=raw.index, columns=raw.columns)
+    valid = pd.DataFrame(mask, index=raw.index, columns=raw.columns)
+    if low is not None:
+        low_values = low.reindex(index=raw.index, columns=raw.columns).to_numpy(dtype=float)
+        low_values = np.fmin(np.where(mask, low_values, values), values)
+        low = pd.DataFrame(low_values, index=raw.index, columns=raw.columns)
+    return AlignedPrices(frame=frame, valid=valid, max_ffill=int(max_ffill), low=low)
+
+
+# =============================
+# OHLC (장중 저가 낙인 관측용)
+# =============================
+@dataclass
+class OHLCStore:
+    """
+    수정주가 OHLC (티커별 float32 열 저장)
+
+    index: 합집합 거래일
+    data : 티커 -> (T, 4) float32 배열 [Open, High, Low, Close], 거래 없는 날은 NaN
+    Close는 수정종가(Adj Close), 나머지는 같은 날 수정 비율을 곱한 값
+    frame(name)으로 필드 하나를 float64 (T, 티커) DataFrame으로 꺼냄
+    (float32 저장이라 종가는 정밀도가 낮음 — 앱은 저가만 꺼내고 종가는 float64 수정종가 사용)
+    """
+    index: pd.DatetimeIndex
+    data: dict
+
+    @property
+    def tickers(self):
+        return list(self.data)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.data.values())
+
+    def frame(self, name, tickers=None):
+        """필드 하나의 (T, 티커) float64 DataFrame (엔진 입력용)"""
+        j = OHLC_FIELDS.index(name)
+        tickers = list(tickers) if tickers is not None else self.tickers
+        values = np.column_stack([self.data[t][:, j] for t in tickers]).astype(float) if tickers else np.empty((len(self.index), 0))
+        return pd.DataFrame(values, index=self.index, columns=tickers)
+
+    def to_parquet(self, folder):
+        """티커별 Parquet 파일 (float32 열 4개)로 저장"""
+        os.makedirs(folder, exist_ok=True)
+        for ticker, arr in self.data.items():
+            frame = pd.DataFrame(arr, index=self.index, columns=list(OHLC_FIELDS))
+            frame.to_parquet(os.path.join(folder, f"{ticker}.parquet"))
+
+
+def read_ohlc_store(folder, tickers):
+    """to_parquet으로 저장한 티커별 OHLC를 합집합 인덱스로 다시 읽기"""
+    frames = {t: pd.read_parquet(os.path.join(folder, f"{t}.parquet")) for t in tickers}
+    index = pd.DatetimeIndex(sorted(set().union(*(f.index for f in frames.values()))))
+    data = {t: f.reindex(index).to_numpy(dtype=np.float32) for t, f in frames.items()}
+    return OHLCStore(index=index, data=data)
+
+
+def adjusted_ohlc(raw, tickers):
+    """
+    yfinance 원본(auto_adjust=False, (필드, 티커) 열) → 수정주가 OHLCStore
+
+    수정 비율 = Adj Close / Close (배당·분할 반영). 시가·고가·저가에 같은 비율을 곱하고
+    종가는 Adj Close를 그대로 사용 (Adj Close가 없으면 비율 1)
+    """
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    if not isinstance(raw.columns, pd.MultiIndex):
+        # 단일 티커: 열이 필드 이름
+        raw = pd.concat({tickers[0]: raw}, axis=1).swaplevel(0, 1, axis=1)
+    raw = raw.dropna(how="all").sort_index()
+    fields = set(raw.columns.get_level_values(0))
+    data = {}
+    for t in tickers:
+        if ("Close", t) not in raw.columns:
+            continue
+        close = raw[("Close", t)].to_numpy(dtype=float)
+        adj = raw[("Adj Close", t)].to_numpy(dtype=float) if "Adj Close" in fields else close
+        factor = adj / close
+        cols = [raw[(f, t)].to_numpy(dtype=float) * factor for f in OHLC_FIELDS[:3]]
+        data[t] = np.column_stack(cols + [adj]).astype(np.float32)
+    return OHLCStore(index=pd.DatetimeIndex(raw.index), data=data)
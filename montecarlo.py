@@ -0,0 +1,400 @@
+"""
+중요도 샘플링 몬테카를로 꼬리 위험 추정 (Streamlit 비의존 모듈)
+
+KI 35~40% 같은 보수적 구조는 손실 확률이 0.1% 안팎이라 단순 몬테카를로로
+쓸 만한 상대오차를 얻으려면 수백만 경로가 필요하다.
+상관 GBM 경로의 표준정규 충격에 일정한 이동 θ를 더한 측도 Q에서 경로를 뽑고
+우도비 dP/dQ = exp(-θ·S_τ + ½ τ|θ|²) 로 가중해 원래 측도의 기대값을 추정한다.
+(S_τ: 상환 평가일 τ까지 충격 합, τ 이후 충격은 페이오프와 무관하므로 정지시각 우도비)
+
+θ 선택
+- shift        : 자산별로 그 자산이 만기에 기대값으로 배리어에 닿는 최소 노름 이동(worst-of 낙인
+                 사건의 지배점)을 혼합 — 상관이 낮으면 지배점이 자산 수만큼 있으므로 하나만 쓰면
+                 다른 자산 경유 낙인에서 가중치가 폭발한다. θ = 0 방어 성분을 섞어 우도비 상한 보장
+                 (혼합 우도비 = 1 / Σ π_k exp(θ_k·S_τ - ½ τ|θ_k|²))
+- cross_entropy: 다단계 교차 엔트로피 — 파일럿 경로의 하위 ρ 분위수로 수준을 낮춰 가며
+                 θ = Σ w S_τ / Σ w τ 로 갱신 (가우시안 평균 이동의 닫힌 해)
+- naive        : θ = 0 (단순 몬테카를로, 비교 기준)
+
+페이오프는 백테스트와 같은 규칙(조기상환 시점 종료, 상환 평가일까지만 낙인 체크,
+쿠폰 365.25일 기준)으로 평가한다. numba가 있으면 경로들을 한 행렬로 이어 붙여
+kernels.evaluate_starts를 그대로 쓰고, 없으면 NumPy 벡터화 구현을 사용한다.
+"""
+import argparse
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from calendars import EXCHANGES, business_days, forward_schedule
+from engine import Schedule, StepDownELS
+from kernels import evaluate_starts, resolve_backend
+from planner import plan_chunks
+
+MC_METHODS = ("naive", "shift", "cross_entropy")
+MC_METRICS = ["loss_prob", "ki_prob", "avg_return", "expected_loss"]
+MC_MEMORY_BUDGET = 64 * 2**20
+TRADING_DAYS = 252
+
+DEFAULT_PATHS = 20_000
+CE_PILOT_PATHS = 4_000
+CE_RHO = 0.1
+CE_MAX_ITER = 10
+DEFENSIVE_WEIGHT = 0.1  # shift 혼합의 θ = 0 성분 비중
+
+
+# =============================
+# 모형 / 스케줄
+# =============================
+@dataclass
+class GBMModel:
+    """
+    상관 기하 브라운 운동 (연율)
+
+    mu    : (A,) 로그가 아닌 가격 드리프트
+    sigma : (A,) 변동성
+    corr  : (A, A) 일별 로그수익률 상관행렬
+    """
+    names: list
+    mu: np.ndarray
+    sigma: np.ndarray
+    corr: np.ndarray
+    chol: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.mu = np.asarray(self.mu, dtype=float)
+        self.sigma = np.asarray(self.sigma, dtype=float)
+        self.corr = np.atleast_2d(np.asarray(self.corr, dtype=float))
+        self.chol = np.linalg.cholesky(self.corr)
+
+    @property
+    def n_assets(self):
+        return len(self.sigma)
+
+
+def calibrate_gbm(prices, drift=None):
+    """
+    가격 DataFrame의 일별 로그수익률로 GBM 추정 (연 252거래일)
+    drift: None이면 과거 평균, 숫자면 모든 자산 드리프트를 그 값으로 고정 (예: 0.0)
+    """
+    logret = np.log(prices).diff().dropna()
+    sigma = logret.std().to_numpy() * np.sqrt(TRADING_DAYS)
+    if drift is None:
+        mu = logret.mean().to_numpy() * TRADING_DAYS + 0.5 * sigma ** 2
+    else:
+        mu = np.full(len(sigma), float(drift))
+    corr = logret.corr().to_numpy() if logret.shape[1] > 1 else np.ones((1, 1))
+    return GBMModel(names=list(prices.columns), mu=mu, sigma=sigma, corr=corr)
+
+
+def mc_schedule(els, start=None, exchanges=()):
+    """
+    발행일 start부터 바스켓 공동 영업일 격자 위의 평가 스케줄 (경로 하나, 위치는 발행일=0 기준)
+    관측/만기일은 백테스트 캘린더와 같이 구성 거래소 휴장일 합집합 기준 익영업일로 스냅
+    (calendars.forward_schedule, exchanges가 비면 휴장일 없는 주중 캘린더)
+    """
+    start = pd.Timestamp.today().normalize() if start is None else pd.Timestamp(start)
+    exchanges = tuple(sorted(set(exchanges)))
+    obs_dates, end = forward_schedule(start, els.maturity_months, els.obs_interval_months, exchanges)
+    grid = business_days(start, end, exchanges)
+    if len(grid) == 0 or grid[0] != start:
+        grid = grid.insert(0, start)   # 휴장일 발행일도 격자 첫 행
+    obs = grid.searchsorted(obs_dates, side="left")
+    maturity = grid.searchsorted(end, side="left")
+    obs_days = (grid[obs] - start).days.to_numpy()
+    return Schedule(
+        starts=np.zeros(1, dtype=np.int64),
+        obs=obs.astype(np.int64)[None, :],
+        maturity=np.array([maturity], dtype=np.int64),
+        obs_days=obs_days.astype(np.int64)[None, :],
+        maturity_months=els.maturity_months,
+        obs_interval_months=els.obs_interval_months,
+    )
+
+
+# =============================
+# 경로 시뮬레이션 / 페이오프
+# =============================
+def _simulate(model, schedule, thetas, mix, n, rng):
+    """
+    이동 측도 Q에서 가격 비율 경로 R (n, T+1, A)와 누적 충격 S (n, T, A)
+    경로마다 혼합 성분 k ~ π를 뽑아 Z_t ~ N(θ_k, I), 로그수익률 = (μ - ½σ²)Δ + σ√Δ (L Z_t)
+    """
+    T = int(schedule.maturity[0])
+    A = model.n_assets
+    dt = schedule.maturity_months / 12.0 / T
+    Z = rng.standard_normal((n, T, A))
+    if np.any(thetas):
+        comp = rng.choice(len(mix), size=n, p=mix) if len(mix) > 1 else np.zeros(n, dtype=np.int64)
+        Z += thetas[comp][:, None, :]
+    X = Z @ (model.chol.T * (model.sigma * np.sqrt(dt)))
+    X += (model.mu - 0.5 * model.sigma ** 2) * dt
+    R = np.empty((n, T + 1, A))
+    R[:, 0] = 0.0
+    np.cumsum(X, axis=1, out=R[:, 1:])
+    np.exp(R, out=R)
+    np.cumsum(Z, axis=1, out=Z)
+    return R, Z
+
+
+def _payoff_numpy(R, schedule, els):
+    """NumPy 벡터화 평가: (returns, ki, tau, min_worst)"""
+    n = R.shape[0]
+    rows = np.arange(n)
+    obs, days, mat = schedule.obs[0], schedule.obs_days[0], int(schedule.maturity[0])
+    levels = np.asarray(els.early_levels, dtype=float)
+
+    W = R.min(axis=2)
+    hit = W[:, obs] >= levels
+    redeemed = hit.any(axis=1)
+    first = hit.argmax(axis=1)
+    tau = np.where(redeemed, obs[first], mat)
+    g = np.minimum.accumulate(W, axis=1)[rows, tau]
+    ki = g < els.knock_in
+
+    returns = np.where(
+        redeemed,
+        (1.0 + els.coupon_annual * (days[first] / 365.25)) - 1.0,
+        np.where(ki, W[:, mat] - 1.0, (1.0 + els.coupon_annual * (els.maturity_months / 12.0)) - 1.0),
+    )
+    return returns, ki, tau, g
+
+
+def _payoff_numba(R, schedule, els):
+    """경로들을 (n·(T+1), A) 행렬로 이어 붙여 컴파일 커널로 평가: (returns, ki, tau, min_worst)"""
+    n, width, A = R.shape
+    starts = np.arange(n, dtype=np.int64) * width
+    stacked = Schedule(
+        starts=starts,
+        obs=starts[:, None] + schedule.obs[0],
+        maturity=starts + schedule.maturity[0],
+        obs_days=np.broadcast_to(schedule.obs_days[0], (n, schedule.obs.shape[1])),
+        maturity_months=schedule.maturity_months,
+        obs_interval_months=schedule.obs_interval_months,
+    )
+    out = evaluate_starts(R.reshape(n * width, A), stacked, els)
+    return out["returns"], out["ki"], out["redemption"] - starts, out["min_worst"]
+
+
+PAYOFFS = {"numpy": _payoff_numpy, "numba": _payoff_numba}
+
+
+def _mixture(theta, mix=None):
+    """θ (A,) 또는 (K, A)와 혼합 비중 π (K,) 정규화"""
+    thetas = np.atleast_2d(np.asarray(theta, dtype=float))
+    mix = np.full(len(thetas), 1.0 / len(thetas)) if mix is None else np.asarray(mix, dtype=float)
+    return thetas, mix / mix.sum()
+
+
+def simulate_paths(model, els, schedule, theta, n_paths, seed=0, backend="auto",
+                   memory_budget=MC_MEMORY_BUDGET, mix=None):
+    """
+    θ 이동 측도(θ가 (K, A)면 비중 mix의 혼합)에서 n_paths 경로를 메모리 예산 청크로 나눠 평가
+
+    반환: dict (returns, ki, tau, min_worst, log_lr, shock) — shock은 S_τ (n, A)
+    """
+    payoff = PAYOFFS[resolve_backend(backend)]
+    thetas, mix = _mixture(theta, mix)
+    T, A = int(schedule.maturity[0]), model.n_assets
+    per_path = (T + 1) * A * 8 * 3 + (T + 1) * 8 * 3
+    plan = plan_chunks(n_paths, per_path, memory_budget)
+    seeds = np.random.SeedSequence(seed).spawn(plan.n_chunks)
+
+    parts = []
+    for (start, stop), s in zip(plan.chunks(n_paths), seeds):
+        rng = np.random.default_rng(s)
+        R, S = _simulate(model, schedule, thetas, mix, stop - start, rng)
+        returns, ki, tau, g = payoff(R, schedule, els)
+        shock = S[np.arange(stop - start), tau - 1]
+        parts.append((returns, ki, tau, g, shock))
+        del R, S
+
+    returns, ki, tau, g, shock = (np.concatenate(x) for x in zip(*parts))
+    # log dP/dQ = -log Σ π_k exp(θ_k·S_τ - ½ τ|θ_k|²) (logsumexp)
+    expo = shock @ thetas.T - 0.5 * tau[:, None] * (thetas ** 2).sum(axis=1) + np.log(mix)
+    top = expo.max(axis=1)
+    log_lr = -(top + np.log(np.exp(expo - top[:, None]).sum(axis=1)))
+    return {"returns": returns, "ki": ki, "tau": tau, "min_worst": g, "log_lr": log_lr, "shock": shock}
+
+
+# =============================
+# 측도 이동 θ
+# =============================
+def shift_theta(model, els, schedule, defensive=DEFENSIVE_WEIGHT):
+    """
+    자산별 낙인 지배점 혼합: 자산 a가 만기에 기대값으로 배리어 log(KI)에 닿는 최소 노름 θ_a = b_a · L[a]
+    (b_a는 자산 a의 단계별 표준화 필요 드리프트, L[a]는 단위 노름 촐레스키 행)
+    반환: (θ (A+1, A) — 마지막 행은 방어 성분 0, 혼합 비중 π)
+    """
+    T = int(schedule.maturity[0])
+    dt = schedule.maturity_months / 12.0 / T
+    need = np.log(els.knock_in) / T - (model.mu - 0.5 * model.sigma ** 2) * dt
+    b = np.minimum(need / (model.sigma * np.sqrt(dt)), 0.0)
+    thetas = np.vstack([b[:, None] * model.chol, np.zeros(model.n_assets)])
+    # 지배점까지 거리 |θ_a|²가 작을수록(낙인이 쉬울수록) 큰 비중
+    rate = np.exp(-0.5 * T * (b ** 2 - (b ** 2).min()))
+    mix = np.append((1.0 - defensive) * rate / rate.sum(), defensive)
+    return thetas, mix
+
+
+def cross_entropy_theta(model, els, schedule, n_pilot=CE_PILOT_PATHS, rho=CE_RHO, max_iter=CE_MAX_ITER,
+                        seed=0, backend="auto"):
+    """
+    다단계 교차 엔트로피로 낙인 사건 {상환 평가일까지 worst-of 최저 < KI}의 θ 추정
+    반환: (θ, 파일럿 경로 수 합계)
+    """
+    theta = np.zeros(model.n_assets)
+    used = 0
+    for it in range(max_iter):
+        sim = simulate_paths(model, els, schedule, theta, n_pilot, seed=(seed, it), backend=backend)
+        used += n_pilot
+        g = sim["min_worst"]
+        level = max(float(els.knock_in), float(np.quantile(g, rho)))
+        elite = g < level
+        if not elite.any():
+            break
+        w = np.exp(sim["log_lr"][elite] - sim["log_lr"][elite].max())
+        theta = (w @ sim["shock"][elite]) / (w @ sim["tau"][elite])
+        if level <= els.knock_in:
+            break
+    return theta, used
+
+
+# =============================
+# 추정
+# =============================
+@dataclass
+class MonteCarloResult:
+    """
+    estimates: MC_METRICS 행, [estimate, std_error, rel_error, variance_reduction] 열
+               variance_reduction = 같은 경로 수 단순 MC 분산 추정치 / 중요도 샘플링 분산
+    theta    : (K, A) 혼합 성분별 충격 이동, mix: (K,) 비중 (단일 측도면 K = 1)
+    ess      : 우도비 가중치의 유효 표본 수 (Σw)² / Σw²
+    """
+    estimates: pd.DataFrame
+    method: str
+    n_paths: int
+    pilot_paths: int
+    theta: np.ndarray
+    mix: np.ndarray
+    ess: float
+    elapsed: float
+
+    def equivalent_paths(self, metric="loss_prob"):
+        """같은 표준오차를 얻는 데 필요한 단순 MC 경로 수 추정"""
+        return self.n_paths * float(self.estimates.loc[metric, "variance_reduction"])
+
+
+def tail_estimates(sim):
+    """우도비 가중 경로 결과로 지표별 추정치/표준오차 계산"""
+    w = np.exp(sim["log_lr"])
+    ret = sim["returns"]
+    n = len(w)
+    values = np.vstack([
+        (ret < 0).astype(float),
+        sim["ki"].astype(float),
+        ret,
+        np.minimum(ret, 0.0),
+    ])
+    weighted = values * w
+    estimate = weighted.mean(axis=1)
+    std_error = weighted.std(axis=1, ddof=1) / np.sqrt(n)
+    naive_var = (values ** 2 * w).mean(axis=1) - estimate ** 2   # P 측도 분산 (가중 추정)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_error = np.abs(std_error / estimate)
+        reduction = naive_var / (std_error ** 2 * n)
+    return pd.DataFrame({
+        "estimate": estimate,
+        "std_error": std_error,
+        "rel_error": rel_error,
+        "variance_reduction": reduction,
+    }, index=pd.Index(MC_METRICS, name="metric")), float(w.sum() ** 2 / (w ** 2).sum())
+
+
+def run_monte_carlo(model, els, method="shift", n_paths=DEFAULT_PATHS, start=None, seed=0,
+                    backend="auto", theta=None, exchanges=()):
+    """
+    구조 하나의 꼬리 위험 지표를 (중요도 샘플링) 몬테카를로로 추정
+    theta를 주면 method와 무관하게 그 이동을 사용 (파일럿 생략, (K, A)면 균등 혼합)
+    exchanges: 바스켓 구성 거래소 (평가 스케줄·경로 단계 수를 공동 영업일 캘린더로 생성)
+    """
+    if method not in MC_METHODS:
+        raise ValueError(f"지원하지 않는 방법입니다: {method} (가능: {', '.join(MC_METHODS)})")
+    t0 = time.perf_counter()
+    schedule = mc_schedule(els, start, exchanges)
+    pilot, mix = 0, None
+    if theta is None:
+        if method == "shift":
+            theta, mix = shift_theta(model, els, schedule)
+        elif method == "cross_entropy":
+            theta, pilot = cross_entropy_theta(model, els, schedule, seed=seed + 1, backend=backend)
+        else:
+            theta = np.zeros(model.n_assets)
+    sim = simulate_paths(model, els, schedule, theta, n_paths, seed=seed, backend=backend, mix=mix)
+    estimates, ess = tail_estimates(sim)
+    theta, mix = _mixture(theta, mix)
+    return MonteCarloResult(
+        estimates=estimates,
+        method=method,
+        n_paths=int(n_paths),
+        pilot_paths=int(pilot),
+        theta=theta,
+        mix=mix,
+        ess=ess,
+        elapsed=time.perf_counter() - t0,
+    )
+
+
+def compare_methods(model, els, n_paths=DEFAULT_PATHS, methods=MC_METHODS, seed=0, backend="auto",
+                    metric="loss_prob", exchanges=()):
+    """방법별 추정치·표준오차·ESS와 단순 MC 대비 경로 절감 배수 (파일럿 포함 작업량 기준)"""
+    rows = {}
+    for method in methods:
+        res = run_monte_carlo(model, els, method, n_paths, seed=seed, backend=backend, exchanges=exchanges)
+        est = res.estimates.loc[metric]
+        rows[method] = {
+            "estimate": est["estimate"],
+            "std_error": est["std_error"],
+            "rel_error": est["rel_error"],
+            "ess": res.ess,
+            "paths": res.n_paths + res.pilot_paths,
+            "path_savings": res.equivalent_paths(metric) / (res.n_paths + res.pilot_paths),
+            "seconds": res.elapsed,
+        }
+    return pd.DataFrame.from_dict(rows, orient="index").rename_axis("method")
+
+
+# =============================
+# CLI
+# =============================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="중요도 샘플링 몬테카를로 꼬리 위험 비교")
+    parser.add_argument("--sigma", type=float, nargs="+", default=[0.18, 0.22, 0.25], help="자산별 연 변동성")
+    parser.add_argument("--corr", type=float, default=0.6, help="자산 간 공통 상관계수")
+    parser.add_argument("--drift", type=float, default=0.0)
+    parser.add_argument("--maturity", type=int, default=36)
+    parser.add_argument("--interval", type=int, default=6)
+    parser.add_argument("--levels", type=float, nargs="+", default=[0.85, 0.85, 0.80, 0.80, 0.75, 0.65])
+    parser.add_argument("--coupon", type=float, default=0.06)
+    parser.add_argument("--ki", type=float, default=0.35)
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS)
+    parser.add_argument("--methods", nargs="+", choices=MC_METHODS, default=list(MC_METHODS))
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--exchanges", nargs="*", choices=EXCHANGES, default=[], help="공동 영업일 캘린더 거래소")
+    args = parser.parse_args(argv)
+
+    A = len(args.sigma)
+    corr = np.full((A, A), args.corr)
+    np.fill_diagonal(corr, 1.0)
+    model = GBMModel(names=[f"asset{i + 1}" for i in range(A)], mu=np.full(A, args.drift),
+                     sigma=args.sigma, corr=corr)
+    els = StepDownELS(args.maturity, args.interval, args.levels, args.coupon, args.ki)
+    table = compare_methods(model, els, args.paths, args.methods, seed=args.seed, backend=args.backend,
+                            exchanges=args.exchanges)
+    print(table.to_string(float_format=lambda x: f"{x:.4g}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+실행 계획 (메모리 예산 기반 청크 크기 / 정밀도 선택, Streamlit 비의존 모듈)
+
+발행일 × 관측 × 자산, 경로 × 거래일 × 자산처럼 한 축이 큰 행렬 계산을
+메모리 예산 안에서 청크로 나누어 실행하기 위한 계획을 세운다.
+작업 버퍼는 청크 크기로 한 번만 잡고 모든 청크에서 재사용하므로
+최대 메모리는 문제 크기와 무관하게 예산 근처에서 일정하게 유지된다.
+
+정밀도 (float32 사용 시 허용 오차)
+- 쿠폰 수익률(조기상환·만기 쿠폰)은 경과일수 기반이라 float64와 완전히 동일
+- 낙인 손실 수익률은 상대오차 FLOAT32_RTOL 이내
+- worst-of가 상환/낙인 배리어와 float32 한 ulp(약 6e-8) 이내로 붙은 케이스는
+  판정이 바뀔 수 있으므로, 배리어 판정이 중요한 최종 리포트는 float64 권장
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+DEFAULT_MEMORY_BUDGET = 256 * 2**20  # 256MB
+FLOAT32_RTOL = 1e-6
+
+PRECISIONS = {
+    "float64": np.float64,
+    "float32": np.float32,
+}
+
+
+def resolve_dtype(precision="float64"):
+    if precision not in PRECISIONS:
+        raise ValueError(f"지원하지 않는 정밀도입니다: {precision} (가능: {', '.join(PRECISIONS)})")
+    return PRECISIONS[precision]
+
+
+@dataclass
+class ExecutionPlan:
+    """
+    청크 실행 계획
+
+    chunk_size    : 한 번에 처리하는 행(발행일 또는 경로) 수
+    n_chunks      : 청크 개수
+    bytes_per_row : 행 하나당 작업 버퍼 바이트 추정치
+    dtype         : 가격/비율 계산 dtype
+    """
+    chunk_size: int
+    n_chunks: int
+    bytes_per_row: int
+    dtype: type
+
+    def chunks(self, n_rows):
+        """[start, stop) 청크 구간 순회"""
+        for start in range(0, n_rows, self.chunk_size):
+            yield start, min(start + self.chunk_size, n_rows)
+
+
+def plan_chunks(n_rows, bytes_per_row, memory_budget=DEFAULT_MEMORY_BUDGET, dtype=np.float64):
+    """행당 작업 메모리 추정치와 예산으로 청크 크기 결정 (최소 1행)"""
+    bytes_per_row = max(1, int(bytes_per_row))
+    chunk = int(max(1, min(max(n_rows, 1), memory_budget // bytes_per_row)))
+    n_chunks = -(-n_rows // chunk) if n_rows else 0
+    return ExecutionPlan(chunk_size=chunk, n_chunks=n_chunks, bytes_per_row=bytes_per_row, dtype=dtype)
+
+
+def plan_evaluation(n_starts, n_structures, n_obs, n_assets,
+                    memory_budget=DEFAULT_MEMORY_BUDGET, precision="float64"):
+    """
+    engine.evaluate용 계획: 발행일 하나당 작업 버퍼 크기를 추정해 청크 크기 결정
+    (관측일 비율, 구조별 상환 판정, 구조별 구간 최소값/위치, 결과 중간값)
+    """
+    dtype = resolve_dtype(precision)
+    item = np.dtype(dtype).itemsize
+    per_start = (
+        (n_obs + 2) * n_assets * item                 # 발행일/관측일/만기 가격 비율
+        + (n_obs + 1) * item                          # 관측일·만기 worst-of
+        + n_structures * n_obs                        # 상환 판정 (bool)
+        + n_structures * n_assets * (3 * item + 2 * 8 + 1)  # 구간 최소값·위치 (좌/우)
+        + n_structures * (10 * 8 + 4 * item)          # 인덱스·수익률 중간값
+    )
+    return plan_chunks(n_starts, per_start, memory_budget, dtype)
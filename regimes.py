@@ -0,0 +1,132 @@
+"""
+발행 시점 시장 국면(변동성·상관) 조건부 성과 (Streamlit 비의존 모듈)
+
+발행일 직전 바스켓의 후행 변동성과 자산 간 평균 상관을 발행일별 특성으로 붙이고,
+특성 분위 구간(국면)별로 백테스트 성과를 집계한다.
+
+후행 창 통계는 수익률·교차곱의 누적합 차분으로 모든 시점을 한 번에 계산한다
+(창 길이와 무관하게 O(T·A²), pandas rolling().corr()의 쌍별 (T×A, A) 결과 없이).
+누적합 정밀도를 위해 자산별 전체 평균을 뺀 수익률로 누적한다 (공분산은 평행이동 불변).
+가격 행렬이 같으면 결과가 같으므로 호출 측(app)에서 결과별로 한 번만 계산해 재사용한다.
+"""
+import numpy as np
+import pandas as pd
+
+from engine import case_weights
+
+REGIME_WINDOWS = (20, 60, 120)
+REGIME_BUCKETS = 3
+TRADING_DAYS = 252
+
+REGIME_METRICS = ["n_cases", "success_rate", "avg_return", "min_return", "loss_prob", "ki_rate"]
+
+
+def rolling_moments(returns, window):
+    """
+    (T, A) 수익률의 길이 window 후행 창 평균과 표본 공분산 (ddof=1)
+    반환: mean (T, A), cov (T, A, A) — 창이 다 차지 않은 앞쪽 window-1행은 NaN
+    """
+    x = np.asarray(returns, dtype=float)
+    T, A = x.shape
+    mean = np.full((T, A), np.nan)
+    cov = np.full((T, A, A), np.nan)
+    if window < 2 or T < window:
+        return mean, cov
+
+    center = x.mean(axis=0)
+    xc = x - center
+    s1 = np.zeros((T + 1, A))
+    s2 = np.zeros((T + 1, A, A))
+    np.cumsum(xc, axis=0, out=s1[1:])
+    np.cumsum(xc[:, :, None] * xc[:, None, :], axis=0, out=s2[1:])
+
+    w1 = s1[window:] - s1[:-window]                 # (T-w+1, A) 창 합
+    w2 = s2[window:] - s2[:-window]                 # (T-w+1, A, A) 창 교차곱 합
+    mean[window - 1:] = w1 / window + center
+    cov[window - 1:] = (w2 - w1[:, :, None] * w1[:, None, :] / window) / (window - 1)
+    return mean, cov
+
+
+def basket_regime(cov):
+    """
+    공분산 (T, A, A) → 바스켓 평균 연율 변동성, 자산 쌍 평균 상관 (자산 하나면 상관 NaN)
+    """
+    A = cov.shape[1]
+    var = np.clip(np.diagonal(cov, axis1=1, axis2=2), 0.0, None)
+    sd = np.sqrt(var)
+    vol = sd.mean(axis=1) * np.sqrt(TRADING_DAYS)
+    if A < 2:
+        return vol, np.full(len(cov), np.nan)
+    iu = np.triu_indices(A, k=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov[:, iu[0], iu[1]] / (sd[:, iu[0]] * sd[:, iu[1]])
+    return vol, corr.mean(axis=1)
+
+
+def regime_features(prices, windows=REGIME_WINDOWS):
+    """
+    가격 행렬의 날짜별 후행 국면 특성 (그날 종가까지의 일별 로그수익률 창)
+    반환: prices.index 인덱스, vol_{w} / corr_{w} 열 DataFrame
+    """
+    values = np.asarray(prices, dtype=float).reshape(len(prices), -1)
+    returns = np.diff(np.log(values), axis=0)
+    out = {}
+    for w in windows:
+        _, cov = rolling_moments(returns, int(w))
+        vol, corr = basket_regime(cov)
+        # 수익률 t는 가격 t+1일에 확정 → 가격 인덱스 기준 한 칸 뒤로
+        out[f"vol_{w}"] = np.concatenate([[np.nan], vol])
+        out[f"corr_{w}"] = np.concatenate([[np.nan], corr])
+    return pd.DataFrame(out, index=prices.index)
+
+
+def attach_regimes(df, features):
+    """run_backtest 결과 각 행(발행일)에 국면 특성 열 추가 (복사본 반환)"""
+    out = df.copy()
+    aligned = features.reindex(pd.DatetimeIndex(df["start_date"]))
+    for col in features.columns:
+        out[col] = aligned[col].to_numpy()
+    return out
+
+
+def regime_buckets(values, n_buckets=REGIME_BUCKETS):
+    """특성 값의 분위 구간 번호 (0 = 가장 낮은 국면, 결측은 -1)"""
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    bucket = np.full(len(values), -1, dtype=np.int64)
+    if valid.sum() == 0:
+        return bucket, np.full(n_buckets + 1, np.nan)
+    edges = np.quantile(values[valid], np.linspace(0.0, 1.0, n_buckets + 1))
+    bucket[valid] = np.clip(np.searchsorted(edges, values[valid], side="right") - 1, 0, n_buckets - 1)
+    return bucket, edges
+
+
+def regime_table(df, feature, n_buckets=REGIME_BUCKETS):
+    """
+    국면 구간별 성과 (attach_regimes를 거친 결과 DataFrame)
+
+    반환: 구간 행, [lower, upper] + REGIME_METRICS 열 DataFrame
+          비율·평균은 case_weights 가중 (샘플링 발행일이면 일별 발행 기준 근사)
+    """
+    bucket, edges = regime_buckets(df[feature].to_numpy(), n_buckets)
+    w = case_weights(df)
+    ret = df["return"].to_numpy(dtype=float)
+    ki = df["ki"].to_numpy(dtype=bool)
+
+    records = []
+    for b in range(n_buckets):
+        m = bucket == b
+        W = w[m].sum()
+        n = int(m.sum())
+        records.append({
+            "bucket": b,
+            "lower": edges[b],
+            "upper": edges[b + 1],
+            "n_cases": n,
+            "success_rate": w[m][ret[m] >= 0].sum() / W if n else np.nan,
+            "avg_return": np.dot(w[m], ret[m]) / W if n else np.nan,
+            "min_return": ret[m].min() if n else np.nan,
+            "loss_prob": w[m][ret[m] < 0].sum() / W if n else np.nan,
+            "ki_rate": w[m][ki[m]].sum() / W if n else np.nan,
+        })
+    return pd.DataFrame(records, columns=["bucket", "lower", "upper"] + REGIME_METRICS).set_index("bucket")
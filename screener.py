@@ -0,0 +1,143 @@
+"""
+기초자산 조합 스크리너 (Streamlit 비의존 모듈)
+
+하나의 StepDownELS 구조로 유니버스의 1~3개 자산 조합 전체를 백테스트해 순위를 매긴다.
+
+바스켓 worst-of는 구성 자산 비율 행렬의 원소별 최소값이므로
+- 자산별 특징(관측일 비율, 관측일까지 구간 최소 비율, 만기 비율/구간 최소)은 한 번만 계산하고
+- 2개 조합은 자산 특징의 np.minimum, 3개 조합은 2개 조합 하나를 만든 직후 자산 하나를 더 minimum
+으로 만든다 (조합 블록은 메모리 예산(planner.plan_chunks)에 맞춘 청크로 평가하고 바로 버림). 모든 조합은 유니버스 합집합 캘린더(결측은 정렬 단계 한도 내 채움) 하나를 공유하며,
+구간 안에 결측(NaN)이 남아 있는 발행일은 해당 자산이 포함된 조합에서 제외된다.
+"""
+import numpy as np
+import pandas as pd
+
+from engine import PathIndex, build_schedule
+from planner import DEFAULT_MEMORY_BUDGET, plan_chunks
+
+SCREEN_COLUMNS = ["basket", "n_assets", "n_cases", "loss_prob", "avg_return", "min_return", "ki_rate"]
+
+
+def asset_features(prices, els):
+    """
+    자산별 특징 행렬 (A, N, 2 * n_obs + 2)과 공유 스케줄
+
+    열 구성: [관측일 비율 n_obs | 만기 비율 | 관측일까지 최소 비율 n_obs | 만기까지 최소 비율]
+    발행~만기 구간에 결측이 있는 (자산, 발행일)은 NaN
+    """
+    values = prices.to_numpy(dtype=float)
+    missing = np.isnan(values)
+    # 구간 최소값 테이블은 결측을 +inf로 두고 만들고, 결측 구간은 아래에서 NaN 처리
+    path_index = PathIndex(pd.DataFrame(np.where(missing, np.inf, values), index=prices.index, columns=prices.columns))
+    schedule = build_schedule(path_index, els.maturity_months, els.obs_interval_months)
+
+    P = path_index.values
+    starts, obs, maturity = schedule.starts, schedule.obs, schedule.maturity
+    base = P[starts]                                                # (N, A)
+
+    obs_min, _ = path_index.range_min(np.broadcast_to(starts[:, None], obs.shape), obs)
+    end_min, _ = path_index.range_min(starts, maturity)
+
+    # 상장 전 구간(+inf) 비율은 inf/inf = NaN — 아래 결측 구간 처리로 어차피 NaN이 되므로 경고 생략
+    with np.errstate(invalid="ignore"):
+        features = np.concatenate([
+            P[obs] / base[:, None, :],                              # (N, n_obs, A) 관측일 비율
+            (P[maturity] / base)[:, None, :],
+            obs_min / base[:, None, :],
+            (end_min / base)[:, None, :],
+        ], axis=1).transpose(2, 0, 1)                               # (A, N, F)
+
+    # 발행~만기 구간 결측 여부 (누적 결측 개수 차이)
+    cum = np.concatenate([np.zeros((1, values.shape[1]), dtype=np.int64), np.cumsum(missing, axis=0)])
+    gap = (cum[maturity + 1] - cum[starts]) > 0                     # (N, A)
+    features[gap.T] = np.nan
+    return features, schedule
+
+
+def evaluate_features(features, schedule, els):
+    """
+    바스켓 특징 (B, N, F)으로 구조 평가 → (수익률, 낙인 여부), 무효 발행일은 수익률 NaN
+    engine.evaluate와 같은 규칙
+    """
+    n_obs = schedule.obs.shape[1]
+    obs_worst = features[..., :n_obs]
+    end_worst = features[..., n_obs]
+    obs_min = features[..., n_obs + 1:2 * n_obs + 1]
+    end_min = features[..., 2 * n_obs + 1]
+
+    levels = np.array([float(l) for l in els.early_levels])
+    hit = obs_worst >= levels
+    redeemed = hit.any(axis=-1)
+    first = hit.argmax(axis=-1) if n_obs else np.zeros(redeemed.shape, dtype=np.int64)
+
+    # 상환 평가일까지의 최소 비율로 낙인 판정
+    red_min = np.take_along_axis(obs_min, first[..., None], axis=-1)[..., 0] if n_obs else end_min
+    ki = np.where(redeemed, red_min, end_min) < els.knock_in
+
+    if n_obs:
+        days = np.broadcast_to(schedule.obs_days, first.shape + (n_obs,))
+        held = np.take_along_axis(days, first[..., None], axis=-1)[..., 0]
+    else:
+        held = np.zeros(redeemed.shape, dtype=np.int64)
+    early = (1.0 + els.coupon_annual * (held / 365.25)) - 1.0
+    at_maturity = np.where(ki, end_worst - 1.0, (1.0 + els.coupon_annual * (els.maturity_months / 12.0)) - 1.0)
+    returns = np.where(redeemed, early, at_maturity)
+
+    invalid = np.isnan(features).any(axis=-1)
+    returns[invalid] = np.nan
+    return returns, ki & ~invalid
+
+
+def _summary(names, members, returns, ki):
+    valid = ~np.isnan(returns)
+    n = valid.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rows = {
+            "basket": [" / ".join(names[i] for i in m) for m in members],
+            "n_assets": [len(m) for m in members],
+            "n_cases": n,
+            "loss_prob": ((returns < 0) & valid).sum(axis=-1) / n,
+            "avg_return": np.nansum(returns, axis=-1) / n,
+            "min_return": np.where(n > 0, np.where(valid, returns, np.inf).min(axis=-1), np.nan),
+            "ki_rate": (ki & valid).sum(axis=-1) / n,
+        }
+    return pd.DataFrame(rows, columns=SCREEN_COLUMNS)
+
+
+def screen_baskets(prices, els, max_assets=3, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    유니버스 가격(합집합 캘린더, 열=자산)으로 1~max_assets개 조합 전체를 평가
+    memory_budget: 조합 블록 작업 메모리 예산 (바이트) — 자산 특징 행렬은 별도
+    반환: 손실 확률 ↑, 낙인 비율 ↑, 평균 수익률 ↓ 순으로 정렬된 DataFrame
+    """
+    names = list(prices.columns)
+    features, schedule = asset_features(prices, els)
+    n_assets = len(names)
+    frames = []
+
+    # 조합 하나당 특징 블록 + 평가 중간 배열 (블록의 약 3배)
+    plan = plan_chunks(n_assets, 4 * features[0].nbytes, memory_budget)
+
+    def run(base, members, others):
+        """base(이미 만든 조합 특징, 없으면 None) ∧ 자산 others 각각 → 청크별 평가 요약"""
+        for lo, hi in plan.chunks(len(others)):
+            block = features[others[lo:hi]]                         # (청크, N, F)
+            if base is not None:
+                block = np.minimum(base[None], block)
+            frames.append(_summary(names, members[lo:hi], *evaluate_features(block, schedule, els)))
+
+    run(None, [(i,) for i in range(n_assets)], list(range(n_assets)))
+    for i in range(n_assets if max_assets >= 2 else 0):
+        js = list(range(i + 1, n_assets))
+        run(features[i], [(i, j) for j in js], js)
+        if max_assets >= 3:
+            for j in js[:-1]:
+                # 2개 조합 (i, j) 특징은 그 3개 조합들을 평가하는 동안만 유지
+                ks = list(range(j + 1, n_assets))
+                run(np.minimum(features[i], features[j]), [(i, j, k) for k in ks], ks)
+
+    ranked = pd.concat(frames, ignore_index=True)
+    ranked = ranked[ranked["n_cases"] > 0]
+    return ranked.sort_values(
+        ["loss_prob", "ki_rate", "avg_return"], ascending=[True, True, False]
+    ).reset_index(drop=True)
@@ -0,0 +1,111 @@
+"""
+낙인(KI) × 쿠폰 민감도 곡면 (Streamlit 비의존 모듈)
+
+조기상환 차수는 상환 기준(early_levels)으로만 결정되므로 KI·쿠폰을 바꿔도 변하지 않는다.
+따라서 백테스트 한 번의 발행일별 경로 통계(상환 차수, 상환 평가일, 상환 평가일까지의
+최저 worst-of, 상환 평가일 worst-of)만으로 격자 전체를 경로 재평가 없이 계산한다.
+- 낙인 여부: 최저 worst-of < KI  → 최저 worst-of 정렬 + searchsorted
+- 만기 낙인 손실 합: 만기 케이스를 최저 worst-of 순으로 정렬한 손실 누적합
+- 조기상환 쿠폰 합: 쿠폰 격자 × 경과일 (KI와 무관)
+weight 열(주별/월별 샘플링)이 있으면 개수·합계를 모두 가중치 누적합으로 바꿔 가중 평균을 낸다.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from engine import case_weights
+
+KI_GRID = np.arange(30, 71) / 100.0               # 30~70%, 1%p 간격
+COUPON_GRID = np.arange(0, 41) * 0.5 / 100.0      # 0~20%, 0.5%p 간격
+
+SURFACE_METRICS = ["loss_prob", "avg_return", "ki_rate"]
+REQUIRED_COLUMNS = ["start_date", "step", "redemption_date", "min_worst", "final_worst"]
+
+
+@dataclass
+class SensitivitySurface:
+    """
+    KI × 쿠폰 격자 지표 (각 (K, C) 행렬)
+
+    loss_prob  : 손실(수익률 < 0) 확률
+    avg_return : 평균 수익률
+    ki_rate    : 상환 평가일까지 낙인 발생 비율
+    """
+    ki_levels: np.ndarray
+    coupons: np.ndarray
+    loss_prob: np.ndarray
+    avg_return: np.ndarray
+    ki_rate: np.ndarray
+
+    def frame(self, metric):
+        """지표 행렬 DataFrame (행=KI %, 열=쿠폰 %)"""
+        return pd.DataFrame(
+            getattr(self, metric),
+            index=pd.Index(np.round(self.ki_levels * 100, 2), name="knock_in"),
+            columns=pd.Index(np.round(self.coupons * 100, 2), name="coupon"),
+        )
+
+    def at(self, knock_in, coupon):
+        """가장 가까운 격자점의 지표 {metric: 값}"""
+        i = int(np.abs(self.ki_levels - knock_in).argmin())
+        j = int(np.abs(self.coupons - coupon).argmin())
+        return {m: float(getattr(self, m)[i, j]) for m in SURFACE_METRICS}
+
+
+def sensitivity_surface(df, els, ki_levels=KI_GRID, coupons=COUPON_GRID):
+    """
+    run_backtest 결과(경로 통계 포함)로 KI × 쿠폰 곡면 계산
+
+    df : run_backtest(..., path_stats=True) 결과
+    els: 백테스트에 사용한 구조 (만기 개월 수만 사용, 상환 기준은 df에 반영되어 있음)
+    수익률 규칙은 엔진과 동일: 조기상환 (1 + 쿠폰 × 경과일/365.25) - 1,
+    만기 낙인 시 worst-of - 1, 만기 비낙인 시 (1 + 쿠폰 × 만기/12) - 1
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"경로 통계 열이 없습니다: {', '.join(missing)} (run_backtest(..., path_stats=True) 결과 필요)")
+    ki_levels = np.asarray(ki_levels, dtype=float)
+    coupons = np.asarray(coupons, dtype=float)
+    if (coupons < 0).any():
+        raise ValueError("쿠폰 격자는 0 이상이어야 합니다.")
+
+    n = len(df)
+    redeemed = df["step"].notna().to_numpy()
+    held = (df["redemption_date"] - df["start_date"]).dt.days.to_numpy()[redeemed]
+    min_worst = df["min_worst"].to_numpy(dtype=float)
+    w = case_weights(df)
+    shape = (len(ki_levels), len(coupons))
+    if n == 0:
+        empty = np.full(shape, np.nan)
+        return SensitivitySurface(ki_levels, coupons, empty, empty.copy(), empty.copy())
+    W = w.sum()
+
+    # 낙인 비율: 조기상환 케이스도 상환 평가일까지 최저 worst-of 기준
+    order = np.argsort(min_worst, kind="stable")
+    cum_w = np.concatenate([[0.0], np.cumsum(w[order])])
+    ki_weight = cum_w[np.searchsorted(min_worst[order], ki_levels, side="left")]
+
+    # 만기 케이스: 최저 worst-of 오름차순 → KI 미만 개수만큼 앞에서부터 낙인
+    order = np.argsort(min_worst[~redeemed], kind="stable")
+    maturity_min = min_worst[~redeemed][order]
+    maturity_w = w[~redeemed][order]
+    maturity_loss = df["final_worst"].to_numpy(dtype=float)[~redeemed][order] - 1.0
+    cum_loss = np.concatenate([[0.0], np.cumsum(maturity_w * maturity_loss)])
+    cum_neg = np.concatenate([[0.0], np.cumsum(maturity_w * (maturity_loss < 0))])
+    cum_mat_w = np.concatenate([[0.0], np.cumsum(maturity_w)])
+    n_ki = np.searchsorted(maturity_min, ki_levels, side="left")      # (K,)
+    safe_weight = cum_mat_w[-1] - cum_mat_w[n_ki]
+
+    early = ((1.0 + coupons[:, None] * (held[None, :] / 365.25)) - 1.0) @ w[redeemed]   # (C,)
+    maturity_coupon = (1.0 + coupons * (els.maturity_months / 12.0)) - 1.0           # (C,)
+    total = early[None, :] + safe_weight[:, None] * maturity_coupon[None, :] + cum_loss[n_ki][:, None]
+
+    # 쿠폰 >= 0이면 손실은 만기 낙인 케이스에서만 발생 → 쿠폰과 무관
+    return SensitivitySurface(
+        ki_levels=ki_levels,
+        coupons=coupons,
+        loss_prob=np.broadcast_to((cum_neg[n_ki] / W)[:, None], shape).copy(),
+        avg_return=total / W,
+        ki_rate=np.broadcast_to((ki_weight / W)[:, None], shape).copy(),
+    )
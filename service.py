@@ -0,0 +1,495 @@
+"""
+백테스트 HTTP 서비스 (Streamlit 비의존 모듈, 표준 라이브러리 http.server)
+
+다른 내부 앱이 Streamlit 세션을 거치지 않고 백테스트를 요청할 수 있도록
+작업 제출 → 작업 ID → 결과 폴링/스트리밍 방식의 가벼운 API를 제공한다.
+
+- 가격: batch.py 공유 가격 저장소(Parquet)를 읽고 바스켓 × 분석 기간 PathIndex를 캐시
+- 작업 ID: 요청 내용 해시 (batch.task_id) → 같은 요청은 같은 ID
+  · 실행 중인 같은 작업이 있으면 새로 실행하지 않고 합류 (coalescing)
+  · 끝난 작업은 결과 캐시(최근 RESULT_CACHE_SIZE개)에서 바로 응답
+- 실행: 스레드 워커 풀 (NumPy·numba 커널은 GIL을 놓고 계산)
+
+API
+  POST /jobs                      작업 제출 → 202 {job_id, status, source} (캐시 적중 시 200)
+  GET  /jobs/<id>?wait=초         상태 + 요약 지표 (wait 동안 완료를 기다리는 롱 폴링)
+  GET  /jobs/<id>/result          발행일별 결과 JSON 배열
+  GET  /jobs/<id>/result?format=ndjson   한 줄에 한 케이스씩 스트리밍
+  GET  /health                    워커 수, 작업 상태별 개수, 저장소 자산 목록
+
+요청 예:
+  {"basket": ["S&P500", "KOSPI"], "lookback": 15,
+   "structure": {"maturity_months": 36, "obs_interval_months": 6,
+                 "early_levels": [0.9, 0.9, 0.85, 0.85, 0.8, 0.75],
+                 "coupon_annual": 0.07, "knock_in": 0.45},
+   "sampling": "daily", "path_stats": false}
+
+사용 예:
+  python service.py serve --prices store/universe.parquet --port 8765 --workers 4
+  python service.py serve --demo                        # 합성 가격 저장소로 로컬 실행
+  python service.py bench --url http://127.0.0.1:8765 --requests 500 --concurrency 16
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+from batch import basket_path_index, load_price_store, save_price_store, task_id
+from engine import SAMPLING_MODES, StepDownELS, case_weights, run_backtest
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+RESULT_CACHE_SIZE = 256         # 결과를 보관하는 완료 작업 수 (오래된 것부터 제거)
+MAX_WAIT_SECONDS = 30.0         # 롱 폴링 최대 대기
+STREAM_BATCH_ROWS = 500         # ndjson 스트리밍 시 한 번에 보내는 행 수
+JSON_OPTIONS = {"orient": "records", "date_format": "iso", "double_precision": 15}  # 수익률 자릿수 보존
+
+STRUCTURE_FIELDS = ["maturity_months", "obs_interval_months", "early_levels", "coupon_annual", "knock_in"]
+
+
+# =============================
+# 요청 정규화
+# =============================
+def _parse_issue_dates(values):
+    """issue_dates: ISO 날짜 문자열 목록 → 정렬·중복 제거된 YYYY-MM-DD 목록 (잘못되면 ValueError)"""
+    if not values or not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise ValueError("calendar 샘플링에는 issue_dates(ISO 날짜 문자열 목록)가 필요합니다.")
+    try:
+        return sorted({date.fromisoformat(v).isoformat() for v in values})
+    except ValueError:
+        raise ValueError("issue_dates는 YYYY-MM-DD 형식이어야 합니다.") from None
+
+
+def _parse_as_of(value):
+    """as_of: 없으면 None (저장소 마지막 날짜), 있으면 ISO 날짜 문자열 → YYYY-MM-DD (잘못되면 ValueError)"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError("as_of는 YYYY-MM-DD 형식 문자열이어야 합니다.")
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError("as_of는 YYYY-MM-DD 형식이어야 합니다.") from None
+
+
+def normalize_spec(body, assets=None):
+    """
+    요청 본문 → 정규화된 작업 명세 (같은 의미의 요청은 같은 명세 → 같은 작업 ID)
+    assets: 가격 저장소 자산 목록 (주면 바스켓 자산이 모두 있는지 확인)
+    잘못된 요청은 ValueError
+    """
+    if not isinstance(body, dict):
+        raise ValueError("요청 본문은 JSON 객체여야 합니다.")
+    basket = body.get("basket")
+    if not basket or not isinstance(basket, list) or not all(isinstance(a, str) for a in basket):
+        raise ValueError("basket은 자산 이름 목록이어야 합니다.")
+    if assets is not None:
+        known = set(assets)
+        unknown = [a for a in basket if a not in known]
+        if unknown:
+            raise ValueError(f"가격 저장소에 없는 자산입니다: {', '.join(unknown)}")
+    lookback = int(body.get("lookback", 15))
+    if lookback <= 0:
+        raise ValueError("lookback은 1 이상의 연 수여야 합니다.")
+    structure = body.get("structure")
+    if not isinstance(structure, dict):
+        raise ValueError("structure가 필요합니다.")
+    missing = [f for f in STRUCTURE_FIELDS if f not in structure]
+    if missing:
+        raise ValueError(f"structure 항목이 없습니다: {', '.join(missing)}")
+    els = {
+        "maturity_months": int(structure["maturity_months"]),
+        "obs_interval_months": int(structure["obs_interval_months"]),
+        "early_levels": [float(x) for x in structure["early_levels"]],
+        "coupon_annual": float(structure["coupon_annual"]),
+        "knock_in": float(structure["knock_in"]),
+    }
+    if els["obs_interval_months"] <= 0 or els["maturity_months"] % els["obs_interval_months"]:
+        raise ValueError("만기는 평가 주기의 배수여야 합니다.")
+    n_obs = els["maturity_months"] // els["obs_interval_months"]
+    if len(els["early_levels"]) != n_obs:
+        raise ValueError(f"조기상환 레벨 개수({len(els['early_levels'])})가 관측 횟수({n_obs})와 일치하지 않습니다.")
+    sampling = body.get("sampling", "daily")
+    if sampling not in SAMPLING_MODES:
+        raise ValueError(f"지원하지 않는 샘플링입니다: {sampling} (가능: {', '.join(SAMPLING_MODES)})")
+    issue_dates = None
+    if sampling == "calendar":
+        issue_dates = _parse_issue_dates(body.get("issue_dates"))
+    return {
+        "basket": list(basket),
+        "lookback": lookback,
+        "as_of": _parse_as_of(body.get("as_of")),
+        "structure": els,
+        "sampling": sampling,
+        "issue_dates": issue_dates,
+        "path_stats": bool(body.get("path_stats", False)),
+    }
+
+
+# =============================
+# 작업 관리
+# =============================
+@dataclass
+class Job:
+    """작업 상태: queued → running → done / failed"""
+    job_id: str
+    spec: dict
+    status: str = "queued"
+    submitted: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    result: object = None       # 발행일별 결과 DataFrame
+    summary: dict = None
+    error: str = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def describe(self):
+        out = {"job_id": self.job_id, "status": self.status}
+        if self.finished is not None and self.started is not None:
+            out["elapsed_ms"] = round((self.finished - self.started) * 1e3, 2)
+        if self.summary is not None:
+            out["summary"] = self.summary
+        if self.error is not None:
+            out["error"] = self.error
+        return out
+
+
+def summarize_result(df):
+    """헤드라인 지표 (weight 열이 있으면 가중)"""
+    if df is None or len(df) == 0:
+        return {"cases": 0}
+    w = case_weights(df)
+    ret = df["return"].to_numpy()
+    return {
+        "cases": int(len(df)),
+        "success_rate": float(w[ret >= 0].sum() / w.sum()),
+        "avg_return": float(np.dot(w, ret) / w.sum()),
+        "ki_rate": float(w[df["ki"].to_numpy()].sum() / w.sum()),
+        "min_return": float(ret.min()),
+    }
+
+
+class JobManager:
+    """
+    작업 등록·중복 제거·결과 캐시 + 스레드 워커 풀
+
+    prices_path: 공유 가격 저장소 경로
+    workers    : 동시에 실행하는 백테스트 수
+    cache_size : 결과를 보관하는 완료 작업 수
+    """
+
+    def __init__(self, prices_path, workers=None, cache_size=RESULT_CACHE_SIZE, backend="auto"):
+        self.prices_path = prices_path
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.backend = backend
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backtest")
+        self.counters = {"submitted": 0, "executed": 0, "coalesced": 0, "cached": 0}
+
+    def submit(self, spec):
+        """
+        작업 제출 → (Job, source)
+        source: 'new'(새로 실행), 'coalesced'(실행 중인 같은 작업에 합류), 'cached'(완료 결과 재사용)
+        """
+        job_id = task_id(spec)
+        with self.lock:
+            self.counters["submitted"] += 1
+            job = self.jobs.get(job_id)
+            if job is not None and job.status != "failed":
+                self.jobs.move_to_end(job_id)
+                source = "cached" if job.status == "done" else "coalesced"
+                self.counters[source] += 1
+                return job, source
+            job = Job(job_id, spec)
+            self.jobs[job_id] = job
+            self._evict()
+        self.pool.submit(self._run, job)
+        return job, "new"
+
+    def _evict(self):
+        """완료 작업이 cache_size를 넘으면 오래된 것부터 제거 (실행 중 작업은 유지)"""
+        finished = [k for k, j in self.jobs.items() if j.done.is_set()]
+        for k in finished[:max(0, len(finished) - self.cache_size)]:
+            del self.jobs[k]
+
+    def _run(self, job):
+        job.status, job.started = "running", time.time()
+        spec = job.spec
+        try:
+            path_index = basket_path_index(self.prices_path, tuple(spec["basket"]), spec["lookback"], spec["as_of"])
+            df = run_backtest(None, StepDownELS(**spec["structure"]), path_index=path_index,
+                              path_stats=spec["path_stats"], backend=self.backend,
+                              sampling=spec["sampling"], issue_dates=spec["issue_dates"])
+            job.result = df
+            job.summary = summarize_result(df)
+            job.status = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        finally:
+            job.finished = time.time()
+            with self.lock:
+                self.counters["executed"] += 1
+            job.done.set()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def stats(self):
+        with self.lock:
+            status = {}
+            for job in self.jobs.values():
+                status[job.status] = status.get(job.status, 0) + 1
+            return {"workers": self.workers, "jobs": status, **self.counters}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# =============================
+# HTTP 핸들러
+# =============================
+class BacktestHandler(BaseHTTPRequestHandler):
+    """JSON API 핸들러 (server.manager: JobManager)"""
+
+    server_version = "ELSBacktest/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_or_404(self, job_id):
+        job = self.server.manager.get(job_id)
+        if job is None:
+            self._send_json(404, {"error": f"작업이 없습니다: {job_id}"})
+        return job
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "알 수 없는 경로입니다."})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            assets = load_price_store(self.server.manager.prices_path).columns
+            spec = normalize_spec(json.loads(self.rfile.read(length) or b"null"), assets)
+        except (ValueError, TypeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        job, source = self.server.manager.submit(spec)
+        self._send_json(200 if job.status == "done" else 202, {**job.describe(), "source": source})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["health"]:
+            assets = list(load_price_store(self.server.manager.prices_path).columns)
+            return self._send_json(200, {**self.server.manager.stats(), "assets": assets})
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self._job_or_404(parts[1])
+            if job is None:
+                return
+            try:
+                wait = float(query.get("wait", ["0"])[0])
+            except ValueError:
+                wait = float("nan")
+            if not wait >= 0:   # 음수·NaN·숫자가 아닌 값
+                return self._send_json(400, {"error": "wait는 0 이상의 초 단위 숫자여야 합니다."})
+            wait = min(wait, MAX_WAIT_SECONDS)
+            if wait > 0:
+                job.done.wait(wait)
+            return self._send_json(200 if job.done.is_set() else 202, job.describe())
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            job = self._job_or_404(parts[1])
+            if job is None:
+                return
+            if not job.done.is_set():
+                return self._send_json(202, job.describe())
+            if job.status == "failed":
+                return self._send_json(500, job.describe())
+            if query.get("format", ["json"])[0] == "ndjson":
+                return self._stream_ndjson(job.result)
+            body = job.result.to_json(orient="records", date_format="iso", double_precision=15) if job.result is not None else "[]"
+            return self._send_raw(200, body.encode("utf-8"), "application/json; charset=utf-8")
+        self._send_json(404, {"error": "알 수 없는 경로입니다."})
+
+    def _send_raw(self, code, body, content_type):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_ndjson(self, df):
+        """chunked 전송으로 STREAM_BATCH_ROWS행씩 ndjson 스트리밍"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        n = 0 if df is None else len(df)
+        for start in range(0, n, STREAM_BATCH_ROWS):
+            chunk = df.iloc[start:start + STREAM_BATCH_ROWS].to_json(lines=True, **JSON_OPTIONS)
+            data = (chunk.rstrip("\n") + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def make_server(prices_path, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None,
+                cache_size=RESULT_CACHE_SIZE, backend="auto", verbose=False):
+    """HTTP 서버 생성 (serve_forever는 호출하는 쪽에서)"""
+    server = ThreadingHTTPServer((host, port), BacktestHandler)
+    server.daemon_threads = True
+    server.manager = JobManager(prices_path, workers, cache_size, backend)
+    server.verbose = verbose
+    return server
+
+
+def demo_store(path=None, n_assets=5, n_days=5000, seed=0):
+    """로컬 실행·부하 테스트용 합성 가격 저장소 (golden.synthetic_basket) → 경로"""
+    from golden import synthetic_basket
+
+    path = path or os.path.join(tempfile.mkdtemp(prefix="els-service-"), "demo.parquet")
+    frame = synthetic_basket(np.random.default_rng(seed), n_days, n_assets)
+    save_price_store(frame, path)
+    return path
+
+
+# =============================
+# 부하 테스트 클라이언트
+# =============================
+def _request(method, url, payload=None, timeout=MAX_WAIT_SECONDS + 30):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def random_request(rng, assets, max_assets=3):
+    """무작위 바스켓 × 구조 요청 본문"""
+    maturity, interval = rng.choice([(36, 6), (36, 4), (24, 6), (12, 3)])
+    n_obs = maturity // interval
+    first = rng.choice([0.95, 0.9, 0.85])
+    return {
+        "basket": rng.sample(assets, rng.randint(1, min(max_assets, len(assets)))),
+        "lookback": rng.choice([10, 15]),
+        "structure": {
+            "maturity_months": maturity,
+            "obs_interval_months": interval,
+            "early_levels": [round(first - 0.05 * (i // 2), 2) for i in range(n_obs)],
+            "coupon_annual": rng.choice([0.05, 0.06, 0.07, 0.08]),
+            "knock_in": rng.choice([0.45, 0.5, 0.55]),
+        },
+    }
+
+
+def benchmark(url, n_requests=200, concurrency=8, repeat_ratio=0.5, seed=0):
+    """
+    동시 부하 테스트: 요청마다 제출 → 완료까지 롱 폴링한 종단 지연 시간 측정
+
+    repeat_ratio: 이미 보낸 요청을 다시 보내는 비율 (합류/캐시 경로 측정)
+    반환: {requests, errors, p50_ms, p99_ms, mean_ms, max_ms, throughput_rps, sources}
+    """
+    url = url.rstrip("/")
+    rng = random.Random(seed)
+    assets = _request("GET", f"{url}/health")["assets"]
+    bodies = []
+    for _ in range(n_requests):
+        if bodies and rng.random() < repeat_ratio:
+            bodies.append(rng.choice(bodies))
+        else:
+            bodies.append(random_request(rng, assets))
+
+    def one(body):
+        t0 = time.perf_counter()
+        job = _request("POST", f"{url}/jobs", body)
+        source = job["source"]
+        while job["status"] not in ("done", "failed"):
+            job = _request("GET", f"{url}/jobs/{job['job_id']}?wait={MAX_WAIT_SECONDS}")
+        return (time.perf_counter() - t0) * 1e3, source, job["status"]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, bodies))
+    wall = time.perf_counter() - t0
+
+    latency = np.array([r[0] for r in results])
+    sources = {}
+    for _, source, _ in results:
+        sources[source] = sources.get(source, 0) + 1
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "errors": sum(r[2] != "done" for r in results),
+        "p50_ms": float(np.percentile(latency, 50)),
+        "p99_ms": float(np.percentile(latency, 99)),
+        "mean_ms": float(latency.mean()),
+        "max_ms": float(latency.max()),
+        "throughput_rps": n_requests / wall,
+        "sources": sources,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ELS 백테스트 HTTP 서비스")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("serve", help="서비스 실행")
+    p.add_argument("--prices", help="공유 가격 저장소 (Parquet)")
+    p.add_argument("--demo", action="store_true", help="합성 가격 저장소로 실행")
+    p.add_argument("--host", default=DEFAULT_HOST)
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--workers", type=int)
+    p.add_argument("--cache-size", type=int, default=RESULT_CACHE_SIZE)
+    p.add_argument("--backend", default="auto")
+    p.add_argument("--verbose", action="store_true")
+
+    p = sub.add_parser("bench", help="동시 부하 테스트 (p50/p99 지연 시간)")
+    p.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--repeat-ratio", type=float, default=0.5)
+    p.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        if not args.prices and not args.demo:
+            parser.error("--prices 또는 --demo가 필요합니다.")
+        prices = args.prices or demo_store()
+        server = make_server(prices, args.host, args.port, args.workers, args.cache_size, args.backend, args.verbose)
+        print(f"http://{args.host}:{args.port} (가격 저장소 {prices}, 워커 {server.manager.workers}개)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.manager.shutdown()
+            server.server_close()
+    else:
+        report = benchmark(args.url, args.requests, args.concurrency, args.repeat_ratio, args.seed)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+위기 구간 스트레스 테스트 (Streamlit 비의존 모듈)
+
+과거 위기 직전 발행 구간(시나리오) × 상품 구조 전체 조합을 한 번에 평가한다.
+같은 만기/평가주기 구조끼리는 스케줄과 관측일 worst-of를 공유하고,
+발행일 구간은 PathIndex 위치로 골라 prices.loc 슬라이싱 없이 처리한다.
+"""
+import numpy as np
+import pandas as pd
+
+from engine import PathIndex, StepDownELS, build_schedule, evaluate
+
+# 시나리오 이름 -> (발행 시작일, 발행 종료일)
+STRESS_SCENARIOS = {
+    "2008 금융위기": ("2007-07-01", "2008-09-12"),
+    "2020 코로나": ("2019-11-01", "2020-02-19"),
+    "2022 긴축": ("2021-09-01", "2022-01-03"),
+}
+
+# 비교용 대표 상품 구조
+SHELF_PRESETS = {
+    "3Y 95-90-85-80-75-70 KI45": StepDownELS(36, 6, [0.95, 0.90, 0.85, 0.80, 0.75, 0.70], 0.07, 0.45),
+    "3Y 90-90-85-85-80-75 KI50": StepDownELS(36, 6, [0.90, 0.90, 0.85, 0.85, 0.80, 0.75], 0.08, 0.50),
+    "3Y 85-85-80-80-75-65 KI35": StepDownELS(36, 6, [0.85, 0.85, 0.80, 0.80, 0.75, 0.65], 0.06, 0.35),
+    "2Y 90-85-80-75 KI45": StepDownELS(24, 6, [0.90, 0.85, 0.80, 0.75], 0.065, 0.45),
+}
+
+STRESS_METRICS = ["n_cases", "avg_return", "min_return", "loss_prob", "ki_rate", "recovery_days"]
+
+
+def _scenario_positions(index, scenarios):
+    """시나리오별 발행일 위치 배열"""
+    out = {}
+    for name, (first, last) in scenarios.items():
+        lo = index.searchsorted(pd.Timestamp(first), side="left")
+        hi = index.searchsorted(pd.Timestamp(last), side="right")
+        out[name] = np.arange(lo, hi)
+    return out
+
+
+def run_stress(prices, structures, scenarios=STRESS_SCENARIOS, path_index=None):
+    """
+    시나리오 × 구조 스트레스 테스트
+
+    structures: {이름: StepDownELS}
+    반환: (scenario, structure) MultiIndex, STRESS_METRICS 열의 DataFrame
+          (행렬로 보려면 result["avg_return"].unstack("structure"))
+    recovery_days: 낙인 후 손실 없이 상환된 케이스의 최초 낙인~상환 달력 일수 중앙값
+    """
+    path_index = path_index if path_index is not None else PathIndex(prices)
+    windows = _scenario_positions(path_index.index, scenarios)
+    all_starts = np.unique(np.concatenate([np.arange(0)] + list(windows.values()))).astype(np.int64)
+    days = path_index.days
+
+    # 만기/평가주기가 같은 구조끼리 묶어서 한 번에 평가
+    groups = {}
+    for name, els in structures.items():
+        groups.setdefault((els.maturity_months, els.obs_interval_months), []).append(name)
+
+    records = []
+    for (maturity, interval), names in groups.items():
+        schedule = build_schedule(path_index, maturity, interval, starts=all_starts)
+        result = evaluate(path_index, schedule, [structures[n] for n in names], ki_touch=True)
+
+        for scenario, positions in windows.items():
+            in_window = np.isin(schedule.starts, positions)
+            for j, name in enumerate(names):
+                r = result.returns[j, in_window]
+                ki = result.ki[j, in_window]
+                n = len(r)
+                recovered = ki & (r >= 0)
+                rec_days = (
+                    days[result.redemption[j, in_window][recovered]]
+                    - days[result.ki_index[j, in_window][recovered]]
+                ).astype(np.int64)
+                records.append({
+                    "scenario": scenario,
+                    "structure": name,
+                    "n_cases": n,
+                    "avg_return": r.mean() if n else np.nan,
+                    "min_return": r.min() if n else np.nan,
+                    "loss_prob": (r < 0).mean() if n else np.nan,
+                    "ki_rate": ki.mean() if n else np.nan,
+                    "recovery_days": float(np.median(rec_days)) if len(rec_days) else np.nan,
+                })
+
+    df = pd.DataFrame(records, columns=["scenario", "structure"] + STRESS_METRICS)
+    return df.set_index(["scenario", "structure"])